@@ -0,0 +1,158 @@
+"""
+Vectorized aggregation engine for the analytics endpoint.
+Builds per-dealership YTD figures and the monthly sales trend with single groupby passes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from compact import month_numbers
+from features import dealership_sales_series
+
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
+               'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+# Growth assumed for the remaining months of the year when projecting dealerships
+# without a fleet forecast
+PROJECTION_GROWTH = 1.1
+
+
+class Rollups:
+    """Aggregates needed to build one year's analytics response."""
+
+    def __init__(self, year, total_sales_ytd, dealerships, monthly_sales):
+        self.year = year
+        self.total_sales_ytd = total_sales_ytd
+        # DataFrame indexed by dealership name with location, sales_ytd,
+        # parts_cost_ytd, months_elapsed, sales_projected and parts_projected
+        self.dealerships = dealerships
+        # Array of 12 monthly sales totals (0 for months without sales)
+        self.monthly_sales = monthly_sales
+
+
+def dealership_rollup(dealership_df, year):
+    """Per-dealership YTD totals and projections from one groupby over the metrics."""
+    # Dealership order and location follow first appearance, like the raw data
+    dealers = dealership_df.groupby('dealership', sort=False)['location'].first()
+
+    ytd_mask = dealership_df['month'].str[:4] == str(year)
+    ytd = dealership_df.loc[ytd_mask].groupby('dealership', sort=False).agg(
+        sales_ytd=('sales_amount', 'sum'),
+        parts_cost_ytd=('parts_cost', 'sum'),
+        months_elapsed=('sales_amount', 'size'),
+    )
+
+    rollup = ytd.reindex(dealers.index, fill_value=0)
+    rollup.insert(0, 'location', dealers)
+
+    # Extrapolate the YTD monthly average over the rest of the year
+    months_elapsed = rollup['months_elapsed'].to_numpy()
+    remaining_factor = np.divide(
+        (12 - months_elapsed) * PROJECTION_GROWTH,
+        months_elapsed,
+        out=np.zeros(len(rollup)),
+        where=months_elapsed > 0,
+    )
+    rollup['sales_projected'] = rollup['sales_ytd'] * (1 + remaining_factor)
+    rollup['parts_projected'] = rollup['parts_cost_ytd'] * (1 + remaining_factor)
+
+    return rollup
+
+
+def year_end_steps(last_month, year):
+    """Forecast steps from the month after last_month through December of year.
+
+    Each step is the month's offset from January of year, so steps >= 0 fall
+    in year and index its monthly trend; there are none if last_month is
+    December of year or later.
+    """
+    last_month = pd.Period(last_month, freq='M')
+    return np.arange((last_month.year - year) * 12 + last_month.month, 12)
+
+
+def fleet_projection(rollup, dealership_df, year, sales_fleet):
+    """Project dealerships through December with their fleet forecasters.
+
+    Each dealership with a fleet member is forecast from the month after its
+    last recorded month to the end of year; the forecasts that fall in year are
+    added to its YTD sales, and to its YTD parts cost at its historical parts
+    cost ratio. Other dealerships keep their growth-based projection.
+    """
+    series = dealership_sales_series(dealership_df)
+    if series.empty:
+        return rollup
+
+    steps = year_end_steps(series.columns[-1], year)
+    if not len(steps):
+        return rollup
+    forecasts = sales_fleet.forecast(series, len(steps))
+    if not forecasts:
+        return rollup
+
+    remaining = pd.Series(
+        {name: forecast[steps >= 0].sum() for name, forecast in forecasts.items()}
+    )
+
+    totals = dealership_df.groupby('dealership', sort=False)[['parts_cost', 'sales_amount']].sum()
+    parts_ratio = (totals['parts_cost'] / totals['sales_amount']).reindex(remaining.index).fillna(0)
+
+    rollup = rollup.copy()
+    names = remaining.index
+    rollup.loc[names, 'sales_projected'] = rollup.loc[names, 'sales_ytd'] + remaining
+    rollup.loc[names, 'parts_projected'] = rollup.loc[names, 'parts_cost_ytd'] + remaining * parts_ratio
+    return rollup
+
+
+def monthly_trend(sales_df, year):
+    """Sales totals for each calendar month of year from one bincount.
+
+    sales_df holds compact rows (see compact.py) with int32 day numbers in date.
+    """
+    months = month_numbers(sales_df['date']) - (year - 1970) * 12
+    in_year = (months >= 0) & (months < 12)
+    return np.bincount(months[in_year], weights=sales_df['price'].to_numpy()[in_year], minlength=12)
+
+
+def compute_rollups(sales_df, dealership_df, year):
+    """Compute the YTD total, dealership rollup and monthly trend for year."""
+    monthly_sales = monthly_trend(sales_df, year)
+
+    return Rollups(
+        year=year,
+        total_sales_ytd=float(monthly_sales.sum()),
+        dealerships=dealership_rollup(dealership_df, year),
+        monthly_sales=monthly_sales,
+    )
+
+
+def dealerships_payload(rollup):
+    """Serialize a dealership rollup into the API's dealership list."""
+    rounded = rollup.round(2)
+    return [
+        {
+            'name': name,
+            'location': location,
+            'salesYTD': float(sales_ytd),
+            'salesProjected': float(sales_projected),
+            'partsCostYTD': float(parts_cost_ytd),
+            'partsCostProjected': float(parts_projected),
+        }
+        for name, location, sales_ytd, sales_projected, parts_cost_ytd, parts_projected
+        in zip(
+            rounded.index,
+            rounded['location'],
+            rounded['sales_ytd'],
+            rounded['sales_projected'],
+            rounded['parts_cost_ytd'],
+            rounded['parts_projected'],
+        )
+    ]
+
+
+def monthly_payload(monthly_sales):
+    """Serialize 12 monthly totals into the API's monthly sales list."""
+    return [
+        {'month': name, 'amount': round(float(amount), 2)}
+        for name, amount in zip(MONTH_NAMES, monthly_sales)
+    ]
+
@@ -3,51 +3,168 @@ Flask API service for E Corp ML predictions.
 Serves real-time predictions from trained TensorFlow models.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
-import json
-from train_models import SalesForecastModel, PartsDemandModel
+import hmac
+import threading
+import time
+import traceback
+from snapshot_cache import SnapshotCache
+from analytics import (
+    compute_rollups, dealerships_payload, fleet_projection, monthly_payload, year_end_steps,
+)
+from change_log import parse_version
+from compact import decode_ids, format_days
+from data_snapshot import DataStore
+from forecasting import forecast_cache
+from metrics import SlowRequestProfiler, metrics
+from model_loader import ModelLoader
+from pagination import parse_fields, to_records
+from reorder_plan import ReorderPlan, ReorderPlanner
+from sales_cube import DIMENSIONS, parse_list
+from serialization import body_response, json_response
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for React Native app
+CORS(app, expose_headers=['X-Next-Cursor', 'X-Data-Version', 'X-Sync'])  # Enable CORS for React Native app
 
 # Load models and data at startup
 print("Loading models and data...")
 
-sales_model = SalesForecastModel()
-parts_model = PartsDemandModel()
 
-try:
-    sales_model.load('models/sales_forecast_model.keras')
-    parts_model.load('models/parts_demand_model.keras')
-    print("✓ Models loaded successfully")
-except Exception as e:
-    print(f"⚠ Warning: Could not load models - {e}")
-    print("Run 'python train_models.py' first to train models")
-    sales_model = None
-    parts_model = None
+# Models load off the request path so the server (and /health) come up at once.
+# ML_MODEL_LOADING: 'background' (default), 'lazy' (on first use), 'eager', or
+# 'preload' (gunicorn --preload, see gunicorn.conf.py).
+models = ModelLoader()
+model_loading = os.environ.get('ML_MODEL_LOADING', 'background')
+if model_loading == 'eager':
+    models.start(background=False)
+elif model_loading == 'preload':
+    # NumPy models load in the master and are shared copy-on-write by the
+    # workers. TensorFlow is not fork-safe, so Keras models are left to each
+    # worker's post_fork hook.
+    if models.resolve_runtime() == 'numpy':
+        models.start(background=False)
+elif model_loading != 'lazy':
+    models.start()
+
+# Precomputed responses, rebuilt whenever the data or model version changes
+snapshot_cache = SnapshotCache()
+
+# Reorder plan behind /api/orders, recomputed with the same keys
+reorder_planner = ReorderPlanner()
+
+# (key, predicted demand) of the current parts, shared by /api/parts and /api/orders
+parts_demand_cache = [None, None]
+parts_demand_lock = threading.Lock()
+
+
+# Current data snapshot; handlers read store.current once per request
+store = DataStore()
+
+
+def load_data():
+    """(Re)load all datasets from disk and invalidate cached snapshots."""
+    try:
+        store.load()
+        print("✓ Data loaded successfully")
+    except Exception as e:
+        print(f"⚠ Warning: Could not load data - {e}")
+        print("Run 'python generate_training_data.py' first to generate data")
+    
+    snapshot_cache.invalidate()
+
 
 # Load data
-try:
-    sales_df = pd.read_csv('data/sales_history.csv')
-    parts_df = pd.read_csv('data/parts_inventory.csv')
-    tickets_df = pd.read_csv('data/service_tickets.csv')
-    monthly_df = pd.read_csv('data/monthly_aggregates.csv')
-    dealership_df = pd.read_csv('data/dealership_metrics.csv')
+load_data()
+
+
+# Opt-in sampling profiler for requests slower than ML_PROFILE_SLOW_MS
+slow_request_ms = os.environ.get('ML_PROFILE_SLOW_MS')
+profiler = SlowRequestProfiler(float(slow_request_ms)) if slow_request_ms else None
+
+
+def route_label():
+    """Matched URL rule (not the raw path), so labels stay low-cardinality."""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.begin_request()
+    if profiler:
+        profiler.start()
+
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    metrics.end_request(route_label(), request.method, response.status_code, elapsed)
+    if profiler:
+        profiler.stop(route_label(), elapsed)
+    return response
+
+
+def server_error(e):
+    """500 response for an unexpected exception, counted by route and type."""
+    metrics.inc('ml_service_exceptions_total', route=route_label(), exception=type(e).__name__)
+    traceback.print_exc()
+    return jsonify({'error': str(e)}), 500
+
+
+def service_metrics():
+    """Cache, model and batching gauges for /metrics."""
+    caches = {
+        'snapshot': snapshot_cache.stats(),
+        'forecast': forecast_cache.stats(),
+        'reorder_plan': reorder_planner.stats(),
+    }
     
-    with open('data/metadata.json', 'r') as f:
-        metadata = json.load(f)
+    def hit_ratio(stats):
+        lookups = stats['hits'] + stats['misses']
+        return stats['hits'] / lookups if lookups else 0.0
     
-    print("✓ Data loaded successfully")
-except Exception as e:
-    print(f"⚠ Warning: Could not load data - {e}")
-    print("Run 'python generate_training_data.py' first to generate data")
-    sales_df = parts_df = tickets_df = monthly_df = dealership_df = None
-    metadata = {}
+    collected = [
+        ('ml_service_cache_hits_total', 'counter', 'Cache hits by cache.',
+         [({'cache': name}, stats['hits']) for name, stats in caches.items()]),
+        ('ml_service_cache_misses_total', 'counter', 'Cache misses by cache.',
+         [({'cache': name}, stats['misses']) for name, stats in caches.items()]),
+        ('ml_service_cache_hit_ratio', 'gauge', 'Cache hits over lookups by cache.',
+         [({'cache': name}, hit_ratio(stats)) for name, stats in caches.items()]),
+        ('ml_service_cache_entries', 'gauge', 'Cached entries by cache.',
+         [({'cache': name}, stats['entries']) for name, stats in caches.items()]),
+        ('ml_service_models_ready', 'gauge', 'Whether the ML models are loaded.',
+         [({'runtime': models.active_runtime or 'none', 'version': models.version or 'none'},
+           int(models.ready))]),
+        ('ml_service_data_revision', 'gauge', 'Ingested batches applied to the loaded data.',
+         [({}, store.current.revision)]),
+    ]
+    
+    batching = models.batching_stats()
+    if batching:
+        collected += [
+            ('ml_service_batch_queue_depth', 'gauge', 'Predictions waiting for a batch.',
+             [({'model': name}, stats['queueDepth']) for name, stats in batching.items()]),
+            ('ml_service_batches_total', 'counter', 'Batched forward passes.',
+             [({'model': name}, stats['batches']) for name, stats in batching.items()]),
+            ('ml_service_batched_requests_total', 'counter', 'Predictions served through batches.',
+             [({'model': name}, stats['requests']) for name, stats in batching.items()]),
+        ]
+    
+    return collected
+
+
+metrics.register_collector(service_metrics)
+
+
+def snapshot_response(snapshot, headers=None):
+    """Serve a cached snapshot, answering 304 when the client's ETag matches."""
+    response = body_response(snapshot.body, snapshot.encoded, etag=snapshot.etag, headers=headers)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 
 @app.route('/health', methods=['GET'])
@@ -56,326 +173,726 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'models_loaded': sales_model is not None and parts_model is not None,
-        'data_loaded': sales_df is not None,
+        'models_loaded': models.ready,
+        'models': models.status(),
+        'data_loaded': store.current.loaded,
     })
 
 
 @app.route('/api/analytics', methods=['GET'])
 def get_analytics():
     """Get company-wide analytics with ML predictions."""
-    if sales_df is None or dealership_df is None:
+    data = store.current
+    if not data.loaded:
         return jsonify({'error': 'Data not loaded'}), 500
     
     try:
-        # Calculate current year metrics
-        current_year = datetime.now().year
-        ytd_sales = sales_df[sales_df['year'] == current_year]
-        
-        total_sales_ytd = ytd_sales['price'].sum()
-        
-        # Get recent monthly data for prediction
-        recent_months = monthly_df.tail(12)
-        
-        # Predict next 3 months if model is available
-        if sales_model:
-            future_predictions = sales_model.predict_next_months(recent_months, n_months=3)
-            predicted_remaining = future_predictions.sum()
-        else:
-            # Fallback to simple growth calculation
-            avg_monthly = recent_months['total_sales'].mean()
-            predicted_remaining = avg_monthly * 3
-        
-        total_sales_projected = total_sales_ytd + predicted_remaining
-        
-        # Estimate parts costs (20-25% of sales)
-        total_parts_cost_ytd = total_sales_ytd * 0.225
-        total_parts_cost_projected = total_sales_projected * 0.225
-        
-        # Get dealership metrics
-        dealerships = []
-        for dealership_name in dealership_df['dealership'].unique():
-            dealer_data = dealership_df[dealership_df['dealership'] == dealership_name]
-            
-            # Get YTD data
-            ytd_dealer = dealer_data[dealer_data['month'].str.startswith(str(current_year))]
-            
-            sales_ytd = ytd_dealer['sales_amount'].sum()
-            parts_cost_ytd = ytd_dealer['parts_cost'].sum()
-            
-            # Project rest of year
-            months_elapsed = len(ytd_dealer)
-            months_remaining = 12 - months_elapsed
-            
-            if months_elapsed > 0:
-                avg_monthly_sales = sales_ytd / months_elapsed
-                projected_sales = sales_ytd + (avg_monthly_sales * months_remaining * 1.1)  # 10% growth
-                projected_parts = parts_cost_ytd + (parts_cost_ytd / months_elapsed * months_remaining * 1.1)
-            else:
-                projected_sales = sales_ytd
-                projected_parts = parts_cost_ytd
-            
-            location = dealer_data.iloc[0]['location']
-            
-            dealerships.append({
-                'name': dealership_name,
-                'location': location,
-                'salesYTD': round(sales_ytd, 2),
-                'salesProjected': round(projected_sales, 2),
-                'partsCostYTD': round(parts_cost_ytd, 2),
-                'partsCostProjected': round(projected_parts, 2),
-            })
-        
-        # Get monthly sales trend for current year
-        monthly_sales = []
-        for month in range(1, 13):
-            month_str = f'{current_year}-{month:02d}'
-            month_data = sales_df[sales_df['month'] == month_str]
-            
-            if len(month_data) > 0:
-                amount = month_data['price'].sum()
-            elif sales_model and month > datetime.now().month:
-                # Use prediction for future months
-                amount = 0  # Will be filled by predictions
-            else:
-                amount = 0
-            
-            month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 
-                          'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-            
-            monthly_sales.append({
-                'month': month_names[month - 1],
-                'amount': round(amount, 2)
-            })
+        return snapshot_response(analytics_snapshot(data))
+    
+    except Exception as e:
+        return server_error(e)
+
+
+def analytics_snapshot(data):
+    """The /api/analytics payload for data, computed once per data/model version and day."""
+    sales_model, _ = models.get()
+    fleet = models.fleet()
+    
+    # Analytics only change with the data, the models or the calendar date
+    key = (data.version, models.version if sales_model else None, datetime.now().date())
+    return snapshot_cache.get(
+        'analytics', key, lambda: build_analytics(data, sales_model, fleet)
+    )
+
+
+@app.route('/api/cube', methods=['GET'])
+def get_cube():
+    """Slice and dice sales from the pre-aggregated cube.
+    
+    by lists the dimensions to group on (dealership, model, month, quarter,
+    year); each dimension can also be filtered with a comma-separated list
+    of values, and from/to bound the month. measures picks among sum, count,
+    min, max and avg of sale prices (all by default).
+    """
+    data = store.current
+    if not data.loaded:
+        return jsonify({'error': 'Data not loaded'}), 500
+    
+    try:
+        args = request.args
+        group_by = list(dict.fromkeys(parse_list(args.get('by')) or []))
+        measures = parse_list(args.get('measures'))
+        filters = {
+            dimension: parse_list(args.get(dimension))
+            for dimension in DIMENSIONS if args.get(dimension) is not None
+        }
         
-        # Fill in future months with predictions
-        current_month = datetime.now().month
-        if sales_model and current_month < 12:
-            predictions = sales_model.predict_next_months(
-                recent_months, 
-                n_months=min(3, 12 - current_month)
+        with metrics.stage('pandas'):
+            rows = data.sales_cube.query(
+                group_by, filters, month_from=args.get('from'), month_to=args.get('to'),
+                measures=measures,
             )
-            for i, pred in enumerate(predictions):
-                if current_month + i < 12:
-                    monthly_sales[current_month + i]['amount'] = round(float(pred), 2)
         
-        return jsonify({
-            'totalSalesYTD': round(total_sales_ytd, 2),
-            'totalSalesProjected': round(total_sales_projected, 2),
-            'totalPartsCostYTD': round(total_parts_cost_ytd, 2),
-            'totalPartsCostProjected': round(total_parts_cost_projected, 2),
-            'dealerships': dealerships,
-            'monthlySales': monthly_sales,
-            'generatedAt': datetime.now().isoformat(),
-            'usingML': sales_model is not None,
-        })
+        return json_response({'groupBy': group_by, 'rows': rows})
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return server_error(e)
+
+
+def build_analytics(data, sales_model, fleet=None):
+    """Compute the full analytics payload served by /api/analytics."""
+    # Aggregate dealership YTD figures and the monthly trend in single passes
+    current_year = datetime.now().year
+    with metrics.stage('pandas'):
+        rollups = compute_rollups(data.sales, data.dealership, current_year)
+    
+    # Per-dealership projections from the sales fleet, all dealerships in one pass
+    if fleet and fleet.sales:
+        with metrics.stage('inference'):
+            rollups.dealerships = fleet_projection(
+                rollups.dealerships, data.dealership, current_year, fleet.sales
+            )
+    
+    total_sales_ytd = rollups.total_sales_ytd
+    
+    # Get recent monthly data for prediction
+    recent_months = data.monthly.tail(12)
+    
+    # Forecast from the last recorded month through December, the horizon the
+    # dealership projections use; the monthly trend below reuses this forecast
+    steps = year_end_steps(recent_months['month'].iloc[-1], current_year)
+    if sales_model and len(steps):
+        with metrics.stage('inference'):
+            future_predictions = sales_model.predict_next_months(recent_months, n_months=len(steps))
+        predicted_remaining = future_predictions[steps >= 0].sum()
+    else:
+        # Fallback to simple growth calculation
+        future_predictions = None
+        avg_monthly = recent_months['total_sales'].mean()
+        predicted_remaining = avg_monthly * (steps >= 0).sum()
+    
+    if fleet and fleet.sales:
+        # The company total is the sum of the fleet's dealership projections
+        total_sales_projected = rollups.dealerships['sales_projected'].sum()
+    else:
+        total_sales_projected = total_sales_ytd + predicted_remaining
+    
+    # Estimate parts costs (20-25% of sales)
+    total_parts_cost_ytd = total_sales_ytd * 0.225
+    total_parts_cost_projected = total_sales_projected * 0.225
+    
+    monthly_sales = monthly_payload(rollups.monthly_sales)
+    
+    # Fill in the rest of the year with predictions
+    if future_predictions is not None:
+        for month, pred in zip(steps, future_predictions):
+            if month >= 0:
+                monthly_sales[month]['amount'] = round(float(pred), 2)
+    
+    return {
+        'totalSalesYTD': round(total_sales_ytd, 2),
+        'totalSalesProjected': round(float(total_sales_projected), 2),
+        'totalPartsCostYTD': round(total_parts_cost_ytd, 2),
+        'totalPartsCostProjected': round(float(total_parts_cost_projected), 2),
+        'dealerships': dealerships_payload(rollups.dealerships),
+        'monthlySales': monthly_sales,
+        'generatedAt': datetime.now().isoformat(),
+        'usingML': sales_model is not None,
+    }
+
+
+# Map dealerships to salespeople
+DEALERSHIP_SALES_MAP = {
+    'New York Dealership': 'Sarah Sales',
+    'Texas Dealership': 'Mike Sales',
+    'Florida Dealership': 'Lisa Sales',
+    'California Dealership': 'Alex Sales',
+    'Illinois Dealership': 'Tom Sales',
+}
+
+
+def paged_response(records, next_cursor, headers=None):
+    """JSON list response with the next page's cursor in X-Next-Cursor."""
+    headers = dict(headers or {})
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+    return json_response(records, headers=headers)
+
+
+def since_revision(data, tables):
+    """Revision to send tables' changes after for the since= query value.
+    
+    None when there is no since= or the client needs the full list (see
+    ChangeLog.revision_since). Raises ValueError for a malformed version.
+    """
+    since = request.args.get('since')
+    if since is None:
+        return None
+    return data.revision_since(*parse_version(since), tables)
+
+
+def sync_headers(data, delta):
+    """X-Data-Version of a list response, plus X-Sync when the client sent since=.
+    
+    X-Sync is 'delta' when the body holds only the changes since that version
+    and 'full' when it is the whole list.
+    """
+    headers = {'X-Data-Version': data.data_version}
+    if 'since' in request.args:
+        headers['X-Sync'] = 'delta' if delta else 'full'
+    return headers
+
+
+def observe_models():
+    """The current data, at a new data version if the models changed since the last call.
+    
+    Parts and orders carry model predictions, so a model swap resyncs them in full.
+    """
+    models.get()
+    return store.observe('models', models.version, ['parts', 'orders'])
+
+
+# Fields of a /api/sales record, in response order
+SALES_FIELDS = ['id', 'dealership', 'model', 'price', 'date', 'customerName', 'salesPerson']
+
+
+def sales_columns(rows, id_codec=None, fields=None):
+    """API fields of a page of compact sales rows, decoded column by column.
+    
+    fields (from parse_fields) limits the result to those fields; the
+    others are never decoded.
+    """
+    fields = fields or SALES_FIELDS
+    ids = decode_ids(rows['id'], id_codec) if {'id', 'customerName'} & set(fields) else None
+    builders = {
+        'id': lambda: ids,
+        'dealership': lambda: rows['dealership'].astype(str).tolist(),
+        'model': lambda: rows['model'].astype(str).tolist(),
+        'price': lambda: rows['price'].round(2).tolist(),
+        'date': lambda: format_days(rows['date']),
+        'customerName': lambda: [f'Customer {sale_id[-4:]}' for sale_id in ids],  # Generate customer name
+        'salesPerson': lambda: rows['dealership'].astype(str).map(DEALERSHIP_SALES_MAP)
+                                                 .fillna('Sarah Sales').tolist(),
+    }
+    return {field: builders[field]() for field in fields}
 
 
 @app.route('/api/sales', methods=['GET'])
 def get_sales():
-    """Get recent sales data."""
-    if sales_df is None:
+    """Get recent sales data.
+    
+    Supports keyset pagination (cursor from the X-Next-Cursor header),
+    from/to date filters, dealership and model filters, a comma-separated
+    fields= projection, and since= (the X-Data-Version of an earlier
+    response) for only the sales added since.
+    """
+    data = store.current
+    if not data.loaded:
         return jsonify({'error': 'Data not loaded'}), 500
     
     try:
-        limit = request.args.get('limit', 50, type=int)
+        args = request.args
+        limit = args.get('limit', 50, type=int)
+        fields = parse_fields(args.get('fields'), SALES_FIELDS)
         
-        # Get most recent sales
-        recent_sales = sales_df.sort_values('date', ascending=False).head(limit)
+        since = since_revision(data, ['sales'])
+        if since is not None and not data.change_log.changed(['sales'], since):
+            return paged_response([], None, sync_headers(data, True))
         
-        # Map dealerships to salespeople
-        dealership_sales_map = {
-            'New York Dealership': 'Sarah Sales',
-            'Texas Dealership': 'Mike Sales',
-            'Florida Dealership': 'Lisa Sales',
-            'California Dealership': 'Alex Sales',
-            'Illinois Dealership': 'Tom Sales',
-        }
+        # Page through the presorted index instead of sorting per request
+        rows, next_cursor = data.sales_index.page(
+            limit,
+            cursor=args.get('cursor'),
+            date_from=args.get('from'),
+            date_to=args.get('to'),
+            filters={'dealership': args.get('dealership'), 'model': args.get('model')},
+            since=since,
+        )
         
-        sales_list = []
-        for _, row in recent_sales.iterrows():
-            dealership = row['dealership']
-            salesperson = dealership_sales_map.get(dealership, 'Sarah Sales')
-            
-            sales_list.append({
-                'id': row['id'],
-                'dealership': dealership,
-                'model': row['model'],
-                'price': round(row['price'], 2),
-                'date': row['date'],
-                'customerName': f"Customer {row['id'][-4:]}",  # Generate customer name
-                'salesPerson': salesperson,
-            })
+        sales_list = to_records(sales_columns(rows, data.id_codecs.get('sales'), fields))
         
-        return jsonify(sales_list)
+        return paged_response(sales_list, next_cursor, sync_headers(data, since is not None))
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return server_error(e)
+
+
+# Warehouse aisle per part category
+LOCATION_PREFIXES = {
+    'Power': 'A',
+    'Drivetrain': 'B',
+    'Electrical': 'C',
+    'Interior': 'D',
+    'Safety': 'E',
+    'Wheels': 'F',
+    'Chassis': 'G',
+    'Climate': 'H',
+}
+
+
+def parts_columns(parts, predicted_demands):
+    """API fields of the current parts inventory, built column by column."""
+    predicted = np.asarray(predicted_demands, dtype=int)
+    recommended_stock = predicted * 2  # Safety factor
+    inventory = parts['inventory_level'].to_numpy()
+    part_ids = parts['part_id'].astype(str)
+    
+    # Location from category and part number: P001 -> 11, P002 -> 12, etc.
+    prefix = parts['category'].astype(str).map(LOCATION_PREFIXES).fillna('X')
+    suffix = (part_ids.str.replace('P', '').astype(int) + 10).astype(str)
+    
+    return {
+        'id': part_ids.tolist(),
+        'name': parts['part_name'].astype(str).tolist(),
+        'sku': parts['sku'].astype(str).tolist(),
+        'category': parts['category'].astype(str).tolist(),
+        'quantity': inventory.tolist(),
+        'price': parts['price'].tolist(),
+        'location': (prefix + '-' + suffix).tolist(),
+        'predictedDemand': predicted.tolist(),
+        'recommendedStock': recommended_stock.tolist(),
+        'needsReorder': (inventory < recommended_stock).tolist(),
+    }
+
+
+def predict_parts_demand(current_parts):
+    """Next month's demand for parts rows, from the loaded models if any."""
+    # Predict for all parts in one batch if model available,
+    # with each category's fleet model where there is one
+    _, parts_model = models.get()
+    fleet = models.fleet()
+    if fleet and fleet.parts:
+        with metrics.stage('inference'):
+            return fleet.parts.predict_demand_batch(current_parts, fallback=parts_model)
+    if parts_model:
+        with metrics.stage('inference'):
+            return parts_model.predict_demand_batch(current_parts)
+    return current_parts['demand'].astype(int).to_numpy()
+
+
+def parts_demand(data):
+    """Predicted demand for data.parts_index.rows, once per data and model version."""
+    models.get()
+    key = (data.version, models.version)
+    with parts_demand_lock:
+        if parts_demand_cache[0] != key:
+            parts_demand_cache[:] = [key, predict_parts_demand(data.parts_index.rows)]
+        return parts_demand_cache[1]
+
+
+def parts_snapshot(data):
+    """The current parts with predicted demand, computed once per data and model version.
+    
+    Records are in the row order of data.parts_index, so lookups pick them by position.
+    """
+    models.get()
+    key = (data.version, models.version)
+    
+    def build_parts():
+        current_parts = data.parts_index.rows
+        predicted_demands = parts_demand(data)
+        with metrics.stage('pandas'):
+            return to_records(parts_columns(current_parts, predicted_demands))
+    
+    return snapshot_cache.get('parts', key, build_parts)
 
 
 @app.route('/api/parts', methods=['GET'])
 def get_parts():
-    """Get parts inventory with demand predictions."""
-    if parts_df is None:
+    """Get parts inventory with demand predictions.
+    
+    With since=, only the parts changed since that data version, unless the
+    latest month or the models changed (X-Sync: full).
+    """
+    if not store.current.loaded:
         return jsonify({'error': 'Data not loaded'}), 500
     
     try:
-        # Get most recent parts data
-        latest_month = parts_df['month'].max()
-        current_parts = parts_df[parts_df['month'] == latest_month]
+        data = observe_models()
+        since = since_revision(data, ['parts'])
+        snapshot = parts_snapshot(data)
+        headers = sync_headers(data, since is not None)
+        if since is None:
+            return snapshot_response(snapshot, headers)
         
-        parts_list = []
-        for _, row in current_parts.iterrows():
-            # Predict next month's demand if model available
-            if parts_model:
-                predicted_demand = parts_model.predict_demand(
-                    current_demand=row['demand'],
-                    sales_volume=row['sales_volume'],
-                    inventory_level=row['inventory_level'],
-                    month=int(latest_month.split('-')[1]),
-                    price=row['price']
-                )
-            else:
-                predicted_demand = int(row['demand'])
-            
-            # Calculate recommended stock level
-            recommended_stock = predicted_demand * 2  # Safety factor
-            
-            # Generate location based on category and part_id
-            location_map = {
-                'Power': 'A',
-                'Drivetrain': 'B', 
-                'Electrical': 'C',
-                'Interior': 'D',
-                'Safety': 'E',
-                'Wheels': 'F',
-                'Chassis': 'G',
-                'Climate': 'H'
-            }
-            
-            category_prefix = location_map.get(row['category'], 'X')
-            location_suffix = str(int(row['part_id'].replace('P', '')) + 10)  # P001 -> 11, P002 -> 12, etc.
-            location = f"{category_prefix}-{location_suffix}"
-            
-            parts_list.append({
-                'id': row['part_id'],
-                'name': row['part_name'],
-                'sku': row['sku'],
-                'category': row['category'],
-                'quantity': row['inventory_level'],
-                'price': row['price'],
-                'location': location,
-                'predictedDemand': predicted_demand,
-                'recommendedStock': recommended_stock,
-                'needsReorder': row['inventory_level'] < recommended_stock,
-            })
+        changed = [snapshot.payload[position] for position in data.parts_index.changed_since(since)]
+        return json_response(changed, headers=headers)
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return server_error(e)
+
+
+@app.route('/api/parts/<sku>', methods=['GET'])
+def get_part(sku):
+    """Look up one part by SKU or part id, e.g. from a barcode scan."""
+    data = store.current
+    if not data.loaded:
+        return jsonify({'error': 'Data not loaded'}), 500
+    
+    try:
+        position = data.parts_index.get(sku)
+        if position is None:
+            return jsonify({'error': f"Unknown part '{sku}'"}), 404
+        return json_response(parts_snapshot(data).payload[position])
+    
+    except Exception as e:
+        return server_error(e)
+
+
+# Largest page of part search results
+MAX_PART_RESULTS = 100
+
+
+@app.route('/api/parts/search', methods=['GET'])
+def search_parts():
+    """Find parts whose name (any word of it) or SKU starts with q."""
+    data = store.current
+    if not data.loaded:
+        return jsonify({'error': 'Data not loaded'}), 500
+    
+    try:
+        args = request.args
+        query = args.get('q', '').strip()
+        limit = args.get('limit', 20, type=int)
+        if not query:
+            return jsonify({'error': 'q is required'}), 400
+        if not 0 < limit <= MAX_PART_RESULTS:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PART_RESULTS}'}), 400
         
-        return jsonify(parts_list)
+        records = parts_snapshot(data).payload
+        return json_response([records[position] for position in data.parts_index.search(query, limit)])
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return server_error(e)
+
+
+# Fields of a /api/service-tickets record, in response order
+TICKET_FIELDS = ['id', 'vehicleModel', 'customerName', 'issue', 'status', 'createdAt',
+                 'assignedMechanic', 'completedAt']
+
+
+def ticket_columns(rows, id_codec=None, fields=None):
+    """API fields of a page of compact service ticket rows, decoded column by column.
+    
+    assignedMechanic and completedAt are None where they do not apply and are
+    dropped from the records. fields limits the result like sales_columns().
+    """
+    fields = fields or TICKET_FIELDS
+    ids = decode_ids(rows['id'], id_codec) if {'id', 'customerName'} & set(fields) else None
+    status = rows['status'].astype(str) if {'status', 'assignedMechanic'} & set(fields) else None
+    builders = {
+        'id': lambda: ids,
+        'vehicleModel': lambda: rows['vehicle_model'].astype(str).tolist(),
+        'customerName': lambda: [f'Customer {ticket_id[-4:]}' for ticket_id in ids],
+        'issue': lambda: rows['issue'].astype(str).tolist(),
+        'status': lambda: status.tolist(),
+        'createdAt': lambda: format_days(rows['created_at']),
+        'assignedMechanic': lambda: np.where(status == 'in_progress', 'Service Team', None).tolist(),
+        'completedAt': lambda: format_days(rows['completed_at']),
+    }
+    return {field: builders[field]() for field in fields}
+
+
+def ticket_records(columns):
+    """Ticket records from ticket_columns(), without the fields that do not apply."""
+    return [
+        {key: value for key, value in ticket.items() if value is not None}
+        for ticket in to_records(columns)
+    ]
 
 
 @app.route('/api/service-tickets', methods=['GET'])
 def get_service_tickets():
-    """Get recent service tickets."""
-    if tickets_df is None:
+    """Get recent service tickets.
+    
+    Supports the same cursor, from/to, fields= and since= parameters as
+    /api/sales, plus status and vehicle_model filters.
+    """
+    data = store.current
+    if not data.loaded:
         return jsonify({'error': 'Data not loaded'}), 500
     
     try:
-        limit = request.args.get('limit', 50, type=int)
+        args = request.args
+        limit = args.get('limit', 50, type=int)
+        fields = parse_fields(args.get('fields'), TICKET_FIELDS)
+        since = since_revision(data, ['tickets'])
+        if since is not None and not data.change_log.changed(['tickets'], since):
+            return paged_response([], None, sync_headers(data, True))
         
-        # Get most recent tickets
-        recent_tickets = tickets_df.sort_values('created_at', ascending=False).head(limit)
+        rows, next_cursor = data.tickets_index.page(
+            limit,
+            cursor=args.get('cursor'),
+            date_from=args.get('from'),
+            date_to=args.get('to'),
+            filters={'status': args.get('status'), 'vehicle_model': args.get('vehicle_model')},
+            since=since,
+        )
         
-        tickets_list = []
-        for _, row in recent_tickets.iterrows():
-            ticket = {
-                'id': row['id'],
-                'vehicleModel': row['vehicle_model'],
-                'customerName': f"Customer {row['id'][-4:]}",
-                'issue': row['issue'],
-                'status': row['status'],
-                'createdAt': row['created_at'],
-            }
-            
-            if row['status'] == 'in_progress':
-                ticket['assignedMechanic'] = 'Service Team'
-            
-            if pd.notna(row['completed_at']):
-                ticket['completedAt'] = row['completed_at']
-            
-            tickets_list.append(ticket)
+        tickets_list = ticket_records(ticket_columns(rows, data.id_codecs.get('tickets'), fields))
         
-        return jsonify(tickets_list)
+        return paged_response(tickets_list, next_cursor, sync_headers(data, since is not None))
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return server_error(e)
+
+
+# Default and largest page of orders served by /api/orders
+DEFAULT_ORDERS = 10
+MAX_ORDERS = 500
 
 
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
-    """Get parts orders."""
-    # Generate some orders based on parts with low inventory
-    if parts_df is None:
+    """Get recommended parts orders, most urgent first.
+    
+    The reorder plan is computed once per data version, model version and day
+    (see reorder_plan.py); requests only pick the top orders from it. Supports
+    limit (default 10), category and priority (critical, high, normal) filters.
+    With since=, the response is empty if the plan is unchanged since that
+    data version and the full list otherwise.
+    """
+    if not store.current.loaded:
         return jsonify({'error': 'Data not loaded'}), 500
     
     try:
-        # Get current parts inventory
-        latest_month = parts_df['month'].max()
-        current_parts = parts_df[parts_df['month'] == latest_month]
+        args = request.args
+        limit = args.get('limit', DEFAULT_ORDERS, type=int)
+        if not 0 < limit <= MAX_ORDERS:
+            return jsonify({'error': f'limit must be between 1 and {MAX_ORDERS}'}), 400
         
-        # Create orders for parts with low inventory
-        orders = []
-        order_id = 1
+        # The plan changes with the parts, the models and the date
+        observe_models()
+        data = store.observe('day', datetime.now().date(), ['orders'])
+        since = since_revision(data, ['orders'])
+        if since is not None and not data.change_log.changed(['parts'], since):
+            return json_response([], headers=sync_headers(data, True))
         
-        for _, row in current_parts.iterrows():
-            if row['inventory_level'] < row['demand'] * 1.5:
-                # Create an order
-                quantity_needed = int(row['demand'] * 2 - row['inventory_level'])
-                
-                if quantity_needed > 0:
-                    order = {
-                        'id': f'O{order_id:04d}',
-                        'parts': [{
-                            'partId': row['part_id'],
-                            'partName': row['part_name'],
-                            'quantity': quantity_needed
-                        }],
-                        'requestedBy': 'Warehouse Team',
-                        'status': np.random.choice(['pending', 'approved', 'shipped']),
-                        'createdAt': (datetime.now() - timedelta(days=np.random.randint(1, 10))).strftime('%Y-%m-%d'),
-                    }
-                    
-                    if order['status'] != 'pending':
-                        delivery_date = datetime.now() + timedelta(days=np.random.randint(1, 7))
-                        order['estimatedDelivery'] = delivery_date.strftime('%Y-%m-%d')
-                    
-                    orders.append(order)
-                    order_id += 1
+        snapshot = reorder_plan(data).snapshot(limit, args.get('category'), args.get('priority'))
+        return snapshot_response(snapshot, sync_headers(data, False))
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return server_error(e)
+
+
+def reorder_plan(data):
+    """The reorder plan for data, reusing the parts demand predicted for /api/parts."""
+    # get() first so the key carries the version the plan will be built with
+    models.get()
+    today = datetime.now().date()
+    key = (data.version, models.version, today)
+    
+    def build_plan():
+        predicted_demands = parts_demand(data)
+        with metrics.stage('pandas'):
+            return ReorderPlan(data.parts_index.rows, predicted_demands, today)
+    
+    return reorder_planner.get(key, build_plan)
+
+
+# Sections of each role's dashboard bundle, in response order
+DASHBOARD_SECTIONS = {
+    'csuite': ['analytics', 'orders'],
+    'sales': ['analytics', 'sales'],
+    'mechanic': ['serviceTickets', 'parts'],
+    'customer-service': ['serviceTickets', 'sales'],
+    'warehouse': ['parts', 'orders'],
+}
+
+# Largest first page of sales or service tickets in a dashboard bundle
+MAX_DASHBOARD_ROWS = 500
+
+
+def build_dashboard(data, role, limit):
+    """One role's bundle, reusing the cached analytics, parts and reorder plan.
+    
+    sales and serviceTickets hold the first page of each list; cursors has the
+    cursor for fetching the next page from /api/sales or /api/service-tickets.
+    """
+    bundle = {'role': role}
+    cursors = {}
+    for section in DASHBOARD_SECTIONS[role]:
+        if section == 'analytics':
+            bundle[section] = analytics_snapshot(data).payload
+        elif section == 'parts':
+            bundle[section] = parts_snapshot(data).payload
+        elif section == 'orders':
+            bundle[section] = reorder_plan(data).snapshot(DEFAULT_ORDERS).payload
+        elif section == 'sales':
+            rows, cursors[section] = data.sales_index.page(limit)
+            with metrics.stage('pandas'):
+                bundle[section] = to_records(sales_columns(rows, data.id_codecs.get('sales')))
+        elif section == 'serviceTickets':
+            rows, cursors[section] = data.tickets_index.page(limit)
+            with metrics.stage('pandas'):
+                bundle[section] = ticket_records(ticket_columns(rows, data.id_codecs.get('tickets')))
+    bundle['cursors'] = cursors
+    return bundle
+
+
+@app.route('/api/dashboard/<role>', methods=['GET'])
+def get_dashboard(role):
+    """Get everything one role's dashboard shows in a single response.
+    
+    Roles: csuite, sales, mechanic, customer-service and warehouse (see
+    DASHBOARD_SECTIONS). Each section matches the default response of its own
+    endpoint; limit (default 50) sizes the sales and service ticket pages.
+    The bundle is cached per data/model version and day and served with an
+    ETag, compressed like the other snapshots.
+    """
+    if role not in DASHBOARD_SECTIONS:
+        return jsonify({'error': f'Unknown role: {role}', 'roles': list(DASHBOARD_SECTIONS)}), 404
+    
+    data = store.current
+    if not data.loaded:
+        return jsonify({'error': 'Data not loaded'}), 500
+    
+    try:
+        limit = request.args.get('limit', 50, type=int)
+        if not 0 < limit <= MAX_DASHBOARD_ROWS:
+            return jsonify({'error': f'limit must be between 1 and {MAX_DASHBOARD_ROWS}'}), 400
+        
+        # get() first so the key carries the version the sections will be built with
+        models.get()
+        key = (data.version, models.version, datetime.now().date(), limit)
+        snapshot = snapshot_cache.get(
+            f'dashboard:{role}', key, lambda: build_dashboard(data, role, limit)
+        )
+        return snapshot_response(snapshot)
+    
+    except Exception as e:
+        return server_error(e)
+
+
+@app.route('/api/ingest', methods=['POST'])
+def ingest():
+    """Append new sales, service tickets and parts inventory rows without a restart.
+    
+    Body: {"sales": [...], "serviceTickets": [...], "parts": [...]}, all optional.
+    The whole batch is applied atomically: requests see either none or all of it.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    
+    try:
+        snapshot, counts = store.ingest(
+            sales=body.get('sales'),
+            tickets=body.get('serviceTickets'),
+            parts=body.get('parts'),
+        )
         
-        return jsonify(orders[:10])  # Return up to 10 orders
+        return jsonify({
+            'ingested': counts,
+            'revision': snapshot.revision,
+            'dataVersion': snapshot.data_version,
+            'dataStats': {
+                'totalSales': len(snapshot.sales),
+                'totalTickets': len(snapshot.tickets),
+            },
+        })
     
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return server_error(e)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Latency histograms, stage timings, counters and cache ratios (Prometheus text format)."""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/debug/slow-requests', methods=['GET'])
+def get_slow_requests():
+    """Sampled stacks of recent slow requests (requires ML_PROFILE_SLOW_MS)."""
+    if profiler is None:
+        return jsonify({'error': 'Set ML_PROFILE_SLOW_MS to enable the slow request profiler'}), 404
+    return jsonify(list(profiler.profiles))
+
+
+# Required in X-Admin-Token for the /admin endpoints, which are disabled without it
+ADMIN_TOKEN = os.environ.get('ML_ADMIN_TOKEN')
+
+
+def admin_denied():
+    """A 403 response unless ML_ADMIN_TOKEN is set and the request carries it."""
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Admin endpoints are disabled; set ML_ADMIN_TOKEN to enable them'}), 403
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({'error': 'Missing or invalid X-Admin-Token'}), 403
+    return None
+
+
+@app.route('/admin/models', methods=['GET'])
+def get_model_versions():
+    """Published, in-memory and active model versions."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    return jsonify(models.registry_status())
+
+
+@app.route('/admin/models/activate', methods=['POST'])
+def activate_model_version():
+    """Load a model version in the background and swap it in when warm.
+    
+    Body: {"version": "v3"}, or no version for the newest published one.
+    The version becomes the registry's CURRENT, so every worker follows.
+    """
+    denied = admin_denied()
+    if denied:
+        return denied
+    
+    body = request.get_json(silent=True) or {}
+    try:
+        swap = models.activate(body.get('version'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'swap': swap, 'registry': models.registry_status()}), 202
+
+
+@app.route('/admin/models/rollback', methods=['POST'])
+def rollback_model_version():
+    """Swap back to the previously active model version (instant while in memory)."""
+    denied = admin_denied()
+    if denied:
+        return denied
+    
+    try:
+        swap = models.rollback()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'swap': swap, 'registry': models.registry_status()}), 202
 
 
 @app.route('/api/metadata', methods=['GET'])
 def get_metadata():
     """Get metadata about the system."""
+    data = store.current
     return jsonify({
-        'metadata': metadata,
+        'metadata': data.metadata,
         'models': {
-            'salesForecast': sales_model is not None,
-            'partsDemand': parts_model is not None,
+            # Reported without triggering a lazy load, so this stays TensorFlow-free
+            'salesForecast': models.ready,
+            'partsDemand': models.ready,
         },
         'dataStats': {
-            'totalSales': len(sales_df) if sales_df is not None else 0,
-            'totalParts': len(parts_df['part_id'].unique()) if parts_df is not None else 0,
-            'totalTickets': len(tickets_df) if tickets_df is not None else 0,
+            'totalSales': len(data.sales) if data.loaded else 0,
+            'totalParts': len(data.parts['part_id'].unique()) if data.loaded else 0,
+            'totalTickets': len(data.tickets) if data.loaded else 0,
         }
     })
 
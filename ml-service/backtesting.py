@@ -0,0 +1,289 @@
+"""
+Walk-forward backtests of the forecasting models.
+Retrains each model at several rolling origins, forecasts past each origin with the
+NumPy serving runtime and scores the forecasts against what actually happened.
+
+Each fold trains in its own spawned process (several at once), so one report
+captures accuracy (MAE, MAPE) together with training time, peak memory and
+per-prediction latency. Reports are JSON and can be compared between commits
+to catch regressions before retrained models are deployed.
+
+    python benchmarks.py backtest --folds 4 --baseline old_report.json
+"""
+
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_store import load_dataset
+from features import parts_demand_training_data
+from training_pipeline import pin_threads
+
+BACKTEST_REPORT_PATH = 'models/backtest_report.json'
+
+# Summary metrics compared between reports
+ACCURACY_METRICS = ['mae', 'mape']
+COST_METRICS = ['train_seconds', 'latency_ms', 'peak_rss_mb']
+
+# Single forward passes timed per fold for the latency figure
+LATENCY_REPEATS = 50
+
+
+def mae(actual, predicted):
+    return float(np.mean(np.abs(np.asarray(actual, dtype=float) - predicted)))
+
+
+def mape(actual, predicted):
+    """Mean absolute percentage error over the non-zero actuals."""
+    actual = np.asarray(actual, dtype=float)
+    nonzero = actual != 0
+    if not nonzero.any():
+        return None
+    return float(np.mean(np.abs((actual[nonzero] - predicted[nonzero]) / actual[nonzero])) * 100)
+
+
+def peak_rss_mb():
+    """Peak RSS of this process; each fold runs in a fresh process, so this is the fold's."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def median_latency_ms(call):
+    """Median wall time of call() in milliseconds over LATENCY_REPEATS runs."""
+    times = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times) * 1000)
+
+
+def _import_training():
+    """Import the Keras models with this process's TensorFlow thread settings.
+
+    Seeds Keras too, so a fold trains the same way in every run and reports
+    differ only where the code did.
+    """
+    from model_loader import configure_tensorflow_threads
+    configure_tensorflow_threads()
+    import train_models
+    train_models.keras.utils.set_random_seed(42)
+    return train_models
+
+
+def sales_fold(origin, horizon, epochs):
+    """Train on monthly totals before origin and forecast the next horizon months."""
+    train_models = _import_training()
+    from inference_runtime import NumpySalesForecastModel
+
+    monthly = load_dataset('monthly_aggregates')[['total_sales']].reset_index(drop=True)
+    history = monthly.iloc[:origin]
+    actual = monthly['total_sales'].iloc[origin:origin + horizon].to_numpy(dtype=float)
+
+    start = time.perf_counter()
+    model = train_models.SalesForecastModel(lookback=6)
+    history_info = model.train(history, epochs=epochs, verbose=0)
+    train_seconds = time.perf_counter() - start
+
+    # Score what would be deployed: the exported NumPy artifact
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sales.npz')
+        model.export(path)
+        served = NumpySalesForecastModel()
+        served.load(path)
+
+    start = time.perf_counter()
+    predicted = served.predict_next_months(history, n_months=horizon)
+    predict_seconds = time.perf_counter() - start
+
+    window = served.scaler.transform(history[['total_sales']])[-served.lookback:]
+    x = window.reshape(1, served.lookback, 1)
+
+    return {
+        'origin': int(origin),
+        'train_rows': len(history),
+        'test_points': len(actual),
+        'mae': mae(actual, predicted),
+        'mape': mape(actual, predicted),
+        'epochs': len(history_info.history['loss']),
+        'train_seconds': train_seconds,
+        'predict_seconds': predict_seconds,
+        'latency_ms': median_latency_ms(lambda: served.model.predict(x)),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def parts_fold(origin_month, epochs):
+    """Train on parts history up to origin_month and predict the following month."""
+    train_models = _import_training()
+    from inference_runtime import NumpyPartsDemandModel
+
+    parts = load_dataset('parts_inventory')
+    months = parts['month'].astype(str)
+    history = parts[months <= origin_month]
+
+    # Actual demand of each part in the month after the origin
+    current = parts[months == origin_month]
+    next_month = str(pd.Period(origin_month, freq='M') + 1)
+    actual = current[['part_id']].merge(
+        parts.loc[months == next_month, ['part_id', 'demand']], on='part_id', how='left'
+    )['demand']
+    has_actual = actual.notna().to_numpy()
+    current = current[has_actual]
+    actual = actual[has_actual].to_numpy(dtype=float)
+
+    start = time.perf_counter()
+    model = train_models.PartsDemandModel()
+    history_info = model.train(features=parts_demand_training_data(history), epochs=epochs, verbose=0)
+    train_seconds = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'parts.npz')
+        model.export(path)
+        served = NumpyPartsDemandModel()
+        served.load(path)
+
+    start = time.perf_counter()
+    predicted = served.predict_demand_batch(current)
+    predict_seconds = time.perf_counter() - start
+
+    first = current.iloc[:1]
+
+    return {
+        'origin': origin_month,
+        'train_rows': len(history),
+        'test_points': len(actual),
+        'mae': mae(actual, predicted),
+        'mape': mape(actual, predicted),
+        'epochs': len(history_info.history['loss']),
+        'train_seconds': train_seconds,
+        'predict_seconds': predict_seconds,
+        'latency_ms': median_latency_ms(lambda: served.predict_demand_batch(first)),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def fold_plan(folds, horizon, step):
+    """(model, fold function, args) for every fold, oldest origin first per model."""
+    n_months = len(load_dataset('monthly_aggregates'))
+    sales_origins = [n_months - horizon - step * (folds - 1 - i) for i in range(folds)]
+    if sales_origins[0] < 12:
+        raise ValueError(f"Not enough monthly history for {folds} folds of step {step}")
+
+    # Parts origins need a following month to score against
+    part_months = sorted(load_dataset('parts_inventory')['month'].astype(str).unique())
+    parts_indexes = [len(part_months) - 2 - step * (folds - 1 - i) for i in range(folds)]
+    if parts_indexes[0] < 6:
+        raise ValueError(f"Not enough parts history for {folds} folds of step {step}")
+    parts_origins = [part_months[i] for i in parts_indexes]
+
+    return (
+        [('sales', sales_fold, (origin, horizon)) for origin in sales_origins]
+        + [('parts', parts_fold, (origin,)) for origin in parts_origins]
+    )
+
+
+def summarize(folds):
+    """Model-level summary over its folds."""
+    mapes = [fold['mape'] for fold in folds if fold['mape'] is not None]
+    return {
+        'folds': len(folds),
+        'mae': float(np.mean([fold['mae'] for fold in folds])),
+        'mape': float(np.mean(mapes)) if mapes else None,
+        'train_seconds': float(np.mean([fold['train_seconds'] for fold in folds])),
+        'latency_ms': float(np.median([fold['latency_ms'] for fold in folds])),
+        'peak_rss_mb': float(max(fold['peak_rss_mb'] for fold in folds)),
+    }
+
+
+def git_commit():
+    """Current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_backtest(folds=4, horizon=3, step=3, epochs=100, workers=None):
+    """Run every fold, in up to `workers` processes, and return the report."""
+    plan = fold_plan(folds, horizon, step)
+    workers = workers or min(len(plan), multiprocessing.cpu_count())
+    threads_per_worker = max(1, multiprocessing.cpu_count() // workers)
+    print(f"Backtesting {len(plan)} folds in {workers} processes "
+          f"({threads_per_worker} TensorFlow threads each)...")
+
+    start = time.perf_counter()
+    # One fresh spawned process per fold, so peak memory is per fold
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=pin_threads,
+        initargs=(threads_per_worker,),
+        max_tasks_per_child=1,
+    ) as executor:
+        futures = [
+            (name, executor.submit(fold, *args, epochs=epochs)) for name, fold, args in plan
+        ]
+        results = {}
+        for name, future in futures:
+            results.setdefault(name, []).append(future.result())
+            fold = results[name][-1]
+            print(f"✓ {name} fold at {fold['origin']}: MAE {fold['mae']:.2f}, "
+                  f"trained in {fold['train_seconds']:.1f}s")
+    wall_seconds = time.perf_counter() - start
+
+    return {
+        'generated_at': pd.Timestamp.now().isoformat(),
+        'commit': git_commit(),
+        'config': {
+            'folds': folds,
+            'horizon': horizon,
+            'step': step,
+            'epochs': epochs,
+            'workers': workers,
+            'cpus': multiprocessing.cpu_count(),
+        },
+        'wall_seconds': wall_seconds,
+        'models': {
+            name: {'summary': summarize(model_folds), 'folds': model_folds}
+            for name, model_folds in results.items()
+        },
+    }
+
+
+def write_report(report, path=BACKTEST_REPORT_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+
+def compare_reports(baseline, report, accuracy_tolerance=0.05, cost_tolerance=0.25):
+    """Summary metrics that got worse than baseline by more than the tolerance.
+
+    Tolerances are relative (0.05 = 5% worse). Returns a list of
+    (model, metric, baseline value, new value, relative change).
+    """
+    regressions = []
+    for name, model in report['models'].items():
+        old = baseline.get('models', {}).get(name)
+        if old is None:
+            continue
+        for metric in ACCURACY_METRICS + COST_METRICS:
+            before, after = old['summary'].get(metric), model['summary'].get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            tolerance = accuracy_tolerance if metric in ACCURACY_METRICS else cost_tolerance
+            if change > tolerance:
+                regressions.append((name, metric, before, after, change))
+    return regressions
@@ -0,0 +1,180 @@
+"""
+Micro-batching of model forward passes across concurrent requests.
+Requests arriving within a short window share one batched predict() call.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Upper bounds (in requests per batch) of the batch size histogram
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+
+
+class MicroBatcher:
+    """Collects prediction requests and runs them as batched forward passes.
+
+    A scheduler thread takes the first queued request, waits up to
+    max_wait_ms for more, up to max_batch_size rows in total, then calls
+    predict_fn once on the concatenated inputs and hands each caller its
+    slice. A single request larger than max_batch_size runs on its own.
+
+    The thread is started on first use and restarted after fork, so a
+    batcher created before gunicorn forks its workers works in each of them.
+    close() stops it; later calls then run predict_fn directly.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=256, max_wait_ms=1.0, name='batcher'):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.name = name
+
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.max_batch_requests = 0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._closed = False
+
+    def _ensure_started(self):
+        # Called with self._lock held
+        if self._pid == os.getpid():
+            return
+        self._queue = queue.Queue()
+        thread = threading.Thread(target=self._run, args=(self._queue,),
+                                  name=self.name, daemon=True)
+        thread.start()
+        self._pid = os.getpid()
+
+    def submit(self, inputs):
+        """Queue a batch of inputs (first axis = rows); returns a Future of the outputs."""
+        inputs = np.asarray(inputs)
+        future = Future()
+        with self._lock:
+            if not self._closed:
+                self._ensure_started()
+                self._queue.put((inputs, future))
+                return future
+
+        # A request that took the model just before it was closed runs on its own
+        try:
+            future.set_result(self.predict_fn(inputs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def close(self):
+        """Stop the scheduler thread after the queued requests, releasing predict_fn's model."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._pid == os.getpid():
+                self._queue.put(None)
+
+    def predict(self, inputs, timeout=None):
+        """Run inputs through the next batch and wait for their outputs."""
+        return self.submit(inputs).result(timeout)
+
+    def _run(self, pending):
+        # None on the queue (from close()) ends the thread
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            batch = [item]
+            rows = len(item[0])
+            deadline = time.perf_counter() + self.max_wait
+
+            closing = False
+            while rows < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = pending.get(timeout=remaining) if remaining > 0 else pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            self._execute(batch, rows)
+            if closing:
+                return
+
+    def _execute(self, batch, rows):
+        # Requests with a different input shape (e.g. sequence length) run separately
+        groups = {}
+        for inputs, future in batch:
+            groups.setdefault(inputs.shape[1:], []).append((inputs, future))
+
+        for items in groups.values():
+            try:
+                outputs = self.predict_fn(np.concatenate([inputs for inputs, _ in items]))
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for inputs, future in items:
+                future.set_result(outputs[offset:offset + len(inputs)])
+                offset += len(inputs)
+
+        self._record(len(batch), rows)
+
+    def _record(self, n_requests, rows):
+        with self._lock:
+            self.batches += 1
+            self.requests += n_requests
+            self.rows += rows
+            self.max_batch_requests = max(self.max_batch_requests, n_requests)
+            bucket = int(np.searchsorted(BATCH_SIZE_BUCKETS, n_requests))
+            self.batch_size_counts[bucket] += 1
+
+    def stats(self):
+        """Queue depth and batch size metrics."""
+        labels = [f'<={bound}' for bound in BATCH_SIZE_BUCKETS] + [f'>{BATCH_SIZE_BUCKETS[-1]}']
+        return {
+            'queueDepth': self._queue.qsize() if self._pid == os.getpid() else 0,
+            'batches': self.batches,
+            'requests': self.requests,
+            'rows': self.rows,
+            'meanBatchRequests': round(self.requests / self.batches, 2) if self.batches else 0,
+            'maxBatchRequests': self.max_batch_requests,
+            'batchSizes': dict(zip(labels, self.batch_size_counts)),
+            'maxBatchSize': self.max_batch_size,
+            'maxWaitMs': self.max_wait * 1000,
+        }
+
+
+class BatchedModel:
+    """Drop-in for a model's Keras-style predict() that goes through a MicroBatcher."""
+
+    def __init__(self, model, max_batch_size=256, max_wait_ms=1.0, name='batcher'):
+        self.model = model
+        self.batcher = MicroBatcher(
+            lambda x: model.predict(x, batch_size=1024, verbose=0),
+            max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms,
+            name=name,
+        )
+
+    def predict(self, x, batch_size=None, verbose=0):
+        return self.batcher.predict(x)
+
+    def close(self):
+        self.batcher.close()
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
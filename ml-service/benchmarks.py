@@ -0,0 +1,806 @@
+"""
+Performance benchmarks for the E Corp ML service.
+Compares optimized code paths against the original implementations on synthetic data.
+
+Usage:
+    python benchmarks.py analytics --rows 100000 1000000 --dealerships 5 100 500
+    python benchmarks.py runtime
+    python benchmarks.py features --parts 10000 --years 10
+    python benchmarks.py batching --clients 1 8 32 --runtime keras
+    python benchmarks.py serialization --rows 1000000 --limits 50 1000 10000 100000
+    python benchmarks.py fleet --members 5 100 1000 --months 12
+    python benchmarks.py backtest --folds 4 --baseline models/backtest_report.json
+    python benchmarks.py cube --rows 100000 1000000 --dealerships 5 100
+    python benchmarks.py memory --rows 1000000
+    python benchmarks.py delta --rows 1000000 --changed 0 10 1000
+    python benchmarks.py ingest --rows 100000 1000000 --batch 1 100 10000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics import compute_rollups
+from backtesting import BACKTEST_REPORT_PATH, compare_reports, run_backtest, write_report
+from batching import BatchedModel
+from change_log import VERSION_COLUMN, with_row_version
+from compact import append_rows, compact_rows, compact_table, encode_days
+from data_store import dataset_path, load_dataset
+from features import parts_demand_training_data
+from inference_runtime import SALES_ARTIFACT_PATH, MinMaxTransform, NumpySequential, load_artifact
+from model_fleet import SalesFleet, StackedSequential, stack_members
+from pagination import SortedTable, to_records
+from sales_cube import SalesCube
+from serialization import ENCODER, dumps
+
+
+def timed(fn, *args, repeat=3):
+    """Best-of-repeat wall time of fn(*args) in seconds, plus its last result."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+# ---------------------------------------------------------------------------
+# Analytics rollups
+# ---------------------------------------------------------------------------
+
+def synthetic_analytics_data(n_rows, n_dealerships, year, seed=42):
+    """Synthetic sales rows and dealership metrics shaped like the real datasets."""
+    rng = np.random.default_rng(seed)
+
+    # Spread sales over the previous and current year
+    years = rng.choice([year - 1, year], size=n_rows)
+    months = rng.integers(1, 13, size=n_rows)
+    dealer_idx = rng.integers(0, n_dealerships, size=n_rows)
+    dealer_names = np.array([f'Dealership {i:04d}' for i in range(n_dealerships)])
+
+    sales_df = pd.DataFrame({
+        'dealership': dealer_names[dealer_idx],
+        'price': rng.uniform(30000, 100000, size=n_rows).round(2),
+        'month': [f'{y}-{m:02d}' for y, m in zip(years, months)],
+        'year': years,
+    })
+
+    # Compact day numbers (first of the month) for the served representation
+    sales_df['date'] = encode_days(pd.to_datetime(sales_df['month']))
+
+    dealership_df = sales_df.groupby(['month', 'dealership'], as_index=False).agg(
+        sales_amount=('price', 'sum'),
+        units_sold=('price', 'size'),
+    )
+    dealership_df['location'] = 'City ' + dealership_df['dealership'].str[-4:]
+    dealership_df['parts_cost'] = dealership_df['sales_amount'] * 0.225
+
+    return sales_df, dealership_df
+
+
+def legacy_rollups(sales_df, dealership_df, year):
+    """Per-dealership and per-month loops as originally written in get_analytics."""
+    total_sales_ytd = sales_df[sales_df['year'] == year]['price'].sum()
+
+    dealerships = []
+    for dealership_name in dealership_df['dealership'].unique():
+        dealer_data = dealership_df[dealership_df['dealership'] == dealership_name]
+        ytd_dealer = dealer_data[dealer_data['month'].str.startswith(str(year))]
+
+        sales_ytd = ytd_dealer['sales_amount'].sum()
+        parts_cost_ytd = ytd_dealer['parts_cost'].sum()
+        months_elapsed = len(ytd_dealer)
+        months_remaining = 12 - months_elapsed
+
+        if months_elapsed > 0:
+            projected_sales = sales_ytd + (sales_ytd / months_elapsed * months_remaining * 1.1)
+        else:
+            projected_sales = sales_ytd
+
+        dealerships.append((dealership_name, sales_ytd, projected_sales, parts_cost_ytd))
+
+    monthly_sales = []
+    for month in range(1, 13):
+        month_data = sales_df[sales_df['month'] == f'{year}-{month:02d}']
+        monthly_sales.append(month_data['price'].sum() if len(month_data) > 0 else 0)
+
+    return total_sales_ytd, dealerships, np.array(monthly_sales)
+
+
+def check_rollups_match(legacy, rollups):
+    """Raise if the vectorized rollups disagree with the legacy loops."""
+    total_sales_ytd, dealerships, monthly_sales = legacy
+
+    assert np.isclose(total_sales_ytd, rollups.total_sales_ytd)
+    assert np.allclose(monthly_sales, rollups.monthly_sales)
+    assert [d[0] for d in dealerships] == list(rollups.dealerships.index)
+    assert np.allclose([d[1] for d in dealerships], rollups.dealerships['sales_ytd'])
+    assert np.allclose([d[2] for d in dealerships], rollups.dealerships['sales_projected'])
+    assert np.allclose([d[3] for d in dealerships], rollups.dealerships['parts_cost_ytd'])
+
+
+def bench_analytics(args):
+    """Time legacy loops against the groupby engine as data grows."""
+    year = 2025
+    print(f"{'rows':>10} {'dealers':>8} {'legacy (s)':>11} {'groupby (s)':>12} {'speedup':>8}")
+
+    for n_rows in args.rows:
+        for n_dealerships in args.dealerships:
+            sales_df, dealership_df = synthetic_analytics_data(n_rows, n_dealerships, year)
+
+            legacy_time, legacy = timed(legacy_rollups, sales_df, dealership_df, year,
+                                        repeat=args.repeat)
+            new_time, rollups = timed(compute_rollups, sales_df, dealership_df, year,
+                                      repeat=args.repeat)
+            check_rollups_match(legacy, rollups)
+
+            print(f"{n_rows:>10} {n_dealerships:>8} {legacy_time:>11.4f} "
+                  f"{new_time:>12.4f} {legacy_time / new_time:>7.1f}x")
+
+
+# ---------------------------------------------------------------------------
+# Serving runtimes: Keras vs NumPy
+# ---------------------------------------------------------------------------
+
+def load_runtime_models(runtime):
+    """Load the sales and parts models for the 'keras' or 'numpy' runtime."""
+    if runtime == 'keras':
+        from train_models import SalesForecastModel, PartsDemandModel
+        sales_model, parts_model = SalesForecastModel(), PartsDemandModel()
+    else:
+        from inference_runtime import NumpySalesForecastModel, NumpyPartsDemandModel
+        sales_model, parts_model = NumpySalesForecastModel(), NumpyPartsDemandModel()
+
+    sales_model.load()
+    parts_model.load()
+    return sales_model, parts_model
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    # VmHWM is reset on exec, unlike ru_maxrss which children inherit on Linux
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def runtime_memory(runtime):
+    """Peak RSS in MB of a fresh process that loads a runtime and predicts once."""
+    code = (
+        'import benchmarks\n'
+        'from data_store import load_dataset\n'
+        'monthly = load_dataset("monthly_aggregates")\n'
+        f'sales_model, _ = benchmarks.load_runtime_models("{runtime}")\n'
+        'sales_model.predict_next_months(monthly.tail(12), n_months=3)\n'
+        'print(benchmarks.peak_rss_mb())\n'
+    )
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                            text=True, check=True).stdout
+    return float(output.split()[-1])
+
+
+def bench_runtime(args):
+    """Compare per-call latency and memory of the Keras and NumPy runtimes."""
+    monthly = load_dataset('monthly_aggregates')
+    parts = load_dataset('parts_inventory')
+    recent = monthly.tail(12)
+    latest_parts = parts[parts['month'] == parts['month'].max()]
+
+    keras_sales, keras_parts = load_runtime_models('keras')
+    numpy_sales, numpy_parts = load_runtime_models('numpy')
+
+    print(f"{'call':<34} {'keras (ms)':>11} {'numpy (ms)':>11} {'speedup':>8}")
+    cases = [
+        ('predict_next_months(n=3)',
+         lambda m: m[0].predict_next_months(recent, n_months=3)),
+        ('predict_demand (single row)',
+         lambda m: m[1].predict_demand(50, 100, 75, 10, 8500)),
+        (f'predict_demand_batch ({len(latest_parts)} rows)',
+         lambda m: m[1].predict_demand_batch(latest_parts)),
+        (f'predict_demand_batch ({len(parts)} rows)',
+         lambda m: m[1].predict_demand_batch(parts)),
+    ]
+    for name, call in cases:
+        keras_time, _ = timed(call, (keras_sales, keras_parts), repeat=args.repeat)
+        numpy_time, _ = timed(call, (numpy_sales, numpy_parts), repeat=args.repeat)
+        print(f"{name:<34} {keras_time * 1000:>11.3f} {numpy_time * 1000:>11.3f} "
+              f"{keras_time / numpy_time:>7.1f}x")
+
+    print("\nPeak RSS after loading and one forecast (fresh process)")
+    for runtime in ('keras', 'numpy'):
+        print(f"  {runtime:<6} {runtime_memory(runtime):>8.1f} MB")
+
+
+# ---------------------------------------------------------------------------
+# Parts demand training features
+# ---------------------------------------------------------------------------
+
+def synthetic_parts_history(n_parts, n_years, seed=42):
+    """Synthetic parts_inventory history with one row per part and month."""
+    rng = np.random.default_rng(seed)
+    months = [f'{2015 + m // 12}-{m % 12 + 1:02d}' for m in range(n_years * 12)]
+    n_rows = n_parts * len(months)
+
+    parts = pd.DataFrame({
+        'month': np.tile(months, n_parts),
+        'part_id': np.repeat([f'P{i:05d}' for i in range(n_parts)], len(months)),
+        'demand': rng.integers(1, 500, size=n_rows),
+        'inventory_level': rng.integers(0, 800, size=n_rows),
+        'price': np.repeat(rng.integers(100, 15000, size=n_parts), len(months)),
+        'sales_volume': rng.integers(50, 300, size=n_rows),
+    })
+    # Shuffle so the pipeline has to do the per-part month ordering itself
+    return parts.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def legacy_parts_training_data(parts_data):
+    """Per-part .iloc loop as originally written in PartsDemandModel.prepare_data."""
+    features = []
+    targets = []
+
+    for part_id in parts_data['part_id'].unique():
+        part_data = parts_data[parts_data['part_id'] == part_id].sort_values('month')
+
+        for i in range(len(part_data) - 1):
+            row = part_data.iloc[i]
+            next_row = part_data.iloc[i + 1]
+            month_num = int(row['month'].split('-')[1])
+
+            features.append([
+                row['demand'],
+                row['sales_volume'],
+                row['inventory_level'],
+                month_num,
+                row['price']
+            ])
+            targets.append(next_row['demand'])
+
+    return np.array(features), np.array(targets).reshape(-1, 1)
+
+
+def bench_features(args):
+    """Check the vectorized pipeline against the loop and time both."""
+    # Equivalence on the real dataset and on a synthetic subset
+    real = load_dataset('parts_inventory')
+    subset = synthetic_parts_history(args.legacy_parts, args.years)
+    for name, data in (('parts_inventory', real), ('synthetic subset', subset)):
+        legacy_X, legacy_y = legacy_parts_training_data(data)
+        X, y = parts_demand_training_data(data)
+        assert np.array_equal(legacy_X, X) and np.array_equal(legacy_y, y)
+        print(f"Equivalent X/y on {name} ({len(X)} samples)")
+
+    legacy_time, _ = timed(legacy_parts_training_data, subset, repeat=1)
+    per_part = legacy_time / args.legacy_parts
+
+    full = synthetic_parts_history(args.parts, args.years)
+    new_time, (X, _) = timed(parts_demand_training_data, full, repeat=args.repeat)
+
+    print(f"\n{args.parts} parts x {args.years} years ({len(full):,} rows, {len(X):,} samples)")
+    print(f"  legacy loop:  {per_part * args.parts:>9.2f} s "
+          f"(extrapolated from {args.legacy_parts} parts, {legacy_time:.2f} s)")
+    print(f"  vectorized:   {new_time:>9.2f} s")
+    print(f"  speedup:      {per_part * args.parts / new_time:>9.0f}x")
+
+
+# ---------------------------------------------------------------------------
+# Micro-batching of concurrent predictions
+# ---------------------------------------------------------------------------
+
+def concurrent_throughput(call, n_clients, calls_per_client):
+    """Calls per second when n_clients threads each make calls_per_client calls."""
+    def client():
+        for _ in range(calls_per_client):
+            call()
+
+    threads = [threading.Thread(target=client) for _ in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return n_clients * calls_per_client / (time.perf_counter() - start)
+
+
+def bench_batching(args):
+    """Single-row parts predictions from concurrent clients, direct vs micro-batched."""
+    _, parts_model = load_runtime_models(args.runtime)
+    network = parts_model.model
+    batched = BatchedModel(network, max_batch_size=args.max_batch_size,
+                           max_wait_ms=args.max_wait_ms)
+
+    features = parts_model.scaler_X.transform(np.array([[50, 100, 75, 10, 8500]]))
+    assert np.allclose(network.predict(features, verbose=0), batched.predict(features))
+
+    print(f"{args.runtime} runtime, max batch {args.max_batch_size}, "
+          f"max wait {args.max_wait_ms:g} ms")
+    print(f"{'clients':>8} {'direct (req/s)':>15} {'batched (req/s)':>16} {'speedup':>8} "
+          f"{'mean batch':>11}")
+    for n_clients in args.clients:
+        direct = concurrent_throughput(
+            lambda: network.predict(features, verbose=0), n_clients, args.calls
+        )
+        before = batched.batcher.stats()
+        with_batching = concurrent_throughput(
+            lambda: batched.predict(features), n_clients, args.calls
+        )
+        after = batched.batcher.stats()
+        mean_batch = ((after['requests'] - before['requests'])
+                      / max(after['batches'] - before['batches'], 1))
+        print(f"{n_clients:>8} {direct:>15.0f} {with_batching:>16.0f} "
+              f"{with_batching / direct:>7.1f}x {mean_batch:>11.1f}")
+
+
+# ---------------------------------------------------------------------------
+# List endpoint serialization
+# ---------------------------------------------------------------------------
+
+def synthetic_sales(n_rows, seed=42):
+    """Synthetic sales_history rows with the served schema."""
+    rng = np.random.default_rng(seed)
+    dealerships = ['New York Dealership', 'Texas Dealership', 'Florida Dealership',
+                   'California Dealership', 'Illinois Dealership']
+    models = ['E-Sedan Pro', 'E-SUV Elite', 'E-Compact City', 'E-Truck Power', 'E-Sports GT']
+    return pd.DataFrame({
+        'id': [f'SL{i:07d}' for i in range(1, n_rows + 1)],
+        'date': pd.Timestamp('2015-01-01') + pd.to_timedelta(
+            np.sort(rng.integers(0, 3650, size=n_rows)), unit='D'),
+        'dealership': pd.Categorical(rng.choice(dealerships, size=n_rows)),
+        'model': pd.Categorical(rng.choice(models, size=n_rows)),
+        'price': rng.uniform(30000, 100000, size=n_rows),
+    })
+
+
+def legacy_sales_body(sales_df, limit):
+    """sort_values + iterrows + jsonify as originally written in get_sales."""
+    recent_sales = sales_df.sort_values('date', ascending=False).head(limit)
+    dealership_sales_map = {
+        'New York Dealership': 'Sarah Sales',
+        'Texas Dealership': 'Mike Sales',
+        'Florida Dealership': 'Lisa Sales',
+        'California Dealership': 'Alex Sales',
+        'Illinois Dealership': 'Tom Sales',
+    }
+
+    sales_list = []
+    for _, row in recent_sales.iterrows():
+        dealership = row['dealership']
+        sales_list.append({
+            'id': row['id'],
+            'dealership': dealership,
+            'model': row['model'],
+            'price': round(row['price'], 2),
+            'date': row['date'].strftime('%Y-%m-%d'),
+            'customerName': f"Customer {row['id'][-4:]}",
+            'salesPerson': dealership_sales_map.get(dealership, 'Sarah Sales'),
+        })
+
+    # Flask's default JSON provider: json.dumps with sorted keys
+    return json.dumps(sales_list, sort_keys=True).encode('utf-8')
+
+
+def bench_serialization(args):
+    """Time /api/sales body construction: legacy loop vs presorted columns."""
+    # app.py loads the datasets on import; keep the models out of it
+    os.environ.setdefault('ML_MODEL_LOADING', 'lazy')
+    from app import sales_columns
+
+    sales_df = synthetic_sales(args.rows)
+    compact_sales, id_codec = compact_table(sales_df, 'sales')
+    index = SortedTable(compact_sales, 'date', 'id', id_codec=id_codec)
+
+    def columnar_body(limit):
+        rows, _ = index.page(limit)
+        return dumps(to_records(sales_columns(rows, id_codec)))
+
+    print(f"{args.rows:,} sales rows, JSON encoder: {ENCODER}")
+    print(f"{'limit':>8} {'legacy (ms)':>12} {'columnar (ms)':>14} {'speedup':>8}")
+    for limit in args.limits:
+        legacy_time, legacy = timed(legacy_sales_body, sales_df, limit, repeat=args.repeat)
+        new_time, body = timed(columnar_body, limit, repeat=args.repeat)
+
+        # Same records; rows sharing a date are now ordered by id, so only
+        # the oldest date in the page (cut off by the limit) may differ
+        legacy_records, records = json.loads(legacy), json.loads(body)
+        oldest = records[-1]['date']
+        key = lambda record: (record['date'], record['id'])
+        assert len(legacy_records) == len(records)
+        assert (sorted((r for r in legacy_records if r['date'] != oldest), key=key)
+                == sorted((r for r in records if r['date'] != oldest), key=key))
+
+        print(f"{limit:>8} {legacy_time * 1000:>12.2f} {new_time * 1000:>14.2f} "
+              f"{legacy_time / new_time:>7.1f}x")
+
+
+# ---------------------------------------------------------------------------
+# Model fleet
+# ---------------------------------------------------------------------------
+
+def synthetic_fleet(n_members, seed=42):
+    """n_members perturbed copies of the exported sales network, per-member and stacked."""
+    config, base, _ = load_artifact(SALES_ARTIFACT_PATH)
+    rng = np.random.default_rng(seed)
+
+    member_specs = [
+        (base.layers, [[w + rng.normal(0, 0.01, w.shape).astype(np.float32) for w in layer]
+                       for layer in base.weights])
+        for _ in range(n_members)
+    ]
+    layers, weights = stack_members(member_specs)
+    return config['lookback'], [NumpySequential(*spec) for spec in member_specs], \
+        StackedSequential(layers, weights)
+
+
+def per_member_forecasts(networks, windows, n_months):
+    """Autoregressive forecasts with one forward pass per member per month."""
+    forecasts = np.empty((len(networks), n_months))
+    for k, network in enumerate(networks):
+        buffer = list(windows[k])
+        for step in range(n_months):
+            x = np.array(buffer[-len(windows[k]):]).reshape(1, -1, 1)
+            buffer.append(float(network.predict(x)[0, 0]))
+        forecasts[k] = buffer[len(windows[k]):]
+    return forecasts
+
+
+def bench_fleet(args):
+    """Per-dealership forecasts: N separate networks vs one stacked fleet pass."""
+    print(f"{args.months}-month forecasts per member")
+    print(f"{'members':>8} {'separate (ms)':>14} {'stacked (ms)':>13} {'speedup':>8} "
+          f"{'weights (MB)':>13}")
+    for n_members in args.members:
+        lookback, networks, stacked = synthetic_fleet(n_members)
+        rng = np.random.default_rng(0)
+        windows = rng.uniform(0, 1, size=(n_members, lookback))
+
+        # Identity scalers so both paths forecast the same scaled series
+        identity = MinMaxTransform(np.zeros((n_members, 1)), np.ones((n_members, 1)))
+        fleet = SalesFleet(range(n_members), stacked, identity, lookback)
+        series = pd.DataFrame(windows)
+
+        separate_time, separate = timed(
+            per_member_forecasts, networks, windows, args.months, repeat=args.repeat
+        )
+        stacked_time, forecasts = timed(fleet.forecast, series, args.months, repeat=args.repeat)
+        stacked_result = np.array([forecasts[k] for k in range(n_members)])
+        assert np.allclose(separate, stacked_result, atol=1e-4)
+
+        weight_mb = sum(w.nbytes for layer in stacked.weights for w in layer) / 1e6
+        print(f"{n_members:>8} {separate_time * 1000:>14.2f} {stacked_time * 1000:>13.2f} "
+              f"{separate_time / stacked_time:>7.1f}x {weight_mb:>13.2f}")
+
+
+# ---------------------------------------------------------------------------
+# Walk-forward backtest
+# ---------------------------------------------------------------------------
+
+def bench_backtest(args):
+    """Rolling-origin accuracy and cost of both models, optionally against a baseline."""
+    # Read the baseline first: it may be the file this run overwrites
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = run_backtest(args.folds, args.horizon, args.step, args.epochs, args.workers)
+    write_report(report, args.output)
+
+    print(f"\n{'model':<8} {'folds':>6} {'MAE':>12} {'MAPE %':>8} {'train (s)':>10} "
+          f"{'latency (ms)':>13} {'peak RSS (MB)':>14}")
+    for name, model in report['models'].items():
+        summary = model['summary']
+        mape = f"{summary['mape']:.2f}" if summary['mape'] is not None else '-'
+        print(f"{name:<8} {summary['folds']:>6} {summary['mae']:>12.2f} {mape:>8} "
+              f"{summary['train_seconds']:>10.2f} {summary['latency_ms']:>13.3f} "
+              f"{summary['peak_rss_mb']:>14.1f}")
+    print(f"\nWall time {report['wall_seconds']:.1f}s, report written to {args.output}")
+
+    if baseline is None:
+        return
+    regressions = compare_reports(baseline, report, args.accuracy_tolerance, args.cost_tolerance)
+    print(f"\nCompared with {args.baseline} (commit {baseline.get('commit') or 'unknown'})")
+    for name, metric, before, after, change in regressions:
+        print(f"⚠ {name} {metric}: {before:.3f} -> {after:.3f} ({change:+.1%})")
+    if regressions:
+        sys.exit(1)
+    print("✓ No regressions")
+
+
+# ---------------------------------------------------------------------------
+# Sales cube
+# ---------------------------------------------------------------------------
+
+def synthetic_cube_sales(n_rows, n_dealerships, n_models=6, years=3, seed=42):
+    """Synthetic sales rows with dealership, model, month, year, quarter and price."""
+    rng = np.random.default_rng(seed)
+    months = pd.period_range('2023-01', periods=years * 12, freq='M')
+    picked = months[rng.integers(0, len(months), size=n_rows)]
+    return pd.DataFrame({
+        'dealership': np.array([f'Dealership {i:04d}' for i in range(n_dealerships)])[
+            rng.integers(0, n_dealerships, size=n_rows)],
+        'model': np.array([f'Model {i}' for i in range(n_models)])[
+            rng.integers(0, n_models, size=n_rows)],
+        'month': picked.astype(str),
+        'year': picked.year.to_numpy(dtype='int64'),
+        'quarter': (picked.year.astype(str) + '-Q' + picked.quarter.astype(str)).to_numpy(),
+        'price': rng.uniform(30000, 100000, size=n_rows).round(2),
+    })
+
+
+# (group by, filters) drill-downs timed against the raw rows and the cube
+CUBE_QUERIES = [
+    (['dealership'], {}),
+    (['year', 'quarter'], {}),
+    (['model', 'month'], {'year': ['2024']}),
+]
+
+
+def raw_query(sales, group_by, filters):
+    """The same query as SalesCube.query, grouping the raw sales rows."""
+    rows = sales
+    for dimension, values in filters.items():
+        rows = rows[rows[dimension].isin([int(v) for v in values] if dimension == 'year' else values)]
+    return rows.groupby(group_by, sort=True)['price'].agg(['sum', 'count', 'min', 'max']).reset_index()
+
+
+def bench_cube(args):
+    """Group-by queries over raw sales rows vs over the pre-aggregated cube."""
+    print(f"{'rows':>10} {'dealers':>8} {'cells':>8} {'build (s)':>10} {'query':<20} "
+          f"{'raw (ms)':>9} {'cube (ms)':>10} {'speedup':>8}")
+    for n_rows in args.rows:
+        for n_dealerships in args.dealerships:
+            sales = synthetic_cube_sales(n_rows, n_dealerships)
+            build_time, cube = timed(SalesCube.from_sales, sales, repeat=1)
+
+            for group_by, filters in CUBE_QUERIES:
+                raw_time, raw = timed(raw_query, sales, group_by, filters, repeat=args.repeat)
+                cube_time, rows = timed(cube.query, group_by, filters, repeat=args.repeat)
+                assert len(raw) == len(rows)
+                assert np.allclose(raw['sum'].round(2), [row['sum'] for row in rows])
+                assert (raw['count'].to_numpy() == [row['count'] for row in rows]).all()
+
+                label = ','.join(group_by) + (' (filtered)' if filters else '')
+                print(f"{n_rows:>10} {n_dealerships:>8} {len(cube):>8} {build_time:>10.3f} "
+                      f"{label:<20} {raw_time * 1000:>9.2f} {cube_time * 1000:>10.2f} "
+                      f"{raw_time / cube_time:>7.1f}x")
+
+
+# ---------------------------------------------------------------------------
+# Table memory
+# ---------------------------------------------------------------------------
+
+def scaled_table(df, n_rows, id_prefix):
+    """df repeated to n_rows rows with fresh ids of the same format."""
+    rows = df.iloc[np.arange(n_rows) % len(df)].reset_index(drop=True)
+    rows['id'] = [f'{id_prefix}{i:07d}' for i in range(1, n_rows + 1)]
+    return rows
+
+
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def bench_memory(args):
+    """Bytes per row of the sales and ticket tables: plain CSV, typed frames, compact."""
+    print(f"{'table':<8} {'rows':>10} {'csv (B/row)':>12} {'typed (B/row)':>14} "
+          f"{'compact (B/row)':>16} {'compact (MB)':>13} {'reduction':>10}")
+    for table, dataset, prefix in [('sales', 'sales_history', 'SL'),
+                                   ('tickets', 'service_tickets', 'T')]:
+        # The original loader: CSV as read, then categorical/datetime dtypes
+        raw = pd.read_csv(dataset_path(dataset, fmt='csv'))
+        typed = load_dataset(dataset, fmt='csv')
+
+        for n_rows in [len(typed)] + args.rows:
+            if n_rows != len(typed):
+                raw_rows = scaled_table(raw, n_rows, prefix)
+                typed_rows = scaled_table(typed, n_rows, prefix)
+            else:
+                raw_rows, typed_rows = raw, typed
+            compact_rows, _ = compact_table(typed_rows, table)
+            compact_rows = with_row_version(compact_rows, 0)
+
+            raw_size, typed_size = frame_bytes(raw_rows), frame_bytes(typed_rows)
+            compact_size = frame_bytes(compact_rows)
+            print(f"{table:<8} {n_rows:>10,} {raw_size / n_rows:>12.1f} "
+                  f"{typed_size / n_rows:>14.1f} {compact_size / n_rows:>16.1f} "
+                  f"{compact_size / 1e6:>13.1f} {typed_size / compact_size:>9.1f}x")
+
+
+# ---------------------------------------------------------------------------
+# Delta sync
+# ---------------------------------------------------------------------------
+
+def bench_delta(args):
+    """Polling /api/sales: the full first page vs since= with a few changed rows."""
+    os.environ.setdefault('ML_MODEL_LOADING', 'lazy')
+    from app import sales_columns
+
+    compact_sales, id_codec = compact_table(synthetic_sales(args.rows), 'sales')
+    compact_sales = with_row_version(compact_sales, 0)
+    rng = np.random.default_rng(42)
+
+    print(f"{args.rows:,} sales rows, page limit {args.limit}")
+    print(f"{'changed':>8} {'full (ms)':>10} {'full (KB)':>10} {'delta (ms)':>11} "
+          f"{'delta (KB)':>11} {'speedup':>8}")
+    for n_changed in args.changed:
+        versions = np.zeros(args.rows, dtype=np.int32)
+        versions[rng.choice(args.rows, n_changed, replace=False)] = 1
+        index = SortedTable(compact_sales.assign(**{VERSION_COLUMN: versions}),
+                            'date', 'id', id_codec=id_codec, versioned=True)
+
+        def body(since):
+            # Like the endpoint, an idle client's poll skips the page entirely
+            if since is not None and not len(index.changed_since(since)):
+                return dumps([])
+            rows, _ = index.page(args.limit, since=since)
+            return dumps(to_records(sales_columns(rows, id_codec)))
+
+        full_time, full = timed(body, None, repeat=args.repeat)
+        delta_time, delta = timed(body, 0, repeat=args.repeat)
+        assert len(json.loads(delta)) == min(n_changed, args.limit)
+        print(f"{n_changed:>8} {full_time * 1000:>10.2f} {len(full) / 1024:>10.1f} "
+              f"{delta_time * 1000:>11.3f} {len(delta) / 1024:>11.1f} "
+              f"{full_time / delta_time:>7.1f}x")
+
+
+# ---------------------------------------------------------------------------
+# Ingestion
+# ---------------------------------------------------------------------------
+
+def bench_ingest(args):
+    """Adding a batch of sales to the paginated index: full re-sort vs merge."""
+    print(f"{'rows':>10} {'batch':>7} {'re-sort (ms)':>13} {'merge (ms)':>11} {'speedup':>8}")
+    for n_rows in args.rows:
+        sales, id_codec = compact_table(synthetic_sales(n_rows), 'sales')
+        sales = with_row_version(sales, 0)
+        index = SortedTable(sales, 'date', 'id', ['dealership', 'model'],
+                            id_codec=id_codec, versioned=True)
+
+        for batch in args.batch:
+            # Fresh ids on dates spread over the whole history
+            new = synthetic_sales(batch, seed=batch)
+            new['id'] = [f'SL{i:07d}' for i in range(n_rows + 1, n_rows + batch + 1)]
+            new = with_row_version(compact_rows(new, 'sales', id_codec), 1)
+
+            resort_time, resorted = timed(
+                lambda: SortedTable(append_rows(index.rows, new), 'date', 'id',
+                                    ['dealership', 'model'], id_codec=id_codec, versioned=True),
+                repeat=args.repeat,
+            )
+            merge_time, merged = timed(index.merge, new, repeat=args.repeat)
+            assert merged.rows['id'].equals(resorted.rows['id'])
+            print(f"{n_rows:>10,} {batch:>7,} {resort_time * 1000:>13.1f} "
+                  f"{merge_time * 1000:>11.1f} {resort_time / merge_time:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='E Corp ML service benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    analytics_parser = subparsers.add_parser(
+        'analytics', help='Dealership and monthly rollups: loops vs groupby'
+    )
+    analytics_parser.add_argument('--rows', type=int, nargs='+',
+                                  default=[10_000, 100_000, 1_000_000])
+    analytics_parser.add_argument('--dealerships', type=int, nargs='+',
+                                  default=[5, 100, 500])
+    analytics_parser.add_argument('--repeat', type=int, default=3)
+    analytics_parser.set_defaults(func=bench_analytics)
+
+    runtime_parser = subparsers.add_parser(
+        'runtime', help='Keras vs NumPy serving runtime: latency, memory'
+    )
+    runtime_parser.add_argument('--repeat', type=int, default=20)
+    runtime_parser.set_defaults(func=bench_runtime)
+
+    features_parser = subparsers.add_parser(
+        'features', help='Parts demand training features: loop vs groupby/shift'
+    )
+    features_parser.add_argument('--parts', type=int, default=10_000)
+    features_parser.add_argument('--years', type=int, default=10)
+    features_parser.add_argument('--legacy-parts', type=int, default=100,
+                                 help='Parts to run the slow loop on before extrapolating')
+    features_parser.add_argument('--repeat', type=int, default=3)
+    features_parser.set_defaults(func=bench_features)
+
+    batching_parser = subparsers.add_parser(
+        'batching', help='Concurrent single-row predictions: direct vs micro-batched'
+    )
+    batching_parser.add_argument('--runtime', choices=['keras', 'numpy'], default='numpy')
+    batching_parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    batching_parser.add_argument('--calls', type=int, default=200,
+                                 help='Predictions per client')
+    batching_parser.add_argument('--max-batch-size', type=int, default=256)
+    batching_parser.add_argument('--max-wait-ms', type=float, default=1.0)
+    batching_parser.set_defaults(func=bench_batching)
+
+    serialization_parser = subparsers.add_parser(
+        'serialization', help='/api/sales bodies: iterrows + jsonify vs columnar encoding'
+    )
+    serialization_parser.add_argument('--rows', type=int, default=1_000_000)
+    serialization_parser.add_argument('--limits', type=int, nargs='+',
+                                      default=[50, 1000, 10_000, 100_000])
+    serialization_parser.add_argument('--repeat', type=int, default=3)
+    serialization_parser.set_defaults(func=bench_serialization)
+
+    fleet_parser = subparsers.add_parser(
+        'fleet', help='Per-member forecasts: separate networks vs one stacked pass'
+    )
+    fleet_parser.add_argument('--members', type=int, nargs='+', default=[5, 100, 1000])
+    fleet_parser.add_argument('--months', type=int, default=12)
+    fleet_parser.add_argument('--repeat', type=int, default=3)
+    fleet_parser.set_defaults(func=bench_fleet)
+
+    backtest_parser = subparsers.add_parser(
+        'backtest', help='Rolling-origin backtest: accuracy, training time, memory, latency'
+    )
+    backtest_parser.add_argument('--folds', type=int, default=4)
+    backtest_parser.add_argument('--horizon', type=int, default=3,
+                                 help='Months forecast past each sales origin')
+    backtest_parser.add_argument('--step', type=int, default=3,
+                                 help='Months between consecutive origins')
+    backtest_parser.add_argument('--epochs', type=int, default=100,
+                                 help='Max training epochs per fold (early stopping applies)')
+    backtest_parser.add_argument('--workers', type=int, default=None,
+                                 help='Folds trained at once (default: one per core)')
+    backtest_parser.add_argument('--output', default=BACKTEST_REPORT_PATH)
+    backtest_parser.add_argument('--baseline', help='Earlier report to check for regressions')
+    backtest_parser.add_argument('--accuracy-tolerance', type=float, default=0.05,
+                                 help='Allowed relative increase of MAE/MAPE')
+    backtest_parser.add_argument('--cost-tolerance', type=float, default=0.25,
+                                 help='Allowed relative increase of time and memory')
+    backtest_parser.set_defaults(func=bench_backtest)
+
+    cube_parser = subparsers.add_parser(
+        'cube', help='Group-by queries: raw sales rows vs the pre-aggregated cube'
+    )
+    cube_parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    cube_parser.add_argument('--dealerships', type=int, nargs='+', default=[5, 100])
+    cube_parser.add_argument('--repeat', type=int, default=3)
+    cube_parser.set_defaults(func=bench_cube)
+
+    memory_parser = subparsers.add_parser(
+        'memory', help='Bytes per row of the sales and ticket tables, before and after compaction'
+    )
+    memory_parser.add_argument('--rows', type=int, nargs='*', default=[1_000_000],
+                               help='Also measure the tables repeated to these sizes')
+    memory_parser.set_defaults(func=bench_memory)
+
+    delta_parser = subparsers.add_parser(
+        'delta', help='Polling a list endpoint: full page vs only the rows changed since'
+    )
+    delta_parser.add_argument('--rows', type=int, default=1_000_000)
+    delta_parser.add_argument('--changed', type=int, nargs='+', default=[0, 10, 1000],
+                              help='Rows changed since the polling client last synced')
+    delta_parser.add_argument('--limit', type=int, default=50)
+    delta_parser.add_argument('--repeat', type=int, default=5)
+    delta_parser.set_defaults(func=bench_delta)
+
+    ingest_parser = subparsers.add_parser(
+        'ingest', help='Ingesting sales into the paginated index: re-sort vs merge'
+    )
+    ingest_parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    ingest_parser.add_argument('--batch', type=int, nargs='+', default=[1, 100, 10_000],
+                               help='Sales rows per ingested batch')
+    ingest_parser.add_argument('--repeat', type=int, default=3)
+    ingest_parser.set_defaults(func=bench_ingest)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
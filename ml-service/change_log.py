@@ -0,0 +1,114 @@
+"""
+Data versions and the per-table change log behind delta sync (since= on the list endpoints).
+Every row carries the revision that added or last changed it, and each revision records which
+tables it touched, so a client can be sent only what changed after the version it last saw.
+"""
+
+import os
+import secrets
+
+import numpy as np
+
+# Column holding the revision a row was added or last changed in (0 for loaded rows)
+VERSION_COLUMN = 'row_version'
+
+# Change count recorded for a table whose rows may all have changed (e.g. new predictions)
+FULL = -1
+
+# Revisions kept in the log; clients further behind get a full copy
+MAX_ENTRIES = 1000
+
+
+# Epoch of this process, keyed by pid so forked workers each draw their own
+_process_epochs = {}
+
+
+def process_epoch():
+    """Random id of the current process, for the revisions made in it."""
+    return _process_epochs.setdefault(os.getpid(), secrets.token_hex(4))
+
+
+def with_row_version(df, revision):
+    """df with every row stamped with revision."""
+    return df.assign(**{VERSION_COLUMN: np.full(len(df), revision, dtype=np.int32)})
+
+
+def parse_version(value):
+    """(version, epoch) of a since= query value; raises ValueError if malformed.
+
+    Tokens are '<version>-<epoch>' (see ChangeLog.token); a bare version has
+    no epoch and only matches the loaded data.
+    """
+    version, _, epoch = value.partition('-')
+    try:
+        return int(version), epoch or None
+    except ValueError as e:
+        raise ValueError(f'Invalid since: {value}') from e
+
+
+class ChangeLog:
+    """Which tables each revision of a data snapshot changed, and how many of their rows.
+
+    Data versions are base + revision: base is the load time in milliseconds,
+    so versions keep increasing across reloads and restarts. Logs are
+    immutable; record() returns a new one.
+
+    Revisions are made per process (each gunicorn worker ingests on its own),
+    so the same version can mean different data in two workers. Clients get
+    a token of the version and the epoch of the process that made it; only
+    revision 0, the load every preloaded worker shares, is valid everywhere.
+    """
+
+    def __init__(self, base=0, entries=(), oldest=0, epoch='0'):
+        self.base = base
+        # (revision, {table: changed rows or FULL}), oldest first
+        self.entries = tuple(entries)
+        # Earliest revision a delta can still be computed from
+        self.oldest = oldest
+        # Process that made the revisions after 0
+        self.epoch = epoch
+
+    def version(self, revision):
+        return self.base + revision
+
+    def token(self, revision):
+        """The '<version>-<epoch>' clients send back as since=."""
+        epoch = self.epoch if revision else '0'
+        return f'{self.version(revision)}-{epoch}'
+
+    def record(self, revision, changes):
+        """A new log with changes made in revision by this process.
+
+        Revisions made by another process (e.g. a master before forking)
+        stop matching their tokens; clients then resync in full once.
+        """
+        entries = self.entries + ((revision, changes),)
+        oldest = self.oldest
+        if len(entries) > MAX_ENTRIES:
+            oldest = entries[0][0]
+            entries = entries[1:]
+        return ChangeLog(self.base, entries, oldest, process_epoch())
+
+    def revision_since(self, version, epoch, revision, tables):
+        """Revision to send tables' changes after for a client at (version, epoch), or None.
+
+        None means the client needs a full copy: its version is from another
+        load or another process, is newer than the current revision, is too
+        old for the log, or one of the tables was replaced as a whole since.
+        """
+        since = version - self.base
+        if not self.oldest <= since <= revision:
+            return None
+        if since and epoch != self.epoch:
+            return None
+        for entry_revision, changes in self.entries:
+            if entry_revision > since and any(changes.get(table) == FULL for table in tables):
+                return None
+        return since
+
+    def changed(self, tables, since):
+        """Whether any of tables changed after revision since."""
+        return any(
+            entry_revision > since and any(changes.get(table) for table in tables)
+            for entry_revision, changes in self.entries
+        )
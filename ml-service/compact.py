@@ -0,0 +1,190 @@
+"""
+Compact in-memory representation of the sales and service ticket tables.
+IDs are stored as integers, dates as int32 day numbers and repeated strings as categorical
+codes; month/year/quarter labels are derived from the dates when needed.
+
+Values are decoded back to strings only when a response is serialized, so a
+worker holds about a quarter of the bytes per row of the string/datetime
+frames (see 'python benchmarks.py memory').
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Day number stored for a missing date (e.g. an open ticket's completed_at)
+NAT_DAY = np.iinfo(np.int32).min
+
+NS_PER_DAY = 86_400 * 10**9
+
+ID_PATTERN = re.compile(r'^([A-Za-z_-]*)(\d+)$')
+
+
+class IdCodec:
+    """Encodes ids of the form <prefix><number> (SL000001) as int32.
+
+    Numbers are zero-padded to min_width digits and may grow past it
+    (SL999999, SL1000000), like the generator's ids. Only the canonical
+    spelling of a number is accepted, so every id decodes back to itself.
+    """
+
+    def __init__(self, prefix, min_width):
+        self.prefix = prefix
+        self.min_width = min_width
+
+    @classmethod
+    def infer(cls, ids):
+        """A codec every id fits, or None if the ids do not share one format."""
+        ids = pd.Series(ids, dtype=str)
+        if ids.empty:
+            return None
+        match = ID_PATTERN.match(ids.iloc[0])
+        if not match:
+            return None
+        prefix = match.group(1)
+        codec = cls(prefix, int(ids.str.len().min()) - len(prefix))
+        if not codec.fits(ids):
+            return None
+        return codec
+
+    def _numbers(self, ids):
+        """int64 numbers of ids, -1 where an id does not fit."""
+        digits = ids.str.slice(len(self.prefix))
+        lengths = digits.str.len()
+        valid = (
+            ids.str.startswith(self.prefix)
+            & digits.str.fullmatch('[0-9]+')
+            & (lengths <= 10)
+            # Only the spelling the codes decode back to (not SL0000001 for SL000001)
+            & ((lengths == self.min_width) | ((lengths > self.min_width) & (digits.str[0] != '0')))
+        )
+        numbers = digits.where(valid, '-1').astype('int64')
+        numbers[numbers > np.iinfo(np.int32).max] = -1
+        return numbers
+
+    def fits(self, ids):
+        return bool((self._numbers(pd.Series(ids, dtype=str)) >= 0).all())
+
+    def encode(self, ids):
+        """int32 codes of ids; raises ValueError for ids of another format."""
+        ids = pd.Series(ids, dtype=str)
+        numbers = self._numbers(ids)
+        invalid = ids[(numbers < 0).to_numpy()]
+        if len(invalid):
+            example = f'{self.prefix}{1:0{self.min_width}d}'
+            raise ValueError(f"ids must look like {example}: {', '.join(invalid[:5])}")
+        return numbers.to_numpy().astype(np.int32)
+
+    def encode_one(self, row_id):
+        return int(self.encode([row_id])[0])
+
+    def decode(self, codes):
+        """String ids for an array of codes."""
+        return (self.prefix + pd.Series(np.asarray(codes)).astype(str).str.zfill(self.min_width)).tolist()
+
+
+def encode_ids(ids, codec):
+    """Codes of ids under codec; ids stay strings when the table has no codec."""
+    return codec.encode(ids) if codec is not None else pd.Series(ids, dtype=str).to_numpy()
+
+
+def decode_ids(codes, codec):
+    return codec.decode(codes) if codec is not None else pd.Series(codes).astype(str).tolist()
+
+
+def encode_days(dates):
+    """int32 days since 1970-01-01 of datetime-like values, NAT_DAY where missing."""
+    values = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+    days = values.astype(np.int64)
+    days[np.isnat(values)] = NAT_DAY
+    return days.astype(np.int32)
+
+
+def _datetimes(days):
+    days = np.asarray(days)
+    return np.where(days == NAT_DAY, np.datetime64('NaT', 'D'), days.astype('datetime64[D]'))
+
+
+def format_days(days):
+    """'YYYY-MM-DD' strings of day numbers, None where missing."""
+    days = np.asarray(days)
+    labels = np.datetime_as_string(days.astype('datetime64[D]'), unit='D').astype(object)
+    labels[days == NAT_DAY] = None
+    return labels.tolist()
+
+
+def month_numbers(days):
+    """Months since 1970-01 of day numbers (year * 12 + month - 1 - 1970 * 12)."""
+    return _datetimes(days).astype('datetime64[M]').astype(np.int64)
+
+
+def month_labels(days):
+    """'YYYY-MM' labels of day numbers."""
+    return np.datetime_as_string(_datetimes(days).astype('datetime64[M]'), unit='M')
+
+
+def days_to_ns(days):
+    """Nanosecond timestamps of day numbers, for comparing with parsed dates."""
+    return np.asarray(days, dtype=np.int64) * NS_PER_DAY
+
+
+# Table -> (date columns, columns derived from the dates and dropped)
+TABLES = {
+    'sales': (['date'], ['month', 'year', 'quarter']),
+    'tickets': (['created_at', 'completed_at'], ['month']),
+}
+
+
+def compact_rows(df, table, codec):
+    """Encode a decoded frame of a table's rows with its id codec."""
+    date_columns, derived = TABLES[table]
+    df = df.drop(columns=[column for column in derived if column in df.columns])
+    df['id'] = encode_ids(df['id'], codec)
+    for column in date_columns:
+        df[column] = encode_days(df[column])
+    for column in df.columns.drop('id'):
+        if df[column].dtype == object or pd.api.types.is_string_dtype(df[column]):
+            df[column] = df[column].astype('category')
+    return df.reset_index(drop=True)
+
+
+def compact_table(df, table):
+    """(compact frame, id codec) for a loaded table; the codec is None for free-form ids."""
+    codec = IdCodec.infer(df['id'])
+    return compact_rows(df, table, codec), codec
+
+
+def insert_rows(df, positions, new_rows):
+    """df with new_rows inserted before the given row positions, as np.insert.
+
+    Each column is copied once. Categorical columns are combined by their
+    codes, so the existing rows are not decoded and re-encoded unless new_rows
+    bring new values (the categories then stay sorted, like astype('category')).
+    """
+    columns = {}
+    for column in df.columns:
+        values, new_values = df[column], new_rows[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            new_objects = new_values.astype(object)
+            categories = values.cat.categories
+            if not new_objects.dropna().isin(categories).all():
+                added = pd.Index(new_objects.dropna().unique(), dtype=categories.dtype)
+                values = values.cat.set_categories(categories.union(added))
+            codes = values.cat.categories.get_indexer(new_objects)
+            columns[column] = pd.Categorical.from_codes(
+                np.insert(values.cat.codes.to_numpy(), positions, codes), dtype=values.dtype
+            )
+        elif isinstance(values.dtype, np.dtype):
+            columns[column] = np.insert(values.to_numpy(), positions, new_values.to_numpy())
+        else:
+            # Extension arrays (e.g. Arrow strings): concatenate, then move the new rows in place
+            combined = pd.concat([values, new_values], ignore_index=True)
+            order = np.insert(np.arange(len(values)), positions, len(values) + np.arange(len(new_values)))
+            columns[column] = combined.take(order).array
+    return pd.DataFrame(columns, copy=False)
+
+
+def append_rows(df, new_rows):
+    """Append compact rows, keeping categorical columns categorical."""
+    return insert_rows(df, np.full(len(new_rows), len(df)), new_rows)
@@ -0,0 +1,262 @@
+"""
+Immutable snapshots of the datasets served by the API.
+Requests read one snapshot for their whole lifetime; loads and ingestion build a new one and swap it in.
+"""
+
+import copy
+import json
+import os
+import threading
+import time
+
+import compact
+import ingestion
+from change_log import FULL, ChangeLog, with_row_version
+from data_store import dataset_paths, load_dataset
+from pagination import SortedTable
+from parts_index import PartsIndex
+from sales_cube import SalesCube
+
+METADATA_PATH = 'data/metadata.json'
+
+
+def file_version(paths):
+    """Version token for a set of files, based on their modification times."""
+    return tuple(os.path.getmtime(path) for path in paths)
+
+
+class DataSnapshot:
+    """A consistent set of the service's DataFrames and the indexes built on them.
+
+    sales and tickets are held in the compact representation of compact.py;
+    id_codecs maps each of them to the codec of its ids (None for free-form
+    ids). Snapshots are never modified after construction. `version` changes with
+    the files on disk and with every ingested batch (`revision`), so it can
+    key cached responses.
+
+    sales, tickets and parts rows carry the revision that added or last changed
+    them (change_log.VERSION_COLUMN), and change_log records what each revision
+    touched; `data_version` is the token clients pass back as since=.
+    """
+
+    def __init__(self, sales=None, parts=None, tickets=None, monthly=None,
+                 dealership=None, metadata=None, file_version=None, revision=0,
+                 sales_cube=None, id_codecs=None, change_log=None,
+                 sales_index=None, tickets_index=None, parts_index=None):
+        self.sales = sales
+        self.parts = parts
+        self.tickets = tickets
+        self.monthly = monthly
+        self.dealership = dealership
+        self.metadata = metadata or {}
+        self.file_version = file_version
+        self.revision = revision
+        self.id_codecs = id_codecs or {}
+        self.change_log = change_log or ChangeLog()
+
+        # Newest-first indexes behind the paginated list endpoints; appends pass
+        # the indexes they merged rows into, or reuse the unchanged ones
+        if sales_index is None and sales is not None:
+            sales_index = SortedTable(sales, 'date', 'id', ['dealership', 'model'],
+                                      id_codec=self.id_codecs.get('sales'), versioned=True)
+        if tickets_index is None and tickets is not None:
+            tickets_index = SortedTable(tickets, 'created_at', 'id', ['status', 'vehicle_model'],
+                                        id_codec=self.id_codecs.get('tickets'), versioned=True)
+        self.sales_index = sales_index
+        self.tickets_index = tickets_index
+
+        # Keep only the presorted copies; nothing depends on the loaded row order
+        if sales is not None:
+            self.sales = self.sales_index.rows
+        if tickets is not None:
+            self.tickets = self.tickets_index.rows
+
+        # The latest month's parts, indexed by SKU/part id and name
+        if parts_index is None and parts is not None:
+            parts_index = PartsIndex(parts)
+        self.parts_index = parts_index
+
+        # Sales rolled up by dealership, model and month; appends pass an updated cube
+        if sales_cube is None and sales is not None:
+            sales_cube = SalesCube.from_sales(sales)
+        self.sales_cube = sales_cube
+
+    @classmethod
+    def load(cls, base_version=0):
+        """Load all datasets from disk; raises if any of them is missing.
+
+        base_version is the data version of the loaded rows (revision 0).
+        """
+        # Columnar files (Feather/Parquet) are used when present, else CSV
+        sales, sales_ids = compact.compact_table(load_dataset('sales_history'), 'sales')
+        tickets, ticket_ids = compact.compact_table(load_dataset('service_tickets'), 'tickets')
+        snapshot = dict(
+            sales=with_row_version(sales, 0),
+            parts=with_row_version(load_dataset('parts_inventory'), 0),
+            tickets=with_row_version(tickets, 0),
+            monthly=load_dataset('monthly_aggregates'),
+            dealership=load_dataset('dealership_metrics'),
+        )
+
+        with open(METADATA_PATH, 'r') as f:
+            metadata = json.load(f)
+
+        version = file_version(dataset_paths() + [METADATA_PATH])
+        return cls(metadata=metadata, file_version=version,
+                   id_codecs={'sales': sales_ids, 'tickets': ticket_ids},
+                   change_log=ChangeLog(base_version), **snapshot)
+
+    @property
+    def loaded(self):
+        return self.sales is not None
+
+    @property
+    def version(self):
+        if self.file_version is None:
+            return None
+        return (self.file_version, self.revision)
+
+    @property
+    def data_version(self):
+        """Token clients send back as since=; its version part increases with every revision."""
+        return self.change_log.token(self.revision)
+
+    def revision_since(self, version, epoch, tables):
+        """See ChangeLog.revision_since."""
+        return self.change_log.revision_since(version, epoch, self.revision, tables)
+
+    def touch(self, tables):
+        """A copy at the next revision recording tables as changed as a whole.
+
+        For changes that are not row edits, such as new model predictions; the
+        tables and indexes are shared with this snapshot.
+        """
+        snapshot = copy.copy(self)
+        snapshot.revision = self.revision + 1
+        snapshot.change_log = self.change_log.record(
+            snapshot.revision, {table: FULL for table in tables}
+        )
+        return snapshot
+
+    def dealership_locations(self):
+        """Known dealership name -> location, from the metadata and the dealership metrics."""
+        locations = {d['name']: d['location'] for d in self.metadata.get('dealerships', [])}
+        pairs = self.dealership[['dealership', 'location']].drop_duplicates()
+        locations.update(zip(pairs['dealership'].astype(str), pairs['location'].astype(str)))
+        return locations
+
+    def append(self, sales=None, tickets=None, parts=None):
+        """Return a new snapshot with the given records added, plus per-table counts.
+
+        sales and tickets are appended (ids must be new); parts rows replace
+        any existing row for the same month and part. The monthly and
+        dealership aggregates are updated for the affected months only.
+
+        New rows are merged into the presorted sales and ticket indexes, and
+        indexes of tables the batch does not touch are shared with this
+        snapshot, so a batch costs about one copy of the tables it changes
+        rather than a re-sort of the whole history.
+        """
+        tables = dict(
+            sales=self.sales,
+            parts=self.parts,
+            tickets=self.tickets,
+            monthly=self.monthly,
+            dealership=self.dealership,
+        )
+        counts = {'sales': 0, 'serviceTickets': 0, 'parts': 0}
+        sales_cube = self.sales_cube
+        indexes = dict(sales_index=self.sales_index, tickets_index=self.tickets_index,
+                       parts_index=self.parts_index)
+        revision = self.revision + 1
+        changes = {}
+
+        sales_ids, ticket_ids = self.id_codecs.get('sales'), self.id_codecs.get('tickets')
+
+        if sales:
+            new_sales = ingestion.sales_rows(sales, self.sales, self.dealership_locations(), sales_ids)
+            indexes['sales_index'] = self.sales_index.merge(
+                with_row_version(compact.compact_rows(new_sales, 'sales', sales_ids), revision)
+            )
+            tables['sales'] = indexes['sales_index'].rows
+            tables['monthly'] = ingestion.update_monthly(self.monthly, new_sales)
+            tables['dealership'] = ingestion.update_dealership_metrics(self.dealership, new_sales)
+            sales_cube = self.sales_cube.add(new_sales)
+            counts['sales'] = changes['sales'] = len(new_sales)
+
+        if tickets:
+            new_tickets = ingestion.ticket_rows(tickets, self.tickets, ticket_ids)
+            indexes['tickets_index'] = self.tickets_index.merge(
+                with_row_version(compact.compact_rows(new_tickets, 'tickets', ticket_ids), revision)
+            )
+            tables['tickets'] = indexes['tickets_index'].rows
+            counts['serviceTickets'] = changes['tickets'] = len(new_tickets)
+
+        if parts:
+            new_parts = with_row_version(ingestion.parts_rows(parts, self.parts), revision)
+            tables['parts'] = ingestion.upsert_parts(self.parts, new_parts)
+            indexes['parts_index'] = None
+            counts['parts'] = changes['parts'] = len(new_parts)
+            # A new latest month replaces the served parts list as a whole
+            if tables['parts']['month'].max() != self.parts['month'].max():
+                changes['parts'] = FULL
+
+        snapshot = DataSnapshot(
+            metadata=self.metadata,
+            file_version=self.file_version,
+            revision=revision,
+            sales_cube=sales_cube,
+            id_codecs=self.id_codecs,
+            change_log=self.change_log.record(revision, changes),
+            **tables,
+            **indexes,
+        )
+        return snapshot, counts
+
+
+class DataStore:
+    """Holds the current snapshot and serializes the writers that replace it.
+
+    Readers take `current` once per request and never see a half-applied
+    update: new snapshots are fully built before the reference is swapped.
+    """
+
+    def __init__(self):
+        self.current = DataSnapshot()
+        self._write_lock = threading.Lock()
+        # Latest value of each input observed with observe()
+        self._inputs = {}
+
+    def load(self):
+        """Replace the current snapshot with the datasets on disk."""
+        # Versions start from the load time, past any version already handed out
+        current = self.current
+        base_version = max(int(time.time() * 1000), current.change_log.version(current.revision) + 1)
+        snapshot = DataSnapshot.load(base_version)
+        with self._write_lock:
+            self.current = snapshot
+        return snapshot
+
+    def observe(self, name, value, tables):
+        """Current snapshot, advanced to a new revision if input name changed value.
+
+        For inputs that responses derive from besides the data (the model
+        version, the date): when one changes, tables are recorded as changed
+        as a whole so clients resync them in full.
+        """
+        if name in self._inputs and self._inputs[name] == value:
+            return self.current
+        with self._write_lock:
+            if name in self._inputs and self._inputs[name] != value and self.current.loaded:
+                self.current = self.current.touch(tables)
+            self._inputs[name] = value
+            return self.current
+
+    def ingest(self, sales=None, tickets=None, parts=None):
+        """Append records to the current snapshot and swap in the result."""
+        with self._write_lock:
+            if not self.current.loaded:
+                raise RuntimeError('Data not loaded')
+            snapshot, counts = self.current.append(sales, tickets, parts)
+            self.current = snapshot
+        return snapshot, counts
@@ -0,0 +1,192 @@
+"""
+Dataset storage for the E Corp ML service.
+Reads and writes the training/serving datasets as CSV or as columnar Feather/Parquet files.
+
+Columnar files keep categorical and datetime dtypes on disk. Feather files are
+written uncompressed and memory-mapped on load, so numeric columns are backed by
+the OS page cache and shared between gunicorn workers instead of being parsed
+into a private copy per process.
+"""
+
+import os
+
+import pandas as pd
+
+DATA_DIR = 'data'
+
+DATASETS = [
+    'sales_history',
+    'parts_inventory',
+    'service_tickets',
+    'monthly_aggregates',
+    'dealership_metrics',
+]
+
+FORMATS = {
+    'feather': '.feather',
+    'parquet': '.parquet',
+    'csv': '.csv',
+}
+
+# Low-cardinality string columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = [
+    'dealership',
+    'location',
+    'model',
+    'vehicle_model',
+    'status',
+    'issue',
+    'category',
+]
+
+# Columns holding calendar dates (month/year/quarter stay as period labels)
+DATE_COLUMNS = ['date', 'created_at', 'completed_at']
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError(
+            f"pyarrow is required for the '{fmt}' data format "
+            "(pip install pyarrow)"
+        ) from e
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def apply_schema(df):
+    """Convert known columns to categorical and datetime dtypes.
+
+    Only the converted columns are new; the others stay shared with df, so
+    memory-mapped columns are not copied.
+    """
+    df = df.copy(deep=False)
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col])
+    return df
+
+
+# Columnar files already reported as older than their CSV
+_warned_stale = set()
+
+
+def is_stale(path, csv_path):
+    """Whether a columnar file is older than the CSV next to it (e.g. regenerated CSVs)."""
+    return os.path.exists(csv_path) and os.path.getmtime(path) < os.path.getmtime(csv_path)
+
+
+def dataset_path(name, data_dir=DATA_DIR, fmt='auto'):
+    """Path of a dataset file; 'auto' picks the first existing format.
+
+    Columnar formats are preferred when pyarrow is available, unless they are
+    older than the dataset's CSV (see is_stale); those are skipped with a warning. The
+    ML_DATA_FORMAT environment variable overrides 'auto'.
+    """
+    if fmt == 'auto':
+        fmt = os.environ.get('ML_DATA_FORMAT', 'auto')
+
+    if fmt != 'auto':
+        return os.path.join(data_dir, name + FORMATS[fmt])
+
+    csv_path = os.path.join(data_dir, name + FORMATS['csv'])
+    candidates = list(FORMATS) if _has_pyarrow() else ['csv']
+    for candidate in candidates:
+        path = os.path.join(data_dir, name + FORMATS[candidate])
+        if not os.path.exists(path):
+            continue
+        if candidate != 'csv' and is_stale(path, csv_path):
+            if path not in _warned_stale:
+                _warned_stale.add(path)
+                print(f"⚠ Warning: {path} is older than {csv_path}; skipping it - "
+                      f"regenerate the {candidate} files or delete them")
+            continue
+        return path
+
+    return csv_path
+
+
+def _format_of(path):
+    for fmt, ext in FORMATS.items():
+        if path.endswith(ext):
+            return fmt
+    raise ValueError(f"Unknown data format: {path}")
+
+
+def arrow_frame(table):
+    """DataFrame of an Arrow table, viewing numeric columns in place.
+
+    Integer and float columns held in a single chunk without nulls become
+    NumPy views of the Arrow buffers (of a memory-mapped file, the page
+    cache); the other columns are converted by to_pandas().
+    """
+    import pyarrow as pa
+
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        numeric = pa.types.is_integer(column.type) or pa.types.is_floating(column.type)
+        if numeric and column.num_chunks == 1 and column.null_count == 0:
+            columns[name] = column.chunk(0).to_numpy(zero_copy_only=True)
+        else:
+            columns[name] = column.to_pandas()
+    # copy=False keeps the views as their own blocks instead of consolidating them
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_dataset(name, data_dir=DATA_DIR, fmt='auto'):
+    """Load a dataset with categorical and datetime dtypes applied."""
+    path = dataset_path(name, data_dir, fmt)
+    fmt = _format_of(path)
+
+    if fmt == 'feather':
+        _require_pyarrow(fmt)
+        import pyarrow.feather as feather
+
+        # Memory-map the file; numeric columns stay views of its pages
+        df = arrow_frame(feather.read_table(path, memory_map=True))
+    elif fmt == 'parquet':
+        _require_pyarrow(fmt)
+        import pyarrow.parquet as parquet
+
+        table = parquet.read_table(path, memory_map=True)
+        df = table.to_pandas(split_blocks=True, self_destruct=True)
+    else:
+        df = pd.read_csv(path)
+
+    return apply_schema(df)
+
+
+def save_dataset(df, name, data_dir=DATA_DIR, fmt='csv'):
+    """Save a dataset in the given format and return the written path."""
+    path = dataset_path(name, data_dir, fmt)
+
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return path
+
+    _require_pyarrow(fmt)
+    df = apply_schema(df).reset_index(drop=True)
+
+    if fmt == 'feather':
+        # Uncompressed and in one record batch, so each column is one
+        # contiguous buffer that can be memory-mapped without copying
+        df.to_feather(path, compression='uncompressed', chunksize=max(len(df), 1))
+    else:
+        df.to_parquet(path, index=False)
+
+    return path
+
+
+def dataset_paths(data_dir=DATA_DIR, fmt='auto'):
+    """Resolved file paths of all datasets, in DATASETS order."""
+    return [dataset_path(name, data_dir, fmt) for name in DATASETS]
@@ -0,0 +1,71 @@
+"""
+Feature construction shared by model training and serving.
+Keeps the inputs the models see at inference identical to those they were trained on.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Column order of the parts demand feature matrix
+PARTS_FEATURE_COLUMNS = ['demand', 'sales_volume', 'inventory_level', 'month_num', 'price']
+
+
+def month_number(months):
+    """Calendar month (1-12) from a Series of 'YYYY-MM' labels."""
+    return months.astype(str).str[5:7].astype(int)
+
+
+def parts_demand_features(parts_rows):
+    """Feature matrix for the parts demand model from parts_inventory rows.
+
+    Expects the columns of parts_inventory (demand, sales_volume,
+    inventory_level, month as 'YYYY-MM', price) and returns a float array
+    with one row per input row, in PARTS_FEATURE_COLUMNS order.
+    """
+    return np.column_stack([
+        parts_rows['demand'].to_numpy(dtype=float),
+        parts_rows['sales_volume'].to_numpy(dtype=float),
+        parts_rows['inventory_level'].to_numpy(dtype=float),
+        month_number(parts_rows['month']).to_numpy(dtype=float),
+        parts_rows['price'].to_numpy(dtype=float),
+    ])
+
+
+def parts_demand_training_data(parts_data, group_column=None):
+    """Training pairs for the parts demand model from parts_inventory history.
+
+    Each part-month's features are paired with the same part's demand in the
+    following month. Rows are grouped by part in order of first appearance and
+    sorted by month within each part; the last month of each part has no
+    target and is dropped. Returns (X, y) with y shaped (n, 1), or
+    (X, y, groups) with each pair's group_column value (e.g. 'category').
+    """
+    part_order = pd.Categorical(
+        parts_data['part_id'], categories=parts_data['part_id'].unique()
+    ).codes
+    ordered = parts_data.assign(part_order=part_order).sort_values(
+        ['part_order', 'month'], kind='stable'
+    )
+
+    next_demand = ordered.groupby('part_order', sort=False)['demand'].shift(-1)
+    has_next = next_demand.notna().to_numpy()
+
+    X = parts_demand_features(ordered[has_next])
+    y = next_demand[has_next].to_numpy(dtype=float).reshape(-1, 1)
+
+    if group_column is not None:
+        return X, y, ordered.loc[has_next, group_column].to_numpy(dtype=str)
+    return X, y
+
+
+def dealership_sales_series(dealership_df):
+    """Monthly sales per dealership as a (dealership x month) DataFrame.
+
+    Dealerships are in order of first appearance and months in calendar
+    order; months without a row for a dealership are 0.
+    """
+    series = dealership_df.pivot_table(
+        index='dealership', columns='month', values='sales_amount',
+        aggfunc='sum', fill_value=0, sort=False,
+    )
+    return series.reindex(columns=sorted(series.columns)).astype(float)
@@ -0,0 +1,164 @@
+"""
+Inference logic shared by the Keras models and the NumPy serving runtime.
+A backend only has to provide a `model` with a Keras-style `predict` and fitted scalers.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from features import parts_demand_features
+from metrics import metrics
+
+
+class ForecastCache:
+    """LRU cache of autoregressive forecast paths.
+
+    Entries are keyed on a hash of the scaled input window and the model
+    version and hold the scaled predictions for the longest horizon computed
+    so far. A shorter request is answered from the prefix of a longer one, and
+    a longer request continues from the cached path instead of starting over.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(window, model_version):
+        digest = hashlib.sha1(np.ascontiguousarray(window, dtype=float).tobytes())
+        digest.update(repr(model_version).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached scaled forecast path for key, or an empty array."""
+        with self._lock:
+            path = self._entries.get(key)
+            if path is None:
+                return np.empty(0)
+            self._entries.move_to_end(key)
+            return path
+
+    def put(self, key, path):
+        """Store a forecast path unless a longer one is already cached."""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or len(path) > len(cached):
+                self._entries[key] = path
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+# Shared by every forecaster; entries are keyed on the model version
+forecast_cache = ForecastCache(int(os.environ.get('ML_FORECAST_CACHE_SIZE', 256)))
+
+
+class SalesForecaster:
+    """Autoregressive multi-month sales forecasting on top of a one-step model.
+
+    Backends set `version` when a model is loaded or trained; it is part of the
+    forecast cache key, so a new model never sees another model's forecasts.
+    """
+
+    version = None
+
+    def predict_next_months(self, recent_data, n_months=3):
+        """Predict sales for the next n months."""
+        # Get the most recent lookback period
+        scaled_data = self.scaler.transform(recent_data[['total_sales']])
+        window = scaled_data[-self.lookback:, 0]
+
+        key = forecast_cache.key(window, (type(self).__name__, self.version))
+        cached = forecast_cache.get(key)
+        forecast_cache.record(hit=len(cached) >= n_months)
+
+        if len(cached) < n_months:
+            cached = self._extend_forecast(window, cached, n_months)
+            forecast_cache.put(key, cached)
+
+        # Inverse transform predictions
+        predictions = self.scaler.inverse_transform(cached[:n_months].reshape(-1, 1))
+
+        return predictions.flatten()
+
+    def _extend_forecast(self, window, known, n_months):
+        """Scaled forecast path of n_months, continuing from known predictions."""
+        # Rolling buffer: the window followed by the predictions made so far
+        buffer = np.empty(self.lookback + n_months)
+        buffer[:self.lookback] = window
+        buffer[self.lookback:self.lookback + len(known)] = known
+
+        for step in range(len(known), n_months):
+            current_sequence = buffer[step:step + self.lookback].reshape(1, self.lookback, 1)
+            pred_scaled = self.model.predict(current_sequence, verbose=0)
+            metrics.inc('ml_service_model_calls_total', model='sales')
+            metrics.inc('ml_service_model_rows_total', model='sales')
+            buffer[self.lookback + step] = pred_scaled[0, 0]
+
+        return buffer[self.lookback:].copy()
+
+
+class PartsDemandPredictor:
+    """Next-period parts demand prediction on top of a feature-level model."""
+
+    def predict_demand(self, current_demand, sales_volume, inventory_level,
+                      month, price):
+        """Predict parts demand for next period."""
+        features = np.array([[
+            current_demand,
+            sales_volume,
+            inventory_level,
+            month,
+            price
+        ]])
+
+        return int(self._predict_features(features)[0])
+
+    def predict_demand_batch(self, parts_rows):
+        """Predict next-period demand for every row of a parts DataFrame.
+
+        Expects the columns of parts_inventory.csv (demand, sales_volume,
+        inventory_level, month as 'YYYY-MM', price) and returns an int array
+        aligned with the rows, using a single forward pass for the batch.
+        """
+        if len(parts_rows) == 0:
+            return np.zeros(0, dtype=int)
+
+        return self._predict_features(parts_demand_features(parts_rows))
+
+    def _predict_features(self, features):
+        """Scale, predict and inverse-transform a raw feature matrix."""
+        features_scaled = self.scaler_X.transform(features)
+        prediction_scaled = self.model.predict(
+            features_scaled, batch_size=1024, verbose=0
+        )
+        metrics.inc('ml_service_model_calls_total', model='parts')
+        metrics.inc('ml_service_model_rows_total', len(features_scaled), model='parts')
+        prediction = self.scaler_y.inverse_transform(prediction_scaled)
+
+        return np.maximum(prediction[:, 0], 0).astype(int)
@@ -6,9 +6,15 @@ This script creates realistic training datasets based on the mock data patterns.
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+import argparse
 import os
 import json
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from data_store import FORMATS, dataset_path, save_dataset
+
 # Set random seed for reproducibility
 np.random.seed(42)
 
@@ -59,7 +65,7 @@ SERVICE_ISSUES = [
 ]
 
 
-def generate_sales_data():
+def generate_sales_data(fmt='csv'):
     """Generate historical sales data with seasonal trends."""
     print("Generating sales data...")
     
@@ -110,12 +116,12 @@ def generate_sales_data():
         current_date += timedelta(days=1)
     
     df = pd.DataFrame(sales_data)
-    df.to_csv('data/sales_history.csv', index=False)
+    save_dataset(df, 'sales_history', fmt=fmt)
     print(f"Generated {len(sales_data)} sales records")
     return df
 
 
-def generate_parts_inventory_data(sales_df):
+def generate_parts_inventory_data(sales_df, fmt='csv'):
     """Generate parts inventory and demand data based on sales."""
     print("Generating parts inventory data...")
     
@@ -158,12 +164,12 @@ def generate_parts_inventory_data(sales_df):
                 })
     
     df = pd.DataFrame(parts_data)
-    df.to_csv('data/parts_inventory.csv', index=False)
+    save_dataset(df, 'parts_inventory', fmt=fmt)
     print(f"Generated {len(parts_data)} parts inventory records")
     return df
 
 
-def generate_service_tickets_data(sales_df):
+def generate_service_tickets_data(sales_df, fmt='csv'):
     """Generate service ticket data based on vehicle sales."""
     print("Generating service tickets data...")
     
@@ -209,12 +215,12 @@ def generate_service_tickets_data(sales_df):
         current_date += timedelta(days=1)
     
     df = pd.DataFrame(tickets_data)
-    df.to_csv('data/service_tickets.csv', index=False)
+    save_dataset(df, 'service_tickets', fmt=fmt)
     print(f"Generated {len(tickets_data)} service ticket records")
     return df
 
 
-def generate_monthly_aggregates(sales_df):
+def generate_monthly_aggregates(sales_df, fmt='csv'):
     """Generate monthly aggregate statistics."""
     print("Generating monthly aggregates...")
     
@@ -225,12 +231,12 @@ def generate_monthly_aggregates(sales_df):
     }).reset_index()
     
     monthly.columns = ['month', 'total_sales', 'units_sold']
-    monthly.to_csv('data/monthly_aggregates.csv', index=False)
+    save_dataset(monthly, 'monthly_aggregates', fmt=fmt)
     print(f"Generated {len(monthly)} monthly aggregate records")
     return monthly
 
 
-def generate_dealership_metrics(sales_df, parts_df):
+def generate_dealership_metrics(sales_df, parts_df, fmt='csv'):
     """Generate dealership-level performance metrics."""
     print("Generating dealership metrics...")
     
@@ -267,7 +273,7 @@ def generate_dealership_metrics(sales_df, parts_df):
                 })
     
     df = pd.DataFrame(metrics)
-    df.to_csv('data/dealership_metrics.csv', index=False)
+    save_dataset(df, 'dealership_metrics', fmt=fmt)
     print(f"Generated {len(metrics)} dealership metric records")
     return df
 
@@ -306,17 +312,365 @@ def generate_metadata():
     print("Generated metadata file")
 
 
+# ---------------------------------------------------------------------------
+# Streaming generator: vectorized chunks, bounded memory, optional processes
+# ---------------------------------------------------------------------------
+
+DEALERSHIP_NAMES = [d['name'] for d in DEALERSHIPS]
+DEALERSHIP_LOCATIONS = [d['location'] for d in DEALERSHIPS]
+MODEL_NAMES = [v['model'] for v in VEHICLE_MODELS]
+MODEL_PRICES = np.array([v['base_price'] for v in VEHICLE_MODELS], dtype=float)
+MODEL_POPULARITY = np.array([v['popularity'] for v in VEHICLE_MODELS])
+TICKET_STATUSES = ['open', 'in_progress', 'completed']
+
+# Column types of the streamed tables. Every chunk is cast to them, so an empty
+# first chunk (no tickets in the first weeks) cannot fix a null type for a column.
+STREAMED_COLUMNS = {
+    'sales_history': [
+        ('id', 'string'), ('date', 'timestamp'), ('dealership', 'category'),
+        ('location', 'category'), ('model', 'category'), ('price', 'float'),
+        ('month', 'string'), ('year', 'int'), ('quarter', 'string'),
+    ],
+    'service_tickets': [
+        ('id', 'string'), ('created_at', 'timestamp'), ('vehicle_model', 'category'),
+        ('issue', 'category'), ('status', 'category'), ('completed_at', 'timestamp'),
+        ('month', 'string'),
+    ],
+}
+
+
+def arrow_schema(name):
+    """Arrow schema of a streamed table from STREAMED_COLUMNS."""
+    import pyarrow as pa
+    
+    types = {
+        'string': pa.string(),
+        'timestamp': pa.timestamp('ns'),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'float': pa.float64(),
+        'int': pa.int64(),
+    }
+    return pa.schema([(column, types[kind]) for column, kind in STREAMED_COLUMNS[name]])
+
+
+def categorical(codes, categories):
+    """Categorical with a fixed category list, so every chunk shares one dictionary."""
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def chunk_ranges(chunk_days):
+    """Split START_DATE..END_DATE into consecutive (start, end) day ranges."""
+    ranges = []
+    start = START_DATE
+    while start <= END_DATE:
+        end = min(start + timedelta(days=chunk_days - 1), END_DATE)
+        ranges.append((start, end))
+        start = end + timedelta(days=1)
+    return ranges
+
+
+def generate_chunk(task):
+    """Generate the sales and service tickets for one range of days.
+    
+    Draws the daily Poisson counts, vehicle models and prices for the whole
+    range as arrays. The RNG is seeded from (seed, chunk index), so the output
+    does not depend on how chunks are spread over worker processes.
+    """
+    chunk_index, start, end, scale, seed = task
+    rng = np.random.default_rng([seed, chunk_index])
+    
+    days = pd.date_range(start, end, freq='D')
+    months = days.month.to_numpy()
+    
+    # Seasonal factor (higher in summer and end of year) and 15% annual growth
+    seasonal = 1.0 + 0.3 * np.sin((months - 3) * np.pi / 6)
+    years_passed = (days - START_DATE).days.to_numpy() / 365.25
+    growth = 1.0 + years_passed * 0.15
+    
+    # Sales: one Poisson draw per (day, dealership)
+    base_volume = np.array([d['base_volume'] for d in DEALERSHIPS])
+    rates = np.outer(seasonal * growth * 0.5 * scale, base_volume)
+    counts = rng.poisson(rates)
+    
+    day_idx = np.repeat(np.arange(len(days)), counts.sum(axis=1))
+    dealer_idx = np.concatenate([
+        np.repeat(np.arange(len(DEALERSHIPS)), row) for row in counts
+    ]) if len(days) else np.zeros(0, dtype=int)
+    n_sales = len(day_idx)
+    
+    model_idx = rng.choice(len(VEHICLE_MODELS), size=n_sales, p=MODEL_POPULARITY)
+    prices = (MODEL_PRICES[model_idx] * rng.uniform(0.95, 1.05, size=n_sales)).round(2)
+    
+    # Period labels are formatted once per day, then gathered per row
+    day_months = np.asarray(days.strftime('%Y-%m'), dtype=object)
+    day_quarters = np.asarray('Q' + ((days.month - 1) // 3 + 1).astype(str), dtype=object)
+    
+    sales = pd.DataFrame({
+        'date': days[day_idx],
+        'dealership': categorical(dealer_idx, DEALERSHIP_NAMES),
+        'location': categorical(dealer_idx, DEALERSHIP_LOCATIONS),
+        'model': categorical(model_idx, MODEL_NAMES),
+        'price': prices,
+        'month': day_months[day_idx],
+        'year': days.year.to_numpy()[day_idx],
+        'quarter': day_quarters[day_idx],
+    })
+    
+    # Service tickets start 30 days after the first sales and grow over time
+    ticket_mask = days >= START_DATE + timedelta(days=30)
+    ticket_days = days[ticket_mask]
+    ticket_years = (ticket_days - START_DATE).days.to_numpy() / 365.25
+    ticket_counts = rng.poisson((2.0 + ticket_years * 0.5) * scale)
+    
+    ticket_day_idx = np.repeat(np.arange(len(ticket_days)), ticket_counts)
+    n_tickets = len(ticket_day_idx)
+    created = ticket_days[ticket_day_idx]
+    
+    status_idx = rng.choice(3, size=n_tickets, p=[0.2, 0.3, 0.5])
+    completion_days = rng.integers(1, 7, size=n_tickets)
+    completed = created + pd.to_timedelta(completion_days, unit='D')
+    completed = completed.where(status_idx == 2)
+    
+    tickets = pd.DataFrame({
+        'created_at': created,
+        'vehicle_model': categorical(rng.integers(0, len(VEHICLE_MODELS), size=n_tickets),
+                                     MODEL_NAMES),
+        'issue': categorical(rng.integers(0, len(SERVICE_ISSUES), size=n_tickets),
+                             SERVICE_ISSUES),
+        'status': categorical(status_idx, TICKET_STATUSES),
+        'completed_at': completed,
+        'month': day_months[ticket_mask][ticket_day_idx],
+    })
+    
+    # Per (month, dealership) totals feed the small derived datasets
+    summary = sales.groupby(['month', 'dealership'], observed=True)['price'].agg(['sum', 'size'])
+    
+    return sales, tickets, summary
+
+
+class ChunkWriter:
+    """Appends DataFrame chunks to one dataset file without holding it in memory.
+    
+    Chunks go to a temporary file that close() renames into place, so a failed
+    run never leaves a partial dataset for dataset_path('auto') to pick up.
+    """
+    
+    def __init__(self, name, fmt):
+        self.path = dataset_path(name, fmt=fmt)
+        self.tmp_path = self.path + '.tmp'
+        self.fmt = fmt
+        self.rows = 0
+        self._writer = None
+        self._started = False
+        
+        if fmt != 'csv':
+            import pyarrow as pa
+            import pyarrow.parquet as parquet
+            
+            self._schema = arrow_schema(name)
+            if fmt == 'parquet':
+                self._writer = parquet.ParquetWriter(self.tmp_path, self._schema)
+            else:
+                # Feather v2 is the Arrow IPC file format, written batch by batch
+                self._writer = pa.ipc.new_file(self.tmp_path, self._schema)
+    
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.tmp_path, mode='a' if self._started else 'w',
+                      header=not self._started, index=False, date_format='%Y-%m-%d')
+        else:
+            import pyarrow as pa
+            
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            self._writer.write_table(table.select(self._schema.names).cast(self._schema))
+        
+        self._started = True
+        self.rows += len(df)
+    
+    def close(self):
+        """Finish the file and move it into place."""
+        if self._writer is not None:
+            self._writer.close()
+        os.replace(self.tmp_path, self.path)
+    
+    def abort(self):
+        """Drop the partial file after a failed run."""
+        if self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def add_ids(df, prefix, offset):
+    """Insert sequential string IDs (e.g. SL000001) continuing from offset."""
+    numbers = pd.Series(np.arange(offset + 1, offset + len(df) + 1), index=df.index)
+    df.insert(0, 'id', prefix + numbers.astype(str).str.zfill(6))
+    return df
+
+
+def derived_datasets(summaries, seed):
+    """Monthly aggregates, dealership metrics and parts inventory from chunk totals."""
+    totals = pd.concat(summaries).groupby(level=[0, 1], observed=True).sum()
+    totals = totals.reset_index().sort_values(['month', 'dealership'], kind='stable')
+    
+    # Monthly aggregates
+    monthly = totals.groupby('month', as_index=False).agg(
+        total_sales=('sum', 'sum'),
+        units_sold=('size', 'sum'),
+    )
+    
+    # Dealership metrics; parts cost is roughly 20-25% of sales
+    rng = np.random.default_rng([seed, 1])
+    dealer_order = {name: i for i, name in enumerate(DEALERSHIP_NAMES)}
+    totals['dealer_order'] = totals['dealership'].astype(str).map(dealer_order)
+    totals = totals.sort_values(['month', 'dealer_order'], kind='stable')
+    parts_cost = totals['sum'].to_numpy() * rng.uniform(0.20, 0.25, size=len(totals))
+    dealership = pd.DataFrame({
+        'month': totals['month'].to_numpy(),
+        'dealership': totals['dealership'].astype(str).to_numpy(),
+        'location': [DEALERSHIP_LOCATIONS[i] for i in totals['dealer_order']],
+        'sales_amount': totals['sum'].round(2).to_numpy(),
+        'units_sold': totals['size'].to_numpy(),
+        'parts_cost': parts_cost.round(2),
+        'gross_margin': ((totals['sum'] - parts_cost) / totals['sum'] * 100).round(2).to_numpy(),
+    })
+    
+    # Parts demand scales with each month's sales volume
+    rng = np.random.default_rng([seed, 2])
+    n_months, n_parts = len(monthly), len(PARTS)
+    sales_volume = np.repeat(monthly['units_sold'].to_numpy(), n_parts)
+    demand_factor = np.tile([p['demand_factor'] for p in PARTS], n_months)
+    base_demand = sales_volume * demand_factor * rng.uniform(0.8, 1.2, size=len(sales_volume))
+    demand = np.maximum(1, (base_demand + rng.normal(0, 5, size=len(sales_volume))).astype(int))
+    inventory = np.maximum(0, (demand * 1.5 + rng.normal(0, 10, size=len(demand))).astype(int))
+    parts = pd.DataFrame({
+        'month': np.repeat(monthly['month'].to_numpy(), n_parts),
+        'part_id': np.tile([p['id'] for p in PARTS], n_months),
+        'part_name': np.tile([p['name'] for p in PARTS], n_months),
+        'sku': np.tile([p['sku'] for p in PARTS], n_months),
+        'category': np.tile([p['category'] for p in PARTS], n_months),
+        'demand': demand,
+        'inventory_level': inventory,
+        'price': np.tile([p['price'] for p in PARTS], n_months),
+        'sales_volume': sales_volume,
+    })
+    
+    return monthly, dealership, parts
+
+
+def generate_streaming(fmt='csv', scale=1.0, workers=1, chunk_days=7, seed=42):
+    """Generate all datasets chunk by chunk with bounded memory.
+    
+    Sales and service tickets are written as they are produced; only per-month
+    totals are kept in memory to derive the small aggregate datasets.
+    """
+    tasks = [
+        (i, start, end, scale, seed)
+        for i, (start, end) in enumerate(chunk_ranges(chunk_days))
+    ]
+    sales_writer = ChunkWriter('sales_history', fmt)
+    tickets_writer = ChunkWriter('service_tickets', fmt)
+    summaries = []
+    
+    def write_chunk(result):
+        sales, tickets, summary = result
+        sales_writer.write(add_ids(sales, 'SL', sales_writer.rows))
+        tickets_writer.write(add_ids(tickets, 'T', tickets_writer.rows))
+        summaries.append(summary)
+        print(f"  {sales_writer.rows:,} sales, {tickets_writer.rows:,} tickets written",
+              end='\r', flush=True)
+    
+    try:
+        if workers > 1:
+            # Keep at most 2 chunks per worker in flight so memory stays bounded
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                pending = deque()
+                for task in tasks:
+                    pending.append(executor.submit(generate_chunk, task))
+                    if len(pending) >= workers * 2:
+                        write_chunk(pending.popleft().result())
+                while pending:
+                    write_chunk(pending.popleft().result())
+        else:
+            for task in tasks:
+                write_chunk(generate_chunk(task))
+    except BaseException:
+        sales_writer.abort()
+        tickets_writer.abort()
+        raise
+    
+    print()
+    sales_writer.close()
+    tickets_writer.close()
+    
+    monthly, dealership, parts = derived_datasets(summaries, seed)
+    save_dataset(monthly, 'monthly_aggregates', fmt=fmt)
+    save_dataset(dealership, 'dealership_metrics', fmt=fmt)
+    save_dataset(parts, 'parts_inventory', fmt=fmt)
+    
+    return {
+        'sales': sales_writer.rows,
+        'tickets': tickets_writer.rows,
+        'parts': len(parts),
+        'monthly': len(monthly),
+        'dealership': len(dealership),
+    }
+
+
 def main():
     """Generate all training datasets."""
+    parser = argparse.ArgumentParser(description='Generate E Corp training data')
+    parser.add_argument(
+        '--format', choices=list(FORMATS), default='csv',
+        help='Output format; feather/parquet store typed columns (requires pyarrow)'
+    )
+    parser.add_argument(
+        '--streaming', action='store_true',
+        help='Vectorized chunked generator with bounded memory (for large datasets)'
+    )
+    parser.add_argument(
+        '--scale', type=float, default=1.0,
+        help='Streaming mode: multiplier on daily sales and ticket volume'
+    )
+    parser.add_argument(
+        '--workers', type=int, default=1,
+        help='Streaming mode: number of generator processes'
+    )
+    parser.add_argument(
+        '--chunk-days', type=int, default=7,
+        help='Streaming mode: days generated per chunk'
+    )
+    parser.add_argument(
+        '--seed', type=int, default=42,
+        help='Streaming mode: base seed; chunk seeds derive from it'
+    )
+    args = parser.parse_args()
+    
     print("Starting data generation...")
     print("=" * 50)
     
+    if args.streaming:
+        counts = generate_streaming(args.format, args.scale, args.workers,
+                                    args.chunk_days, args.seed)
+        generate_metadata()
+        
+        print("=" * 50)
+        print("Data generation complete!")
+        print("\nDataset Summary:")
+        print(f"  - Sales records: {counts['sales']}")
+        print(f"  - Parts inventory records: {counts['parts']}")
+        print(f"  - Service tickets: {counts['tickets']}")
+        print(f"  - Monthly aggregates: {counts['monthly']}")
+        print(f"  - Dealership metrics: {counts['dealership']}")
+        print("\nFiles saved in 'data/' directory")
+        return
+    
     # Generate datasets
-    sales_df = generate_sales_data()
-    parts_df = generate_parts_inventory_data(sales_df)
-    tickets_df = generate_service_tickets_data(sales_df)
-    monthly_df = generate_monthly_aggregates(sales_df)
-    dealership_df = generate_dealership_metrics(sales_df, parts_df)
+    sales_df = generate_sales_data(args.format)
+    parts_df = generate_parts_inventory_data(sales_df, args.format)
+    tickets_df = generate_service_tickets_data(sales_df, args.format)
+    monthly_df = generate_monthly_aggregates(sales_df, args.format)
+    dealership_df = generate_dealership_metrics(sales_df, parts_df, args.format)
     generate_metadata()
     
     print("=" * 50)
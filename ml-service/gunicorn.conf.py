@@ -0,0 +1,68 @@
+"""
+Gunicorn configuration for serving the E Corp ML service in production.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+The app is preloaded in the master process, so the datasets (memory-mapped
+Feather files or parsed DataFrames) and NumPy models are loaded once and
+shared copy-on-write with the forked workers. TensorFlow is never imported in
+the master: its thread pools do not survive fork(), so with the Keras runtime
+each worker loads its own models after forking.
+
+Environment:
+    FLASK_PORT               Port to bind (default 5001)
+    ML_WORKERS               Worker processes (default: CPU count, at most 8)
+    ML_THREADS               Threads per worker (default 4)
+    ML_TF_INTRA_OP_THREADS   TensorFlow intra-op threads per worker (default: cores / workers)
+    ML_TF_INTER_OP_THREADS   TensorFlow inter-op threads per worker (default 1)
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('FLASK_PORT', 5001)}"
+
+workers = int(os.environ.get('ML_WORKERS', min(cpu_count, 8)))
+# Threads keep a worker responsive while one request is in NumPy/TensorFlow code
+worker_class = 'gthread'
+threads = int(os.environ.get('ML_THREADS', 4))
+
+preload_app = True
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = '-'
+errorlog = '-'
+
+# Read by app.py at import time (in the master, because of preload_app)
+os.environ.setdefault('ML_MODEL_LOADING', 'preload')
+
+# Split the cores between workers rather than letting every worker's
+# TensorFlow size its pools to the whole machine
+os.environ.setdefault('ML_TF_INTRA_OP_THREADS', str(max(1, cpu_count // workers)))
+os.environ.setdefault('ML_TF_INTER_OP_THREADS', '1')
+
+
+def when_ready(server):
+    if 'tensorflow' in sys.modules:
+        server.log.warning(
+            "TensorFlow was imported before fork; workers may hang. "
+            "Use the NumPy runtime or ML_MODEL_LOADING=preload."
+        )
+
+    # Move everything loaded so far out of the collector's generations, so
+    # garbage collection in the workers does not touch (and copy) shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # The app module is already imported (preloaded); this only starts loading
+    # models that could not be loaded before fork, e.g. the Keras runtime
+    import app
+
+    app.models.start()
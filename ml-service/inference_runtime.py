@@ -0,0 +1,164 @@
+"""
+Pure NumPy inference runtime for the trained forecasting models.
+Runs the exported LSTM/Dense weights without TensorFlow, Keras or scikit-learn.
+
+Artifacts are .npz files written by train_models.py next to the .keras models.
+They hold the layer weights, a JSON description of the layer stack and the
+MinMaxScaler parameters, so serving needs nothing but NumPy.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from forecasting import PartsDemandPredictor, SalesForecaster
+
+SALES_ARTIFACT_PATH = 'models/sales_forecast_model.npz'
+PARTS_ARTIFACT_PATH = 'models/parts_demand_model.npz'
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'sigmoid': lambda x: 1 / (1 + np.exp(-x)),
+    'tanh': np.tanh,
+}
+
+
+class MinMaxTransform:
+    """NumPy equivalent of a fitted sklearn MinMaxScaler."""
+
+    def __init__(self, min_, scale_):
+        self.min_ = np.asarray(min_, dtype=float)
+        self.scale_ = np.asarray(scale_, dtype=float)
+
+    def transform(self, X):
+        return np.asarray(X, dtype=float) * self.scale_ + self.min_
+
+    def inverse_transform(self, X):
+        return (np.asarray(X, dtype=float) - self.min_) / self.scale_
+
+
+def lstm_forward(x, kernel, recurrent_kernel, bias, activation='tanh',
+                 recurrent_activation='sigmoid', return_sequences=False):
+    """Run a Keras-compatible LSTM layer over x of shape (..., steps, features).
+
+    Any leading axes are batch axes; weights with extra leading axes (a stacked
+    fleet, see model_fleet.py) broadcast against them.
+    """
+    act = ACTIVATIONS[activation]
+    rec_act = ACTIVATIONS[recurrent_activation]
+    *batch, steps, _ = x.shape
+    units = recurrent_kernel.shape[-2]
+
+    h = np.zeros((*batch, units), dtype=x.dtype)
+    c = np.zeros((*batch, units), dtype=x.dtype)
+    outputs = np.empty((*batch, steps, units), dtype=x.dtype) if return_sequences else None
+
+    # Input projections for every timestep in one matmul; gates are ordered i, f, c, o
+    x_proj = x @ kernel + bias
+    for t in range(steps):
+        z = x_proj[..., t, :] + h @ recurrent_kernel
+        i = rec_act(z[..., :units])
+        f = rec_act(z[..., units:2 * units])
+        g = act(z[..., 2 * units:3 * units])
+        o = rec_act(z[..., 3 * units:])
+        c = f * c + i * g
+        h = o * act(c)
+        if return_sequences:
+            outputs[..., t, :] = h
+
+    return outputs if return_sequences else h
+
+
+def dense_forward(x, kernel, bias, activation='linear'):
+    """Run a Keras-compatible Dense layer."""
+    return ACTIVATIONS[activation](x @ kernel + bias)
+
+
+class NumpySequential:
+    """Minimal stand-in for a Keras Sequential model exposing predict()."""
+
+    def __init__(self, layers, weights):
+        # layers: list of dicts with 'type' ('lstm' or 'dense') and layer options
+        # weights: list of weight-array lists, one per layer
+        self.layers = layers
+        self.weights = weights
+
+    def predict(self, x, batch_size=None, verbose=0):
+        """Forward pass over a whole batch; batch_size/verbose mirror Keras."""
+        out = np.asarray(x, dtype=np.float32)
+        for layer, weights in zip(self.layers, self.weights):
+            if layer['type'] == 'lstm':
+                out = lstm_forward(
+                    out, *weights,
+                    activation=layer['activation'],
+                    recurrent_activation=layer['recurrent_activation'],
+                    return_sequences=layer['return_sequences'],
+                )
+            else:
+                out = dense_forward(out, *weights, activation=layer['activation'])
+        return out
+
+
+def save_artifact(path, layers, weights, scalers, **config):
+    """Write layer specs, weights and scaler parameters to an .npz artifact."""
+    arrays = {}
+    for i, layer_weights in enumerate(weights):
+        for j, array in enumerate(layer_weights):
+            arrays[f'layer{i}_w{j}'] = np.asarray(array, dtype=np.float32)
+    for name, scaler in scalers.items():
+        arrays[f'{name}_min'] = scaler.min_
+        arrays[f'{name}_scale'] = scaler.scale_
+
+    config = dict(config, layers=layers, scalers=list(scalers))
+    np.savez(path, config=np.array(json.dumps(config)), **arrays)
+
+
+def load_artifact(path):
+    """Read an .npz artifact into (config, NumpySequential, scalers)."""
+    with np.load(path) as data:
+        config = json.loads(str(data['config']))
+        weights = []
+        for i in range(len(config['layers'])):
+            layer_weights = []
+            j = 0
+            while f'layer{i}_w{j}' in data:
+                layer_weights.append(data[f'layer{i}_w{j}'])
+                j += 1
+            weights.append(layer_weights)
+        scalers = {
+            name: MinMaxTransform(data[f'{name}_min'], data[f'{name}_scale'])
+            for name in config['scalers']
+        }
+
+    return config, NumpySequential(config['layers'], weights), scalers
+
+
+class NumpySalesForecastModel(SalesForecaster):
+    """Sales forecaster served from an exported NumPy artifact."""
+
+    def __init__(self):
+        self.lookback = None
+        self.model = None
+        self.scaler = None
+
+    def load(self, path=SALES_ARTIFACT_PATH):
+        config, self.model, scalers = load_artifact(path)
+        self.lookback = config['lookback']
+        self.scaler = scalers['scaler']
+        self.version = os.path.getmtime(path)
+
+
+class NumpyPartsDemandModel(PartsDemandPredictor):
+    """Parts demand predictor served from an exported NumPy artifact."""
+
+    def __init__(self):
+        self.model = None
+        self.scaler_X = None
+        self.scaler_y = None
+
+    def load(self, path=PARTS_ARTIFACT_PATH):
+        _, self.model, scalers = load_artifact(path)
+        self.scaler_X = scalers['scaler_X']
+        self.scaler_y = scalers['scaler_y']
@@ -0,0 +1,177 @@
+"""
+Incremental ingestion of new sales, service tickets and parts inventory rows.
+Validates incoming records and folds them into the monthly and dealership aggregates
+by updating only the affected months and dealerships.
+"""
+
+import pandas as pd
+
+from change_log import VERSION_COLUMN
+from compact import encode_ids
+from data_store import apply_schema
+
+SALES_FIELDS = ['id', 'date', 'dealership', 'model', 'price']
+TICKET_FIELDS = ['id', 'created_at', 'vehicle_model', 'issue', 'status']
+PARTS_FIELDS = [
+    'month', 'part_id', 'part_name', 'sku', 'category',
+    'demand', 'inventory_level', 'price', 'sales_volume',
+]
+
+# Columns of validated rows; month feeds the aggregates and is dropped when compacted
+SALES_COLUMNS = ['id', 'date', 'dealership', 'location', 'model', 'price', 'month']
+TICKET_COLUMNS = ['id', 'created_at', 'vehicle_model', 'issue', 'status', 'completed_at', 'month']
+
+TICKET_STATUSES = ['open', 'in_progress', 'completed']
+
+# Midpoint of the 20-25% of sales used for parts cost in the generated metrics
+PARTS_COST_RATIO = 0.225
+
+
+def records_frame(records, required, kind):
+    """DataFrame from a list of JSON objects, checking required fields are present."""
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ValueError(f"'{kind}' must be a list of objects")
+
+    df = pd.DataFrame.from_records(records)
+    missing = [field for field in required if field not in df.columns]
+    if missing:
+        raise ValueError(f"{kind} records missing fields: {', '.join(missing)}")
+    empty = [field for field in required if df[field].isna().any()]
+    if empty:
+        raise ValueError(f"{kind} records have empty fields: {', '.join(empty)}")
+
+    return df
+
+
+def check_new_ids(new_ids, existing_ids, kind, id_codec=None):
+    """Reject ids repeated within the batch or already present.
+
+    existing_ids are codes under id_codec (see compact.py); new ids that do
+    not fit the codec are rejected too.
+    """
+    try:
+        codes = pd.Series(encode_ids(new_ids, id_codec))
+    except ValueError as e:
+        raise ValueError(f'{kind.capitalize()} {e}') from e
+    duplicated = new_ids[(codes.duplicated() | codes.isin(existing_ids)).to_numpy()]
+    if len(duplicated):
+        raise ValueError(f"Duplicate {kind} ids: {', '.join(duplicated.astype(str)[:5])}")
+
+
+def sales_rows(records, existing, locations, id_codec=None):
+    """Validate sales records and derive location and month like the generator.
+
+    existing is the compact sales table and id_codec the codec of its ids.
+    locations maps dealership names to their location; records may also carry
+    their own location for a new dealership.
+    """
+    df = records_frame(records, SALES_FIELDS, 'sales')
+    df['id'] = df['id'].astype(str)
+    df['date'] = pd.to_datetime(df['date']).dt.normalize()
+    df['price'] = pd.to_numeric(df['price']).astype(float)
+
+    known = df['dealership'].map(locations)
+    df['location'] = df['location'].fillna(known) if 'location' in df.columns else known
+    unknown = df.loc[df['location'].isna(), 'dealership'].unique()
+    if len(unknown):
+        raise ValueError(f"Unknown dealerships: {', '.join(map(str, unknown))}")
+
+    df['month'] = df['date'].dt.strftime('%Y-%m')
+
+    check_new_ids(df['id'], existing['id'], 'sale', id_codec)
+    return df[SALES_COLUMNS]
+
+
+def ticket_rows(records, existing, id_codec=None):
+    """Validate service ticket records and derive their month.
+
+    existing is the compact tickets table and id_codec the codec of its ids.
+    """
+    df = records_frame(records, TICKET_FIELDS, 'serviceTickets')
+    df['id'] = df['id'].astype(str)
+    df['created_at'] = pd.to_datetime(df['created_at']).dt.normalize()
+    completed = df['completed_at'] if 'completed_at' in df.columns else None
+    df['completed_at'] = pd.to_datetime(completed).dt.normalize() if completed is not None else pd.NaT
+
+    invalid = sorted(set(df['status']) - set(TICKET_STATUSES))
+    if invalid:
+        raise ValueError(f"Unknown ticket statuses: {', '.join(map(str, invalid))}")
+
+    df['month'] = df['created_at'].dt.strftime('%Y-%m')
+
+    check_new_ids(df['id'], existing['id'], 'ticket', id_codec)
+    return df[TICKET_COLUMNS]
+
+
+def parts_rows(records, existing):
+    """Validate parts inventory records for one or more months."""
+    df = records_frame(records, PARTS_FIELDS, 'parts')
+    for column in ['demand', 'inventory_level', 'price', 'sales_volume']:
+        df[column] = pd.to_numeric(df[column]).astype('int64')
+
+    if df.duplicated(['month', 'part_id']).any():
+        raise ValueError("parts records repeat a (month, part_id) pair")
+    return df[[column for column in existing.columns if column != VERSION_COLUMN]]
+
+
+def append_rows(df, new_rows):
+    """Append rows and restore the dataset schema (categoricals and dates)."""
+    return apply_schema(pd.concat([df, new_rows], ignore_index=True))
+
+
+def upsert_parts(parts_df, new_rows):
+    """Replace inventory rows for the same (month, part_id), appending the rest."""
+    keys = pd.MultiIndex.from_frame(new_rows[['month', 'part_id']])
+    existing = pd.MultiIndex.from_frame(parts_df[['month', 'part_id']].astype(str))
+    kept = parts_df.loc[~existing.isin(keys)]
+
+    parts = append_rows(kept, new_rows)
+    return parts.sort_values('month', kind='stable').reset_index(drop=True)
+
+
+def update_monthly(monthly_df, new_sales):
+    """Add new sales to the monthly aggregates, touching only their months."""
+    delta = new_sales.groupby('month').agg(
+        total_sales=('price', 'sum'),
+        units_sold=('price', 'size'),
+    )
+
+    monthly = monthly_df.set_index('month')
+    touched = delta.index.intersection(monthly.index)
+    monthly.loc[touched, 'total_sales'] += delta.loc[touched, 'total_sales']
+    monthly.loc[touched, 'units_sold'] += delta.loc[touched, 'units_sold']
+
+    monthly = pd.concat([monthly, delta.drop(touched)]).sort_index(kind='stable')
+    return monthly.reset_index()
+
+
+def update_dealership_metrics(dealership_df, new_sales):
+    """Add new sales to the dealership metrics, touching only their (month, dealership) rows.
+
+    Parts cost for the new sales is estimated at PARTS_COST_RATIO and the gross
+    margin of each touched row is recomputed.
+    """
+    delta = new_sales.groupby(['month', 'dealership'], sort=False).agg(
+        location=('location', 'first'),
+        sales_amount=('price', 'sum'),
+        units_sold=('price', 'size'),
+    )
+    delta['parts_cost'] = delta['sales_amount'] * PARTS_COST_RATIO
+
+    metrics = dealership_df.astype({'dealership': str, 'location': str}).set_index(['month', 'dealership'])
+    touched = delta.index.intersection(metrics.index)
+    for column in ['sales_amount', 'units_sold', 'parts_cost']:
+        metrics.loc[touched, column] += delta.loc[touched, column]
+
+    metrics = pd.concat([metrics, delta.drop(touched)])
+
+    # Rounded like the generated metrics, then the margin follows from the totals
+    changed = delta.index
+    sales = metrics.loc[changed, 'sales_amount'].round(2)
+    parts_cost = metrics.loc[changed, 'parts_cost'].round(2)
+    metrics.loc[changed, 'sales_amount'] = sales
+    metrics.loc[changed, 'parts_cost'] = parts_cost
+    metrics.loc[changed, 'gross_margin'] = ((sales - parts_cost) / sales * 100).round(2)
+
+    metrics = metrics.reset_index().sort_values('month', kind='stable').reset_index(drop=True)
+    return apply_schema(metrics)
@@ -0,0 +1,121 @@
+"""
+HTTP load test for a running E Corp ML service.
+Drives each endpoint with concurrent keep-alive clients and reports req/s and latency percentiles.
+
+Usage:
+    python loadtest.py --url http://localhost:5001 --concurrency 16 --duration 10
+    python loadtest.py --endpoints /api/analytics /api/parts --requests 2000
+"""
+
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+DEFAULT_ENDPOINTS = [
+    '/health',
+    '/api/analytics',
+    '/api/sales?limit=50',
+    '/api/parts',
+    '/api/service-tickets?limit=50',
+    '/api/orders',
+    '/api/metadata',
+]
+
+
+def client_loop(host, port, path, deadline, budget, latencies, errors, lock):
+    """Issue requests on one keep-alive connection until the deadline or budget runs out."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local_latencies = []
+    local_errors = 0
+
+    while time.perf_counter() < deadline:
+        with lock:
+            if budget[0] <= 0:
+                break
+            budget[0] -= 1
+
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors += 1
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local_latencies.append(time.perf_counter() - start)
+
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+
+def run_endpoint(url, path, concurrency, duration, max_requests):
+    """Load one endpoint and return its throughput and latency summary."""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+
+    latencies, errors, budget = [], [0], [max_requests or float('inf')]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    start = time.perf_counter()
+    clients = [
+        threading.Thread(
+            target=client_loop,
+            args=(host, port, path, deadline, budget, latencies, errors, lock),
+        )
+        for _ in range(concurrency)
+    ]
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        'endpoint': path,
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': float(np.percentile(ms, 50)) if len(ms) else float('nan'),
+        'p99': float(np.percentile(ms, 99)) if len(ms) else float('nan'),
+        'max': float(ms.max()) if len(ms) else float('nan'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5001', help='Base URL of the service')
+    parser.add_argument('--endpoints', nargs='+', default=DEFAULT_ENDPOINTS)
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients per endpoint')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per endpoint')
+    parser.add_argument('--requests', type=int, default=0,
+                        help='Stop an endpoint after this many requests (0 = duration only)')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per endpoint first')
+    args = parser.parse_args()
+
+    print(f"Load testing {args.url} with {args.concurrency} clients, "
+          f"{args.duration:g}s per endpoint\n")
+    print(f"{'endpoint':<36}{'requests':>10}{'errors':>8}{'req/s':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+    for path in args.endpoints:
+        if args.warmup:
+            run_endpoint(args.url, path, 1, args.duration, args.warmup)
+        result = run_endpoint(args.url, path, args.concurrency, args.duration, args.requests)
+        print(f"{result['endpoint']:<36}{result['requests']:>10}{result['errors']:>8}"
+              f"{result['rps']:>10.1f}{result['p50']:>10.2f}{result['p99']:>10.2f}{result['max']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+In-process metrics for the ML service, rendered in the Prometheus text format.
+Records per-route latency histograms, per-stage timings (pandas, inference, serialization),
+counters and gauges, plus an opt-in sampling profiler for slow requests.
+
+Metrics are per process: under gunicorn each worker reports its own.
+"""
+
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from contextlib import contextmanager
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = [
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    ]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram for one label set."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """(le, cumulative count) pairs including +Inf."""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield bound, cumulative
+        yield float('inf'), self.count
+
+
+class Metrics:
+    """Registry of counters and histograms plus collectors for derived gauges.
+
+    Stage timings are accumulated per request (a stage may be entered several
+    times) and observed once when the request ends.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(value)
+
+    def register_collector(self, collector):
+        """Add a callable returning [(name, type, help, [(labels, value), ...]), ...]."""
+        self._collectors.append(collector)
+
+    # Per-request stage timing
+
+    def begin_request(self):
+        self._local.stages = Counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as part of the current request's `name` stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stages = getattr(self._local, 'stages', None)
+            if stages is not None:
+                stages[name] += time.perf_counter() - start
+
+    def end_request(self, route, method, status, seconds):
+        labels = {'route': route, 'method': method}
+        self.observe('ml_service_request_seconds', seconds, **labels)
+        self.inc('ml_service_requests_total', status=str(status), **labels)
+
+        stages = getattr(self._local, 'stages', None) or {}
+        for stage, stage_seconds in stages.items():
+            self.observe('ml_service_stage_seconds', stage_seconds, route=route, stage=stage)
+        self._local.stages = None
+
+    # Exposition
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def header(name, kind):
+            if name in self._help:
+                lines.append(f'# HELP {name} {self._help[name]}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.samples()), h.sum, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        for name in sorted(counters):
+            header(name, 'counter')
+            for key, value in sorted(counters[name].items()):
+                lines.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+
+        for name in sorted(histograms):
+            header(name, 'histogram')
+            for key, (buckets, total, count) in sorted(histograms[name].items()):
+                for bound, cumulative in buckets:
+                    le = (('le', _format_value(bound)),)
+                    lines.append(f'{name}_bucket{_format_labels(key, le)} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(key)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(key)} {count}')
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(_label_key(labels))} {_format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests and keeps profiles of slow ones.
+
+    One sampler thread (started on first use, restarted after fork) reads
+    sys._current_frames() every interval_ms for the threads currently serving
+    requests. When a request takes longer than threshold_ms its most common
+    stacks are kept, newest last, up to max_profiles.
+    """
+
+    def __init__(self, threshold_ms, interval_ms=5, max_profiles=20, max_depth=30):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.max_depth = max_depth
+        self.profiles = deque(maxlen=max_profiles)
+        self._active = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._active = {}
+            thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+            thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                active = dict(self._active)
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in active.items():
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[self._fold(frame)] += 1
+
+    def _fold(self, frame):
+        """Collapsed stack, outermost frame first."""
+        entries = traceback.extract_stack(frame, limit=self.max_depth)
+        return ';'.join(
+            f'{os.path.basename(entry.filename)}:{entry.name}:{entry.lineno}' for entry in entries
+        )
+
+    def start(self):
+        self._ensure_started()
+        with self._lock:
+            self._active[threading.get_ident()] = Counter()
+
+    def stop(self, route, seconds):
+        with self._lock:
+            stacks = self._active.pop(threading.get_ident(), None)
+        if stacks is None or seconds < self.threshold:
+            return
+
+        self.profiles.append({
+            'route': route,
+            'durationMs': round(seconds * 1000, 1),
+            'samples': sum(stacks.values()),
+            'intervalMs': self.interval * 1000,
+            'timestamp': time.time(),
+            'topStacks': [
+                {'stack': stack, 'samples': count} for stack, count in stacks.most_common(10)
+            ],
+        })
+        print(f"⚠ Slow request: {route} took {seconds * 1000:.0f} ms "
+              f"({sum(stacks.values())} samples)")
+
+
+# Shared by the app, the caches and the models
+metrics = Metrics()
+
+metrics.describe('ml_service_request_seconds', 'Request latency by route.')
+metrics.describe('ml_service_requests_total', 'Requests by route, method and status.')
+metrics.describe('ml_service_stage_seconds',
+                 'Time per request spent in pandas, model inference and JSON serialization.')
+metrics.describe('ml_service_exceptions_total', 'Unhandled exceptions by route and type.')
+metrics.describe('ml_service_model_calls_total', 'Model forward passes by model.')
+metrics.describe('ml_service_model_rows_total', 'Rows predicted by model.')
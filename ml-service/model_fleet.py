@@ -0,0 +1,249 @@
+"""
+Model fleets: many same-architecture models served as one batched engine.
+Per-dealership sales forecasters and per-category parts demand models are stored
+in a single artifact with every weight stacked along a leading member axis.
+
+One forward pass runs every member of a fleet on its own inputs, so serving
+N members costs about as much as serving one model with N times the rows,
+not N separate models.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from features import parts_demand_features
+from inference_runtime import MinMaxTransform, dense_forward, lstm_forward
+from metrics import metrics
+
+FLEET_ARTIFACT_PATH = 'models/model_fleet.npz'
+
+
+def _expand(weight, ndim):
+    """Insert axes after the member axis so weight broadcasts against ndim-dim inputs."""
+    return weight.reshape(weight.shape[:1] + (1,) * (ndim - weight.ndim) + weight.shape[1:])
+
+
+class StackedSequential:
+    """A fleet of same-architecture networks evaluated together.
+
+    Weights carry a leading member axis; predict() takes inputs shaped
+    (members, batch, ...) and runs each member on its own slice.
+    """
+
+    def __init__(self, layers, weights):
+        self.layers = layers
+        self.weights = weights
+
+    @property
+    def n_members(self):
+        return len(self.weights[0][0])
+
+    def predict(self, x):
+        out = np.asarray(x, dtype=np.float32)
+        for layer, weights in zip(self.layers, self.weights):
+            if layer['type'] == 'lstm':
+                kernel, recurrent_kernel, bias = weights
+                out = lstm_forward(
+                    out, _expand(kernel, out.ndim), recurrent_kernel, _expand(bias, out.ndim),
+                    activation=layer['activation'],
+                    recurrent_activation=layer['recurrent_activation'],
+                    return_sequences=layer['return_sequences'],
+                )
+            else:
+                kernel, bias = weights
+                out = dense_forward(
+                    out, _expand(kernel, out.ndim), _expand(bias, out.ndim),
+                    activation=layer['activation'],
+                )
+        return out
+
+
+def stack_members(member_specs):
+    """Combine per-member (layers, weights) exports into (layers, stacked weights).
+
+    Every member must have the same layer stack and weight shapes.
+    """
+    layers = member_specs[0][0]
+    for member_layers, _ in member_specs[1:]:
+        if member_layers != layers:
+            raise ValueError("Fleet members must share one architecture")
+
+    member_weights = [weights for _, weights in member_specs]
+    return layers, [
+        [np.stack([weights[i][j] for weights in member_weights]).astype(np.float32)
+         for j in range(len(member_weights[0][i]))]
+        for i in range(len(layers))
+    ]
+
+
+class SalesFleet:
+    """One-step sales forecasters, one per series, forecast autoregressively together."""
+
+    def __init__(self, members, model, scaler, lookback):
+        self.members = list(members)
+        self.index = {name: i for i, name in enumerate(self.members)}
+        self.model = model
+        # Per-member MinMax parameters shaped (members, 1)
+        self.scaler = scaler
+        self.lookback = lookback
+
+    def forecast(self, series, n_months):
+        """Forecast the next n_months of every series that has a fleet member.
+
+        series is a (name x month) DataFrame in calendar order, as built by
+        features.dealership_sales_series. Returns {name: array of n_months};
+        names without a member or with fewer than lookback months are left out.
+        """
+        names = [
+            name for name in series.index
+            if name in self.index and series.shape[1] >= self.lookback
+        ]
+        if not names or n_months <= 0:
+            return {}
+        rows = np.array([self.index[name] for name in names])
+
+        # Rolling buffer per member: the scaled window followed by its predictions
+        buffer = np.zeros((len(self.members), self.lookback + n_months))
+        windows = series.loc[names].to_numpy(dtype=float)[:, -self.lookback:]
+        buffer[rows, :self.lookback] = windows * self.scaler.scale_[rows] + self.scaler.min_[rows]
+
+        for step in range(n_months):
+            x = buffer[:, step:step + self.lookback].reshape(len(self.members), 1, self.lookback, 1)
+            buffer[:, self.lookback + step] = self.model.predict(x)[:, 0, 0]
+            metrics.inc('ml_service_model_calls_total', model='sales_fleet')
+            metrics.inc('ml_service_model_rows_total', len(self.members), model='sales_fleet')
+
+        predictions = self.scaler.inverse_transform(buffer[:, self.lookback:])
+        return {name: predictions[row] for name, row in zip(names, rows)}
+
+
+class PartsFleet:
+    """Parts demand models, one per group of parts (by default their category)."""
+
+    def __init__(self, members, model, scaler_X, scaler_y, group_column='category'):
+        self.members = list(members)
+        self.index = {name: i for i, name in enumerate(self.members)}
+        self.model = model
+        self.scaler_X = scaler_X
+        self.scaler_y = scaler_y
+        self.group_column = group_column
+
+    def predict_demand_batch(self, parts_rows, fallback=None):
+        """Predict next-period demand for every row with its group's member model.
+
+        Rows are packed into a (members, rows per member, features) block so
+        the whole fleet runs in one pass. Rows whose group has no member use
+        fallback.predict_demand_batch, or keep their current demand.
+        """
+        n_rows = len(parts_rows)
+        predictions = np.zeros(n_rows, dtype=int)
+        if n_rows == 0:
+            return predictions
+
+        member = parts_rows[self.group_column].astype(str).map(self.index).to_numpy(dtype=float)
+        covered = ~np.isnan(member)
+
+        if covered.any():
+            codes = member[covered].astype(int)
+            features = self.scaler_X.transform(parts_demand_features(parts_rows[covered]))
+
+            # Position of each row within its member's slice of the block
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes, minlength=len(self.members))
+            starts = np.cumsum(counts) - counts
+            sorted_codes = codes[order]
+            slots = np.arange(len(codes)) - starts[sorted_codes]
+
+            block = np.zeros((len(self.members), counts.max(), features.shape[1]))
+            block[sorted_codes, slots] = features[order]
+            outputs = self.model.predict(block)
+            metrics.inc('ml_service_model_calls_total', model='parts_fleet')
+            metrics.inc('ml_service_model_rows_total', len(codes), model='parts_fleet')
+
+            scaled = np.empty(len(codes))
+            scaled[order] = outputs[sorted_codes, slots, 0]
+            demand = self.scaler_y.inverse_transform(scaled.reshape(-1, 1))[:, 0]
+            predictions[covered] = np.maximum(demand, 0).astype(int)
+
+        if not covered.all():
+            rest = parts_rows[~covered]
+            predictions[~covered] = (
+                fallback.predict_demand_batch(rest) if fallback is not None
+                else rest['demand'].astype(int).to_numpy()
+            )
+
+        return predictions
+
+
+def save_fleet(path, **fleets):
+    """Write fleets to one artifact.
+
+    Each keyword names a fleet ('sales', 'parts') and maps to a dict with
+    members, layers, stacked weights, scalers {name: (min_, scale_)} and any
+    further config such as lookback.
+    """
+    arrays = {}
+    config = {}
+    for fleet, spec in fleets.items():
+        spec = dict(spec)
+        weights = spec.pop('weights')
+        scalers = spec.pop('scalers')
+        for i, layer_weights in enumerate(weights):
+            for j, array in enumerate(layer_weights):
+                arrays[f'{fleet}_layer{i}_w{j}'] = np.asarray(array, dtype=np.float32)
+        for name, (min_, scale_) in scalers.items():
+            arrays[f'{fleet}_{name}_min'] = np.asarray(min_, dtype=float)
+            arrays[f'{fleet}_{name}_scale'] = np.asarray(scale_, dtype=float)
+        config[fleet] = dict(spec, members=list(spec['members']), scalers=list(scalers))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, config=np.array(json.dumps(config)), **arrays)
+    os.replace(tmp_path, path)
+
+
+class ModelFleet:
+    """The sales and parts fleets loaded from one stacked artifact."""
+
+    def __init__(self):
+        self.sales = None
+        self.parts = None
+        self.version = None
+
+    def load(self, path=FLEET_ARTIFACT_PATH):
+        with np.load(path) as data:
+            config = json.loads(str(data['config']))
+            loaded = {}
+            for fleet, spec in config.items():
+                weights = []
+                for i in range(len(spec['layers'])):
+                    layer_weights = []
+                    j = 0
+                    while f'{fleet}_layer{i}_w{j}' in data:
+                        layer_weights.append(data[f'{fleet}_layer{i}_w{j}'])
+                        j += 1
+                    weights.append(layer_weights)
+                scalers = {
+                    name: MinMaxTransform(data[f'{fleet}_{name}_min'], data[f'{fleet}_{name}_scale'])
+                    for name in spec['scalers']
+                }
+                loaded[fleet] = (spec, StackedSequential(spec['layers'], weights), scalers)
+
+        if 'sales' in loaded:
+            spec, model, scalers = loaded['sales']
+            self.sales = SalesFleet(spec['members'], model, scalers['scaler'], spec['lookback'])
+        if 'parts' in loaded:
+            spec, model, scalers = loaded['parts']
+            self.parts = PartsFleet(spec['members'], model, scalers['scaler_X'],
+                                    scalers['scaler_y'], spec['group_column'])
+        self.version = os.path.getmtime(path)
+
+    def summary(self):
+        """Member names per fleet for the health endpoint."""
+        return {
+            name: fleet.members
+            for name, fleet in (('sales', self.sales), ('parts', self.parts))
+            if fleet is not None
+        }
@@ -0,0 +1,433 @@
+"""
+Background loading and hot swapping of the trained ML models.
+Keeps TensorFlow out of the import path so the HTTP server can start serving immediately.
+
+Two runtimes are supported: 'keras' loads the .keras models with TensorFlow,
+'numpy' loads the exported .npz artifacts (see inference_runtime.py) and never
+imports TensorFlow. 'auto' uses the NumPy artifacts when they exist.
+
+With micro-batching on, the loaded networks are wrapped in BatchedModel so
+concurrent requests share forward passes (ML_BATCH_MAX_SIZE rows, waiting at
+most ML_BATCH_MAX_WAIT_MS for a batch to fill). ML_BATCHING is 'auto' by
+default: on for Keras, whose per-call overhead dominates small batches, and
+off for NumPy, where a single-row pass is cheaper than the batching wait.
+
+The model fleet (per-dealership and per-category models, see model_fleet.py)
+is loaded alongside with either runtime when its artifact exists. It is
+already batched across members and always runs on NumPy.
+
+Models come from the registry version named by models/registry/CURRENT
+(see model_registry.py), or from models/ when no version was activated.
+A new version is loaded and warmed up in the background and then swapped in
+with a single assignment; requests keep using the previous version until
+then. The last ML_MODEL_VERSIONS_IN_MEMORY versions stay loaded, so rolling
+back to one of them is instant. Each process re-reads CURRENT at most every
+ML_REGISTRY_POLL_SECONDS, so activating a version reaches every gunicorn worker.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from batching import BatchedModel
+from model_fleet import FLEET_ARTIFACT_PATH, ModelFleet
+from model_registry import ModelRegistry
+from inference_runtime import (
+    SALES_ARTIFACT_PATH,
+    PARTS_ARTIFACT_PATH,
+    NumpySalesForecastModel,
+    NumpyPartsDemandModel,
+)
+
+SALES_MODEL_PATH = 'models/sales_forecast_model.keras'
+PARTS_MODEL_PATH = 'models/parts_demand_model.keras'
+
+MODEL_FILES = [SALES_MODEL_PATH, PARTS_MODEL_PATH]
+
+ARTIFACT_FILES = [SALES_ARTIFACT_PATH, PARTS_ARTIFACT_PATH]
+
+# Everything a registry version holds; the Keras scalers sit next to their models
+REGISTRY_FILES = ARTIFACT_FILES + [FLEET_ARTIFACT_PATH] + MODEL_FILES + [
+    'models/sales_forecast_model_scaler.pkl',
+    'models/parts_demand_model_scaler_X.pkl',
+    'models/parts_demand_model_scaler_y.pkl',
+    'models/training_info.json',
+]
+
+# Version name of the models loaded straight from models/
+LOCAL_VERSION = 'local'
+
+
+def configure_tensorflow_threads():
+    """Apply ML_TF_INTRA_OP_THREADS / ML_TF_INTER_OP_THREADS to TensorFlow.
+
+    Must run before TensorFlow executes its first op. Under gunicorn each worker
+    gets a share of the cores instead of every worker sizing its pools to all of them.
+    """
+    intra_op = os.environ.get('ML_TF_INTRA_OP_THREADS')
+    inter_op = os.environ.get('ML_TF_INTER_OP_THREADS')
+    if not intra_op and not inter_op:
+        return
+
+    import tensorflow as tf
+
+    if intra_op:
+        tf.config.threading.set_intra_op_parallelism_threads(int(intra_op))
+    if inter_op:
+        tf.config.threading.set_inter_op_parallelism_threads(int(inter_op))
+
+
+def stale_artifacts(directory='models'):
+    """NumPy artifacts in directory older than the .keras model they were exported from.
+
+    A model retrained without re-exporting leaves its artifact serving the old
+    weights; artifacts without a .keras model next to them are never stale.
+    """
+    stale = []
+    for model_path, artifact_path in zip(MODEL_FILES, ARTIFACT_FILES):
+        model = os.path.join(directory, os.path.basename(model_path))
+        artifact = os.path.join(directory, os.path.basename(artifact_path))
+        if (os.path.exists(model) and os.path.exists(artifact)
+                and os.path.getmtime(artifact) < os.path.getmtime(model)):
+            stale.append(os.path.basename(artifact))
+    return stale
+
+
+def warm_up(sales_model, parts_model, fleet=None):
+    """Run one dummy prediction through every network before it serves traffic."""
+    sales_model.model.predict(np.zeros((1, sales_model.lookback, 1)), verbose=0)
+    parts_model.predict_demand(0, 0, 0, 1, 0)
+    if fleet and fleet.sales:
+        fleet.sales.model.predict(np.zeros((len(fleet.sales.members), 1, fleet.sales.lookback, 1)))
+    if fleet and fleet.parts:
+        n_features = len(fleet.parts.scaler_X.min_)
+        fleet.parts.model.predict(np.zeros((len(fleet.parts.members), 1, n_features)))
+
+
+class ModelSet:
+    """One loaded model version; swapped in and out as a whole."""
+
+    def __init__(self, version, runtime, sales_model, parts_model, fleet, batched):
+        self.version = version
+        self.runtime = runtime
+        self.sales_model = sales_model
+        self.parts_model = parts_model
+        self.fleet = fleet
+        self.batched = batched
+        self.loaded_at = time.time()
+
+    def close(self):
+        """Stop the micro-batcher threads, which would otherwise keep the models alive."""
+        if self.batched:
+            self.sales_model.model.close()
+            self.parts_model.model.close()
+
+
+class ModelLoader:
+    """Loads model versions off the request path and swaps them in atomically.
+
+    State moves from 'not_started' to 'loading' and then to 'ready' or 'failed'
+    for the first version. Until a version is ready, get() returns (None, None)
+    and callers fall back to their non-ML code paths. Later versions are
+    loaded by activate() (or by following the registry's CURRENT) while the
+    active one keeps serving.
+    """
+
+    def __init__(self, runtime=None, batching=None, registry=None):
+        self.runtime = runtime or os.environ.get('ML_RUNTIME', 'auto')
+        # 'auto', or '1'/'0' to force micro-batching on or off
+        self.batching = batching or os.environ.get('ML_BATCHING', 'auto')
+        self.max_batch_size = int(os.environ.get('ML_BATCH_MAX_SIZE', 256))
+        self.max_wait_ms = float(os.environ.get('ML_BATCH_MAX_WAIT_MS', 1.0))
+        self.registry = registry or ModelRegistry()
+        self.max_versions = max(1, int(os.environ.get('ML_MODEL_VERSIONS_IN_MEMORY', 3)))
+        self.poll_seconds = float(os.environ.get('ML_REGISTRY_POLL_SECONDS', 5))
+        self.state = 'not_started'
+        self.error = None
+        self.load_seconds = None
+        self.last_swap = None
+        self._active = None
+        self._loaded = OrderedDict()
+        self._history = []
+        self._swapping = None
+        self._next_poll = 0.0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    def start(self, background=True):
+        """Begin loading the models, in a daemon thread unless background is False."""
+        with self._lock:
+            if self.state != 'not_started':
+                return
+            self.state = 'loading'
+
+        if background:
+            thread = threading.Thread(target=self._load, name='model-loader', daemon=True)
+            thread.start()
+        else:
+            self._load()
+
+    def resolve_runtime(self, directory='models'):
+        """The runtime loading will use.
+
+        'auto' picks numpy when the artifacts exist and none is older than
+        the .keras model it was exported from (see stale_artifacts).
+        """
+        if self.runtime != 'auto':
+            return self.runtime
+        has_artifacts = all(
+            os.path.exists(os.path.join(directory, os.path.basename(path))) for path in ARTIFACT_FILES
+        )
+        return 'numpy' if has_artifacts and not stale_artifacts(directory) else 'keras'
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            version = self.registry.current() or LOCAL_VERSION
+            try:
+                model_set = self._load_set(version)
+            except Exception as e:
+                if version == LOCAL_VERSION:
+                    raise
+                # CURRENT may name a version that never loaded (e.g. set from the CLI)
+                print(f"⚠ Warning: Could not load model version {version} - {e}; "
+                      f"falling back to models/")
+                version = LOCAL_VERSION
+                model_set = self._load_set(version)
+            self._activate_set(model_set)
+            self.state = 'ready'
+            print(f"✓ Models loaded successfully ({self._active.runtime} runtime, version "
+                  f"{version}{', with model fleet' if self._active.fleet else ''})")
+        except Exception as e:
+            self.error = str(e)
+            self.state = 'failed'
+            print(f"⚠ Warning: Could not load models - {e}")
+            print("Run 'python train_models.py' first to train models")
+        finally:
+            self.load_seconds = round(time.perf_counter() - start, 3)
+            self._ready.set()
+
+    def _load_set(self, version):
+        """Load, batch-wrap and warm up one version without touching the active one."""
+        directory = 'models' if version == LOCAL_VERSION else self.registry.path(version)
+        runtime = self.resolve_runtime(directory)
+
+        stale = stale_artifacts(directory)
+        if stale:
+            action = 'serving them anyway (ML_RUNTIME=numpy)' if runtime == 'numpy' else 'using Keras'
+            print(f"⚠ Warning: {', '.join(stale)} in {directory} older than the .keras models; "
+                  f"{action} - re-export with 'python train_models.py --export-only'")
+
+        if runtime == 'numpy':
+            sales_model = NumpySalesForecastModel()
+            parts_model = NumpyPartsDemandModel()
+            paths = ARTIFACT_FILES
+        else:
+            # Imported here so TensorFlow is only pulled in by the loader
+            configure_tensorflow_threads()
+            from train_models import SalesForecastModel, PartsDemandModel
+
+            sales_model = SalesForecastModel()
+            parts_model = PartsDemandModel()
+            paths = MODEL_FILES
+
+        sales_model.load(os.path.join(directory, os.path.basename(paths[0])))
+        parts_model.load(os.path.join(directory, os.path.basename(paths[1])))
+
+        fleet = None
+        fleet_path = os.path.join(directory, os.path.basename(FLEET_ARTIFACT_PATH))
+        if os.path.exists(fleet_path):
+            fleet = ModelFleet()
+            fleet.load(fleet_path)
+
+        warm_up(sales_model, parts_model, fleet)
+
+        batched = self.batching == '1' or (self.batching == 'auto' and runtime == 'keras')
+        if batched:
+            for name, model in (('sales', sales_model), ('parts', parts_model)):
+                model.model = BatchedModel(
+                    model.model,
+                    max_batch_size=self.max_batch_size,
+                    max_wait_ms=self.max_wait_ms,
+                    name=f'{name}-batcher-{version}',
+                )
+
+        return ModelSet(version, runtime, sales_model, parts_model, fleet, batched)
+
+    def _activate_set(self, model_set):
+        """Make model_set the active version and keep it for rollback."""
+        with self._lock:
+            self._loaded[model_set.version] = model_set
+            self._loaded.move_to_end(model_set.version)
+            # Requests read self._active once, so this assignment is the swap
+            self._active = model_set
+            if not self._history or self._history[-1] != model_set.version:
+                self._history.append(model_set.version)
+            while len(self._loaded) > self.max_versions:
+                oldest = next(iter(self._loaded))
+                self._loaded.pop(oldest).close()
+
+    def activate(self, version=None, persist=True, background=True):
+        """Serve a registry version, by default the newest one.
+
+        A version still in memory is swapped in immediately; otherwise it is
+        loaded and warmed up (in a thread unless background is False) and
+        swapped in when ready. persist then writes it to the registry's CURRENT
+        so the other workers follow; a version that fails to load is never
+        written there. Returns the swap status.
+        """
+        version = version or (self.registry.versions() or [None])[-1]
+        if version is None:
+            raise ValueError("No published model versions")
+        known = version == LOCAL_VERSION or version in self._loaded or self.registry.exists(version)
+        if not known:
+            raise ValueError(f"Unknown model version '{version}'")
+
+        with self._lock:
+            if self._swapping == version:
+                return self.last_swap
+            self._swapping = version
+            self.last_swap = {'version': version, 'state': 'loading', 'error': None,
+                              'seconds': None}
+
+        if version in self._loaded:
+            self._swap(version, persist)
+        elif background:
+            thread = threading.Thread(target=self._swap, args=(version, persist),
+                                      name='model-swap', daemon=True)
+            thread.start()
+        else:
+            self._swap(version, persist)
+        return self.last_swap
+
+    def _set_current(self, version):
+        """Point the registry's CURRENT at version (None or LOCAL_VERSION clears it)."""
+        if version in (None, LOCAL_VERSION):
+            self.registry.clear_current()
+        else:
+            self.registry.set_current(version)
+
+    def _swap(self, version, persist=False):
+        start = time.perf_counter()
+        previous = self.registry.current()
+        try:
+            model_set = self._loaded.get(version) or self._load_set(version)
+            self._activate_set(model_set)
+            if persist:
+                self._set_current(version)
+            self.state, self.error = 'ready', None
+            self._ready.set()
+            self.last_swap = dict(self.last_swap, state='ready')
+            print(f"✓ Swapped in model version {version}")
+        except Exception as e:
+            # Leave CURRENT as it was, so no worker follows a version that failed here
+            if persist and self.registry.current() != previous:
+                self._set_current(previous)
+            self.last_swap = dict(self.last_swap, state='failed', error=str(e))
+            print(f"⚠ Warning: Could not swap in model version {version} - {e}")
+        finally:
+            self.last_swap = dict(self.last_swap, seconds=round(time.perf_counter() - start, 3))
+            with self._lock:
+                self._swapping = None
+
+    def rollback(self):
+        """Swap back to the version that was active before the current one."""
+        current = self.version
+        previous = [version for version in self._history if version != current]
+        if not previous:
+            raise ValueError("No earlier model version to roll back to")
+        return self.activate(previous[-1])
+
+    def _follow_registry(self):
+        """Swap to the registry's CURRENT if another process changed it."""
+        now = time.monotonic()
+        if self.poll_seconds <= 0 or now < self._next_poll or self.state != 'ready':
+            return
+        self._next_poll = now + self.poll_seconds
+
+        # Without a CURRENT version the models in models/ are served
+        target = self.registry.current() or LOCAL_VERSION
+        if target == self.version or target == self._swapping:
+            return
+        if self.last_swap and self.last_swap['version'] == target \
+                and self.last_swap['state'] == 'failed':
+            return
+        self.activate(target, persist=False)
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    @property
+    def version(self):
+        """Name of the active version, used in cache keys."""
+        active = self._active
+        return active.version if active else None
+
+    @property
+    def active_runtime(self):
+        active = self._active
+        return active.runtime if active else None
+
+    @property
+    def batched(self):
+        active = self._active
+        return bool(active and active.batched)
+
+    def get(self, wait=False, timeout=None):
+        """Return (sales_model, parts_model), or (None, None) if not loaded.
+
+        Starts loading on first use. With wait=True, blocks until loading
+        finishes or timeout expires.
+        """
+        if self.state == 'not_started':
+            self.start()
+        if wait:
+            self._ready.wait(timeout)
+        self._follow_registry()
+        active = self._active
+        if not self.ready or active is None:
+            return None, None
+        return active.sales_model, active.parts_model
+
+    def fleet(self):
+        """The active ModelFleet, or None if not loaded or not trained."""
+        active = self._active
+        return active.fleet if self.ready and active else None
+
+    def batching_stats(self):
+        """Queue depth and batch size metrics per model, or None without batching."""
+        active = self._active
+        if not self.ready or not active or not active.batched:
+            return None
+        return {
+            'sales': active.sales_model.model.batcher.stats(),
+            'parts': active.parts_model.model.batcher.stats(),
+        }
+
+    def registry_status(self):
+        """Published, loaded and active versions for the admin endpoint."""
+        return {
+            'active': self.version,
+            'current': self.registry.current(),
+            'published': self.registry.versions(),
+            'inMemory': list(self._loaded),
+            'history': self._history[-10:],
+            'lastSwap': self.last_swap,
+        }
+
+    def status(self):
+        """Loading state for the health endpoint."""
+        active = self._active
+        return {
+            'state': self.state,
+            'runtime': self.active_runtime,
+            'version': self.version,
+            'error': self.error,
+            'loadSeconds': self.load_seconds,
+            'batching': self.batching_stats(),
+            'fleet': active.fleet.summary() if self.ready and active and active.fleet else None,
+        }
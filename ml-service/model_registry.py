@@ -0,0 +1,161 @@
+"""
+Versioned registry of trained model artifacts.
+Each version is an immutable directory under models/registry/ and a CURRENT file names the
+version the service should serve.
+
+    python model_registry.py list
+    python model_registry.py publish           # snapshot the models in models/
+    python model_registry.py activate v3       # running workers swap to v3
+    python model_registry.py prune --keep 5
+
+Publishing copies the files into a temporary directory and renames it into
+place, and CURRENT is replaced atomically, so a reader never sees a partial
+version or pointer.
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+
+REGISTRY_DIR = 'models/registry'
+
+CURRENT_FILE = 'CURRENT'
+
+MANIFEST_FILE = 'manifest.json'
+
+VERSION_PATTERN = re.compile(r'^v(\d+)$')
+
+
+class ModelRegistry:
+    """Model versions v1, v2, ... stored as directories of artifact files."""
+
+    def __init__(self, directory=REGISTRY_DIR):
+        self.directory = directory
+
+    def path(self, version, filename=''):
+        return os.path.join(self.directory, version, filename)
+
+    def versions(self):
+        """Published versions, oldest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        numbered = [
+            (int(match.group(1)), entry)
+            for entry in os.listdir(self.directory)
+            if (match := VERSION_PATTERN.match(entry))
+        ]
+        return [entry for _, entry in sorted(numbered)]
+
+    def exists(self, version):
+        return version in self.versions()
+
+    def manifest(self, version):
+        with open(self.path(version, MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def current(self):
+        """The version named by CURRENT, or None if none was activated."""
+        try:
+            with open(os.path.join(self.directory, CURRENT_FILE)) as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def set_current(self, version):
+        """Point CURRENT at a published version."""
+        if not self.exists(version):
+            raise ValueError(f"Unknown model version '{version}'")
+        path = os.path.join(self.directory, CURRENT_FILE)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, path)
+
+    def clear_current(self):
+        """Remove CURRENT, so the service falls back to the models in models/."""
+        try:
+            os.remove(os.path.join(self.directory, CURRENT_FILE))
+        except FileNotFoundError:
+            pass
+
+    def publish(self, files, metadata=None):
+        """Copy the existing files among `files` into a new version; returns its name."""
+        present = [path for path in files if os.path.exists(path)]
+        if not present:
+            raise ValueError("No model files to publish")
+
+        os.makedirs(self.directory, exist_ok=True)
+        staging = os.path.join(self.directory, f'.staging-{os.getpid()}-{time.time_ns()}')
+        os.makedirs(staging)
+        for path in present:
+            shutil.copy2(path, staging)
+
+        manifest = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'files': sorted(os.path.basename(path) for path in present),
+            **(metadata or {}),
+        }
+
+        # Another publisher may take the next number first; retry with the one after
+        while True:
+            versions = self.versions()
+            number = int(VERSION_PATTERN.match(versions[-1]).group(1)) + 1 if versions else 1
+            version = f'v{number}'
+            with open(os.path.join(staging, MANIFEST_FILE), 'w') as f:
+                json.dump(dict(manifest, version=version), f, indent=2)
+            try:
+                os.rename(staging, self.path(version))
+                return version
+            except OSError:
+                if not os.path.exists(self.path(version)):
+                    raise
+
+    def prune(self, keep):
+        """Delete all but the newest `keep` versions, never the current one."""
+        current = self.current()
+        removed = []
+        for version in self.versions()[:-keep] if keep > 0 else self.versions():
+            if version != current:
+                shutil.rmtree(self.path(version))
+                removed.append(version)
+        return removed
+
+
+def main():
+    # Imported here so using the registry does not pull in the loader
+    from model_loader import REGISTRY_FILES
+
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List published versions')
+    subparsers.add_parser('publish', help='Publish the models in models/ as a new version')
+    activate_parser = subparsers.add_parser('activate', help='Serve a version (running workers swap to it)')
+    activate_parser.add_argument('version')
+    prune_parser = subparsers.add_parser('prune', help='Delete old versions')
+    prune_parser.add_argument('--keep', type=int, default=5)
+    args = parser.parse_args()
+
+    registry = ModelRegistry()
+    if args.command == 'list':
+        current = registry.current()
+        for version in registry.versions():
+            manifest = registry.manifest(version)
+            marker = '*' if version == current else ' '
+            print(f"{marker} {version:<6} {manifest['created_at']}  {', '.join(manifest['files'])}")
+    elif args.command == 'publish':
+        version = registry.publish(REGISTRY_FILES)
+        print(f"✓ Published {version}; serve it with 'python model_registry.py activate {version}'")
+    elif args.command == 'activate':
+        registry.set_current(args.version)
+        print(f"✓ {args.version} is now current; workers swap to it within seconds")
+    elif args.command == 'prune':
+        removed = registry.prune(args.keep)
+        print(f"✓ Removed {len(removed)} versions: {', '.join(removed) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+"""
+Presorted, keyset-paginated views over the list endpoint tables.
+Tables are sorted newest-first once at load, so a page costs a binary search and a slice.
+"""
+
+import base64
+import copy
+
+import numpy as np
+import pandas as pd
+
+from change_log import VERSION_COLUMN
+from compact import days_to_ns, insert_rows
+
+
+def encode_cursor(date_ns, row_id):
+    """Opaque cursor for the position just after (date, id)."""
+    return base64.urlsafe_b64encode(f'{date_ns}:{row_id}'.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        date_ns, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split(':', 1)
+        return int(date_ns), row_id
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_date(value, end_of_day=False):
+    """Nanosecond timestamp for a 'YYYY-MM-DD' query value (None passes through)."""
+    if value is None:
+        return None
+    try:
+        timestamp = pd.Timestamp(value)
+    except ValueError as e:
+        raise ValueError(f'Invalid date: {value}') from e
+    if end_of_day:
+        timestamp = timestamp.normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+    return timestamp.value
+
+
+class SortedTable:
+    """A table sorted by (date, id) descending with keyset pagination and filters.
+
+    Equality filters are served from per-value position lists built at load,
+    and date ranges map to a contiguous slice of the sorted order, so a page
+    never scans or re-sorts the table. Versioned tables (with a
+    change_log.VERSION_COLUMN) also page through the rows changed since a
+    revision. merge() adds rows without re-sorting the existing ones.
+    """
+
+    def __init__(self, df, date_column, id_column, filter_columns=(), id_codec=None,
+                 versioned=False):
+        self.date_column = date_column
+        self.id_column = id_column
+        # Ids of compact tables are integer codes; cursors carry the decoded id
+        self.id_codec = id_codec
+
+        self.versioned = versioned
+        self.rows = self._sorted(df)
+        self._neg_dates, self._ids = self._keys(self.rows)
+
+        self._positions = {
+            column: {
+                str(value): positions
+                for value, positions in self.rows.groupby(column, observed=True).indices.items()
+            }
+            for column in filter_columns
+        }
+
+        # Rows changed after the load, with their revisions, so since= reads only them
+        self._changed = np.zeros(0, dtype=np.intp)
+        self._changed_revisions = np.zeros(0, dtype=np.int32)
+        if versioned:
+            revisions = self.rows[VERSION_COLUMN].to_numpy()
+            self._changed = np.flatnonzero(revisions)
+            self._changed_revisions = revisions[self._changed]
+
+    def _sorted(self, df):
+        return df.sort_values(
+            [self.date_column, self.id_column], ascending=False, kind='stable'
+        ).reset_index(drop=True)
+
+    def _keys(self, rows):
+        """Negated nanosecond dates and ids of rows, the arrays searched for positions."""
+        dates = rows[self.date_column].to_numpy()
+        if np.issubdtype(dates.dtype, np.integer):
+            dates = days_to_ns(dates)
+        else:
+            dates = dates.astype('datetime64[ns]').view('int64')
+        # Negated so the newest-first order is ascending for searchsorted
+        return -dates, rows[self.id_column].to_numpy(dtype=None if self.id_codec else object)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _position_after(self, cursor):
+        """Index of the first row that sorts after the cursor's (date, id)."""
+        date_ns, row_id = decode_cursor(cursor)
+        if self.id_codec is not None:
+            try:
+                row_id = self.id_codec.encode_one(row_id)
+            except ValueError as e:
+                raise ValueError('Invalid cursor') from e
+        lo = np.searchsorted(self._neg_dates, -date_ns, side='left')
+        hi = np.searchsorted(self._neg_dates, -date_ns, side='right')
+        # Within one date, ids are descending: skip those >= the cursor id
+        return lo + int(np.count_nonzero(self._ids[lo:hi] >= row_id))
+
+    def merge(self, new_rows):
+        """A new table with new_rows (whose ids must be new) added in order.
+
+        Only new_rows are sorted. Each is inserted at its binary-searched
+        position, and the existing filter positions are shifted past the
+        insertions, so the existing rows are neither re-sorted nor regrouped.
+        """
+        new_rows = self._sorted(new_rows)
+        new_neg_dates, new_ids = self._keys(new_rows)
+
+        # Insertion point of each new row among the existing (date, id) descending order;
+        # non-decreasing since new_rows are sorted the same way
+        inserts = np.searchsorted(self._neg_dates, new_neg_dates, side='left')
+        ends = np.searchsorted(self._neg_dates, new_neg_dates, side='right')
+        for i in np.flatnonzero(ends > inserts):
+            inserts[i] += np.count_nonzero(self._ids[inserts[i]:ends[i]] > new_ids[i])
+        new_positions = inserts + np.arange(len(new_rows))
+
+        # New position of each existing row: moved down by the rows inserted at or before it
+        n_rows = len(self.rows)
+        moved = np.arange(n_rows) + np.cumsum(np.bincount(inserts, minlength=n_rows + 1)[:n_rows])
+
+        def with_new(positions, added):
+            return np.insert(positions, np.searchsorted(positions, added), added)
+
+        table = copy.copy(self)
+        table.rows = insert_rows(self.rows, inserts, new_rows)
+        table._neg_dates = np.insert(self._neg_dates, inserts, new_neg_dates)
+        table._ids = np.insert(self._ids, inserts, new_ids)
+
+        table._positions = {}
+        for column, positions in self._positions.items():
+            added = new_rows.groupby(column, observed=True).indices
+            table._positions[column] = {
+                value: moved[value_positions] for value, value_positions in positions.items()
+            }
+            for value, new_value_positions in added.items():
+                existing = table._positions[column].get(str(value), np.zeros(0, dtype=np.intp))
+                table._positions[column][str(value)] = with_new(existing, new_positions[new_value_positions])
+
+        if self.versioned:
+            revisions = new_rows[VERSION_COLUMN].to_numpy()
+            changed = np.flatnonzero(revisions)
+            changed_positions = moved[self._changed]
+            at = np.searchsorted(changed_positions, new_positions[changed])
+            table._changed = np.insert(changed_positions, at, new_positions[changed])
+            table._changed_revisions = np.insert(self._changed_revisions, at, revisions[changed])
+        return table
+
+    def changed_since(self, revision):
+        """Positions of rows added or changed after revision, in table order."""
+        return self._changed[self._changed_revisions > revision]
+
+    def page(self, limit, cursor=None, date_from=None, date_to=None, filters=None, since=None):
+        """Return (rows, next_cursor) for one page, newest first.
+
+        date_from/date_to are inclusive 'YYYY-MM-DD' strings. filters maps
+        filter columns to required values and since, a revision, keeps the rows
+        changed after it. next_cursor is None on the last page.
+        """
+        limit = max(0, limit)
+        lo, hi = 0, len(self.rows)
+
+        date_to_ns = parse_date(date_to, end_of_day=True)
+        if date_to_ns is not None:
+            lo = max(lo, np.searchsorted(self._neg_dates, -date_to_ns, side='left'))
+        date_from_ns = parse_date(date_from)
+        if date_from_ns is not None:
+            hi = min(hi, np.searchsorted(self._neg_dates, -date_from_ns, side='right'))
+        if cursor:
+            lo = max(lo, self._position_after(cursor))
+
+        candidate_sets = [
+            self._positions[column].get(value, np.zeros(0, dtype=np.intp))
+            for column, value in (filters or {}).items() if value is not None
+        ]
+        if since is not None:
+            candidate_sets.append(self.changed_since(since))
+        if candidate_sets:
+            candidates = candidate_sets[0]
+            for positions in candidate_sets[1:]:
+                candidates = np.intersect1d(candidates, positions, assume_unique=True)
+            start = np.searchsorted(candidates, lo)
+            end = np.searchsorted(candidates, hi)
+            selected = candidates[start:min(end, start + limit)]
+            has_more = end - start > limit
+        else:
+            selected = np.arange(lo, max(lo, min(hi, lo + limit)))
+            has_more = hi - lo > limit
+
+        rows = self.rows.iloc[selected]
+
+        next_cursor = None
+        if has_more and len(selected):
+            last = selected[-1]
+            row_id = self._ids[last]
+            if self.id_codec is not None:
+                row_id = self.id_codec.decode([row_id])[0]
+            next_cursor = encode_cursor(-int(self._neg_dates[last]), row_id)
+
+        return rows, next_cursor
+
+
+def parse_fields(value, available):
+    """Output fields requested by a comma-separated fields= value, or None for all.
+
+    Raises ValueError for unknown fields and for a value that names none.
+    """
+    if value is None:
+        return None
+    wanted = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    if not wanted:
+        raise ValueError(f"fields must name at least one of: {', '.join(available)}")
+    unknown = [field for field in wanted if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return wanted
+
+
+def to_records(records_columns):
+    """Turn a {field: values} mapping of equal-length columns into row dicts."""
+    keys = list(records_columns)
+    return [dict(zip(keys, values)) for values in zip(*records_columns.values())]
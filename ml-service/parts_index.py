@@ -0,0 +1,80 @@
+"""
+Lookup indexes over the current parts catalog.
+A hash index resolves a scanned SKU or part id in O(1) and a sorted prefix index
+answers name searches with a binary search, both built once per data snapshot.
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+from change_log import VERSION_COLUMN
+
+
+def normalize_key(value):
+    """SKUs and part ids match case-insensitively, ignoring surrounding spaces."""
+    return str(value).strip().upper()
+
+
+def normalize_term(value):
+    return ' '.join(str(value).lower().split())
+
+
+class PartsIndex:
+    """The latest month's parts with SKU/part id lookup and name prefix search.
+
+    Positions returned by get() and search() are row positions in `rows`,
+    so callers can pair them with any per-row values computed for it.
+    """
+
+    def __init__(self, parts, key_columns=('sku', 'part_id'), name_column='part_name'):
+        if len(parts):
+            parts = parts[parts['month'] == parts['month'].max()]
+        self.rows = parts.reset_index(drop=True)
+
+        self._keys = {}
+        for column in key_columns:
+            for position, value in enumerate(self.rows[column].astype(str)):
+                self._keys.setdefault(normalize_key(value), position)
+
+        # Every word-suffix of a name is a term, so 'motor' finds 'Electric Motor';
+        # SKUs are terms too, for partial scans
+        self._names = [normalize_term(name) for name in self.rows[name_column].astype(str)]
+        entries = set()
+        for position, (name, sku) in enumerate(zip(self._names, self.rows['sku'].astype(str))):
+            words = name.split()
+            entries.update((' '.join(words[i:]), position) for i in range(len(words)))
+            entries.add((normalize_term(sku), position))
+        entries = sorted(entries)
+        self._terms = [term for term, _ in entries]
+        self._term_positions = [position for _, position in entries]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def get(self, key):
+        """Row position of the part with this SKU or part id, or None."""
+        return self._keys.get(normalize_key(key))
+
+    def changed_since(self, revision):
+        """Positions of parts added or changed after revision."""
+        return np.flatnonzero(self.rows[VERSION_COLUMN].to_numpy() > revision).tolist()
+
+    def search(self, query, limit=20):
+        """Positions of up to limit parts with a name word or SKU starting with query.
+
+        Parts whose full name matches come first, then the rest in term order.
+        """
+        prefix = normalize_term(query)
+        if not prefix:
+            return []
+
+        start = bisect_left(self._terms, prefix)
+        matches = []
+        for i in range(start, len(self._terms)):
+            if not self._terms[i].startswith(prefix):
+                break
+            matches.append(self._term_positions[i])
+
+        full_name = [position for position in matches if self._names[position].startswith(prefix)]
+        return list(dict.fromkeys(full_name + matches))[:limit]
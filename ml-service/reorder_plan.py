@@ -0,0 +1,189 @@
+"""
+Reorder planning for the parts inventory.
+Computes the plan once per data/model version from predicted demand, current inventory
+and supplier lead times, and serves the most urgent orders from a presorted index.
+
+A part is reordered when its stock will not last until an order placed at the
+next monthly review could arrive, i.e. when its days of cover are less than
+its lead time plus REVIEW_PERIOD_DAYS. The order brings it up to the
+recommended stock shown by /api/parts (twice the predicted monthly demand).
+Orders are ranked by slack: days of cover minus lead time, most negative first.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from snapshot_cache import Snapshot
+
+# Supplier lead time in days by part category; parts data may override it
+# with a lead_time_days column
+LEAD_TIME_DAYS = {
+    'Power': 21,
+    'Drivetrain': 28,
+    'Electrical': 10,
+    'Interior': 14,
+    'Safety': 7,
+    'Wheels': 5,
+    'Chassis': 21,
+    'Climate': 14,
+}
+
+DEFAULT_LEAD_TIME_DAYS = 14
+
+# Days until the next planning run
+REVIEW_PERIOD_DAYS = 30
+
+# Slack (days of cover left when an order placed now arrives) below which an
+# order is 'critical' (stockout before delivery) or 'high'
+PRIORITY_THRESHOLDS = [(0, 'critical'), (7, 'high')]
+
+# Distinct (limit, category, priority) responses kept per plan
+MAX_CACHED_QUERIES = 64
+
+
+class ReorderPlan:
+    """Planned orders for one inventory month, sorted by urgency and indexed by category.
+
+    parts holds the latest month's rows of parts_inventory and predicted_demand
+    the next month's demand per row. as_of is the planning date.
+    """
+
+    def __init__(self, parts, predicted_demand, as_of):
+        self.as_of = as_of
+        self.month = str(parts['month'].iloc[0]) if len(parts) else ''
+
+        predicted = np.maximum(np.asarray(predicted_demand, dtype=float), 0)
+        inventory = parts['inventory_level'].to_numpy(dtype=float)
+        category = parts['category'].astype(str)
+        if 'lead_time_days' in parts:
+            lead_time = parts['lead_time_days'].to_numpy(dtype=float)
+        else:
+            lead_time = category.map(LEAD_TIME_DAYS).fillna(DEFAULT_LEAD_TIME_DAYS).to_numpy(dtype=float)
+
+        daily_demand = predicted / 30
+        days_of_cover = np.divide(inventory, daily_demand, out=np.full(len(parts), np.inf),
+                                  where=daily_demand > 0)
+        slack = days_of_cover - lead_time
+        quantity = np.ceil(predicted * 2 - inventory).astype(int)
+        needs_order = (days_of_cover < lead_time + REVIEW_PERIOD_DAYS) & (quantity > 0)
+
+        orders = pd.DataFrame({
+            'part_id': parts['part_id'].astype(str).to_numpy(),
+            'part_name': parts['part_name'].astype(str).to_numpy(),
+            'category': category.to_numpy(),
+            'quantity': quantity,
+            'lead_time': lead_time.astype(int),
+            'days_of_cover': days_of_cover,
+            'slack': slack,
+        })[needs_order]
+
+        # Most urgent first; part id breaks ties so the order is stable
+        self.orders = orders.sort_values(['slack', 'part_id'], kind='stable').reset_index(drop=True)
+        self.orders['priority'] = self._priorities(self.orders['slack'].to_numpy())
+
+        # Positions of each category's and priority's orders, already in urgency order
+        self.index = {
+            (field, value): positions
+            for field in ('category', 'priority')
+            for value, positions in self.orders.groupby(field, sort=False).indices.items()
+        }
+
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _priorities(slack):
+        priority = np.full(len(slack), 'normal', dtype=object)
+        for threshold, name in reversed(PRIORITY_THRESHOLDS):
+            priority[slack < threshold] = name
+        return priority
+
+    def __len__(self):
+        return len(self.orders)
+
+    def top(self, limit, category=None, priority=None):
+        """The limit most urgent orders, optionally of one category and/or priority."""
+        positions = np.arange(len(self.orders))
+        for field, value in (('category', category), ('priority', priority)):
+            if value is not None:
+                positions = np.intersect1d(positions, self.index.get((field, value), []),
+                                           assume_unique=True)
+        return self.orders.iloc[positions[:limit]]
+
+    def records(self, rows):
+        """API order objects for rows of the plan."""
+        created = self.as_of.strftime('%Y-%m-%d')
+        month = self.month.replace('-', '')
+        return [
+            {
+                # Stable for a part within an inventory month
+                'id': f'RO-{month}-{part_id}',
+                'parts': [{
+                    'partId': part_id,
+                    'partName': part_name,
+                    'quantity': int(quantity),
+                }],
+                'requestedBy': 'Warehouse Team',
+                'status': 'pending',
+                'priority': priority,
+                'createdAt': created,
+                'estimatedDelivery': (self.as_of + timedelta(days=int(lead_time))).strftime('%Y-%m-%d'),
+                'daysOfCover': round(float(days_of_cover), 1) if np.isfinite(days_of_cover) else None,
+            }
+            for part_id, part_name, quantity, priority, lead_time, days_of_cover in zip(
+                rows['part_id'], rows['part_name'], rows['quantity'], rows['priority'],
+                rows['lead_time'], rows['days_of_cover'],
+            )
+        ]
+
+    def snapshot(self, limit, category=None, priority=None):
+        """Serialized response for a query, built once per plan."""
+        query = (limit, category, priority)
+        with self._lock:
+            snapshot = self._snapshots.get(query)
+            if snapshot is not None:
+                self._snapshots.move_to_end(query)
+                return snapshot
+
+        snapshot = Snapshot(query, self.records(self.top(limit, category, priority)))
+        with self._lock:
+            self._snapshots[query] = snapshot
+            while len(self._snapshots) > MAX_CACHED_QUERIES:
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+
+class ReorderPlanner:
+    """Holds the current plan and rebuilds it when its key changes."""
+
+    def __init__(self):
+        # (key, plan), replaced as one so readers never pair a key with another plan
+        self._current = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, builder):
+        """The plan for key, calling builder() to compute it if key has changed."""
+        current = self._current
+        if current is not None and current[0] == key:
+            self.hits += 1
+            return current[1]
+
+        # Only one thread plans; the others wait and reuse its plan
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == key:
+                self.hits += 1
+                return current[1]
+            self.misses += 1
+            plan = builder()
+            self._current = (key, plan)
+            return plan
+
+    def stats(self):
+        return {'entries': int(self._current is not None), 'hits': self.hits, 'misses': self.misses}
@@ -0,0 +1,157 @@
+"""
+Pre-aggregated sales cube for slice-and-dice analytics.
+Sales are rolled up once per dealership, vehicle model and month, so group-by and
+filter queries read the cube's cells instead of the raw sales rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from compact import month_labels
+from pagination import to_records
+
+# Dimensions the cells are keyed on; quarter and year derive from month
+BASE_DIMENSIONS = ['dealership', 'model', 'month']
+DIMENSIONS = BASE_DIMENSIONS + ['quarter', 'year']
+
+MEASURES = ['sum', 'count', 'min', 'max', 'avg']
+
+# How each stored measure combines across cells
+ROLLUP = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def parse_list(value):
+    """Comma-separated query value as a list (None passes through)."""
+    if value is None:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def parse_month(value):
+    """'YYYY-MM' query value, validated (None passes through)."""
+    if value is None:
+        return None
+    try:
+        return str(pd.Period(value, freq='M'))
+    except ValueError as e:
+        raise ValueError(f'Invalid month: {value}') from e
+
+
+class SalesCube:
+    """Sum, count, min and max of sale prices per (dealership, model, month) cell.
+
+    Cubes are immutable; add() returns a new cube with more sales rolled in,
+    so a data snapshot can carry its cube the same way it carries its tables.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+
+        # Sorted distinct values and per-cell codes of each dimension, so
+        # queries filter and group on integers
+        self._dimensions = {}
+        for dimension in DIMENSIONS:
+            codes, values = pd.factorize(cells[dimension], sort=True)
+            self._dimensions[dimension] = (codes, np.asarray(values))
+        self._measures = {measure: cells[measure].to_numpy() for measure in ROLLUP}
+
+    @staticmethod
+    def _aggregate(sales):
+        # Compact sales rows (see compact.py) derive their month from the date
+        if 'month' not in sales:
+            sales = sales.assign(month=month_labels(sales['date']))
+        cells = (
+            sales.groupby(BASE_DIMENSIONS, sort=True)['price']
+            .agg(list(ROLLUP))
+            .reset_index()
+        )
+        # Plain strings, whether the sales columns were categorical or not
+        for dimension in BASE_DIMENSIONS:
+            cells[dimension] = cells[dimension].astype(str)
+        month = pd.PeriodIndex(cells['month'].astype(str), freq='M')
+        cells['quarter'] = (month.year.astype(str) + '-Q' + month.quarter.astype(str)).to_numpy()
+        cells['year'] = month.year.to_numpy(dtype='int64')
+        return cells[DIMENSIONS + list(ROLLUP)]
+
+    @classmethod
+    def from_sales(cls, sales):
+        return cls(cls._aggregate(sales))
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, sales):
+        """A new cube with sales rolled in, merged cell-wise with this one."""
+        cells = pd.concat([self.cells, self._aggregate(sales)], ignore_index=True)
+        merged = cells.groupby(DIMENSIONS, sort=True).agg(ROLLUP).reset_index()
+        return SalesCube(merged)
+
+    def query(self, group_by=None, filters=None, month_from=None, month_to=None, measures=None):
+        """Measures per group of cells matching filters, as a list of row dicts.
+
+        group_by lists dimensions (none gives a single total), filters maps
+        dimensions to allowed values and month_from/month_to bound the month
+        inclusively. avg is sum over count. Raises ValueError for unknown
+        dimensions or measures.
+        """
+        group_by = list(dict.fromkeys(group_by or []))
+        measures = measures or MEASURES
+        unknown = [d for d in list(group_by) + list(filters or {}) if d not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(unknown)}")
+        unknown = [m for m in measures if m not in MEASURES]
+        if unknown:
+            raise ValueError(f"Unknown measures: {', '.join(unknown)}")
+
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dimension, values in (filters or {}).items():
+            codes, distinct = self._dimensions[dimension]
+            if dimension == 'year':
+                try:
+                    values = [int(value) for value in values]
+                except ValueError as e:
+                    raise ValueError(f'Invalid year: {values}') from e
+            mask &= np.isin(distinct, values)[codes]
+        months_codes, months = self._dimensions['month']
+        if month_from:
+            mask &= (months >= parse_month(month_from))[months_codes]
+        if month_to:
+            mask &= (months <= parse_month(month_to))[months_codes]
+        selected = np.flatnonzero(mask)
+
+        # One integer key per group, ordered like the dimension values
+        key = np.zeros(len(selected), dtype=np.int64)
+        for dimension in group_by:
+            codes, distinct = self._dimensions[dimension]
+            key = key * len(distinct) + codes[selected]
+        if group_by:
+            groups, group_of = np.unique(key, return_inverse=True)
+        else:
+            groups, group_of = np.zeros(1, dtype=np.int64), key
+
+        n_groups = len(groups)
+        count = np.bincount(group_of, self._measures['count'][selected], n_groups).astype('int64')
+        total = np.bincount(group_of, self._measures['sum'][selected], n_groups).astype(float)
+        low = np.full(n_groups, np.inf)
+        np.minimum.at(low, group_of, self._measures['min'][selected])
+        high = np.full(n_groups, -np.inf)
+        np.maximum.at(high, group_of, self._measures['max'][selected])
+
+        columns = {}
+        remainder = groups
+        for dimension in reversed(group_by):
+            _, distinct = self._dimensions[dimension]
+            remainder, codes = np.divmod(remainder, len(distinct))
+            columns[dimension] = distinct[codes].tolist()
+        columns = {dimension: columns[dimension] for dimension in group_by}
+
+        present = count > 0
+        values = {
+            'sum': np.round(total, 2).tolist(),
+            'count': count.tolist(),
+            'min': np.where(present, np.round(low, 2), None).tolist(),
+            'max': np.where(present, np.round(high, 2), None).tolist(),
+            'avg': np.round(np.divide(total, count, out=np.zeros(n_groups), where=present), 2).tolist(),
+        }
+        columns.update((measure, values[measure]) for measure in measures)
+        return to_records(columns)
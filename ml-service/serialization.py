@@ -0,0 +1,119 @@
+"""
+Fast JSON responses for the API.
+Encodes payloads straight to bytes (with orjson when installed) and compresses them
+with gzip or Brotli according to the client's Accept-Encoding.
+
+Both orjson and brotli are optional: without them the standard library json
+encoder is used and only gzip is offered.
+"""
+
+import gzip
+import json
+import math
+import os
+
+import numpy as np
+from flask import Response, request
+
+from metrics import metrics
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get('ML_COMPRESS_MIN_BYTES', 1024))
+
+ENCODINGS = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+ENCODER = 'orjson' if orjson is not None else 'json'
+
+
+def _default(value):
+    """Fallback for values the encoders do not handle natively."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _finite(value):
+    """value with non-finite floats, at any depth, replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (np.generic, np.ndarray)):
+        return _finite(_default(value))
+    return value
+
+
+def dumps(payload):
+    """Encode a payload as compact JSON bytes with sorted keys."""
+    if orjson is not None:
+        return orjson.dumps(
+            payload,
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_SORT_KEYS,
+        )
+    try:
+        body = json.dumps(
+            payload, default=_default, sort_keys=True, separators=(',', ':'), allow_nan=False
+        )
+    except ValueError:
+        # NaN/Infinity are not JSON; write them as null, like orjson
+        body = json.dumps(
+            _finite(payload), default=_default, sort_keys=True, separators=(',', ':'), allow_nan=False
+        )
+    return body.encode('utf-8')
+
+
+def compress(body, encoding):
+    """Compress body with 'br' or 'gzip'."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def negotiate_encoding(body_size):
+    """Best supported Content-Encoding for this request, or None."""
+    if body_size < COMPRESS_MIN_BYTES:
+        return None
+    return request.accept_encodings.best_match(ENCODINGS)
+
+
+def body_response(body, encoded=None, etag=None, status=200, headers=None):
+    """JSON response for pre-encoded bytes, compressed if the client accepts it.
+
+    encoded(encoding) may supply cached compressed bodies; otherwise the body
+    is compressed for this response. An etag gets the encoding appended, so
+    each representation has its own.
+    """
+    encoding = negotiate_encoding(len(body))
+    if encoding:
+        body = encoded(encoding) if encoded else compress(body, encoding)
+
+    response = Response(body, status=status, mimetype='application/json', headers=headers)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.set_etag(f'{etag}-{encoding}' if encoding else etag)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def json_response(payload, status=200, headers=None):
+    """Encode payload and build a (possibly compressed) JSON response."""
+    with metrics.stage('serialization'):
+        return body_response(dumps(payload), status=status, headers=headers)
@@ -0,0 +1,74 @@
+"""
+In-memory cache of precomputed API responses.
+Each snapshot is built once per data/model version and served as JSON bytes with an ETag.
+"""
+
+import hashlib
+import threading
+
+from metrics import metrics
+from serialization import compress, dumps
+
+
+class Snapshot:
+    """A serialized response body together with its cache key and ETag."""
+
+    def __init__(self, key, payload):
+        self.key = key
+        self.payload = payload
+        self.body = dumps(payload)
+        self.etag = hashlib.sha1(self.body).hexdigest()
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        """Body compressed with encoding, computed once per snapshot."""
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = self._encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+class SnapshotCache:
+    """Keeps the latest snapshot per name and rebuilds it when its key changes."""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lock_for(self, name):
+        with self._guard:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name, key, builder):
+        """Return the snapshot for name, calling builder() if key has changed."""
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None and snapshot.key == key:
+            self.hits += 1
+            return snapshot
+
+        # Only one thread rebuilds a given snapshot; the others wait and reuse it
+        with self._lock_for(name):
+            snapshot = self._snapshots.get(name)
+            if snapshot is not None and snapshot.key == key:
+                self.hits += 1
+                return snapshot
+
+            self.misses += 1
+            payload = builder()
+            with metrics.stage('serialization'):
+                snapshot = Snapshot(key, payload)
+            self._snapshots[name] = snapshot
+            return snapshot
+
+    def stats(self):
+        return {'entries': len(self._snapshots), 'hits': self.hits, 'misses': self.misses}
+
+    def invalidate(self, name=None):
+        """Drop one snapshot, or all of them when name is None."""
+        if name is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(name, None)
@@ -1,12 +1,18 @@
 #!/bin/bash
 
 # E Corp ML Service Start Script
+#   ./start.sh         production server (gunicorn, see gunicorn.conf.py)
+#   ./start.sh --dev   Flask development server with auto-reload
 
 echo "Starting E Corp ML Service..."
 
 # Activate virtual environment
 source venv/bin/activate
 
-# Start Flask app
-python app.py
-
+if [ "$1" == "--dev" ]; then
+    # Start Flask development server
+    python app.py
+else
+    # Start gunicorn with the app preloaded and shared by its workers
+    exec gunicorn -c gunicorn.conf.py app:app
+fi
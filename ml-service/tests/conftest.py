@@ -0,0 +1,9 @@
+"""
+Shared setup for the ml-service tests.
+The service modules live flat in ml-service/, so it is put on the import path.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,102 @@
+"""
+Tests for the compact table representation (compact.py) and ingestion into it.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from change_log import with_row_version
+from compact import IdCodec, compact_table, decode_ids
+from data_snapshot import DataSnapshot
+
+
+def test_id_codec_round_trips_ids_across_the_width():
+    ids = ['SL000001', 'SL999998', 'SL999999', 'SL1000000', 'SL1000001']
+    codec = IdCodec.infer(ids)
+
+    assert codec is not None
+    assert (codec.prefix, codec.min_width) == ('SL', 6)
+    codes = codec.encode(ids)
+    assert codes.dtype == np.int32
+    assert codes.tolist() == [1, 999998, 999999, 1000000, 1000001]
+    assert codec.decode(codes) == ids
+
+
+def test_id_codec_rejects_ids_that_would_not_decode_to_themselves():
+    codec = IdCodec('SL', 6)
+
+    assert codec.encode(['SL1000000']).tolist() == [1000000]
+    for bad in ['SL0000001', 'SL00001', 'T000001', 'SL12a456', 'SL2147483648']:
+        with pytest.raises(ValueError):
+            codec.encode([bad])
+    assert IdCodec.infer(['SL000001', 'SL0000002']) is None
+
+
+def snapshot_ending_at(last_id):
+    """A small snapshot whose newest sale and ticket have number last_id."""
+    dates = pd.to_datetime(['2025-01-01', '2025-01-02'])
+    sales = pd.DataFrame({
+        'id': [f'SL{last_id - 1:06d}', f'SL{last_id:06d}'],
+        'date': dates,
+        'dealership': ['Texas Dealership'] * 2,
+        'location': ['Austin, TX'] * 2,
+        'model': ['E-Sedan Pro', 'E-SUV Elite'],
+        'price': [45000.0, 60000.0],
+    })
+    tickets = pd.DataFrame({
+        'id': [f'T{last_id - 1:06d}', f'T{last_id:06d}'],
+        'created_at': dates,
+        'vehicle_model': ['E-Sedan Pro'] * 2,
+        'issue': ['Brake system check'] * 2,
+        'status': ['open', 'completed'],
+        'completed_at': [pd.NaT, pd.Timestamp('2025-01-03')],
+    })
+    parts = pd.DataFrame({
+        'month': ['2025-01'], 'part_id': ['P001'], 'part_name': ['Battery Pack'],
+        'sku': ['BAT-5000'], 'category': ['Power'], 'demand': [60],
+        'inventory_level': [90], 'price': [8500], 'sales_volume': [2],
+    })
+    monthly = pd.DataFrame({'month': ['2025-01'], 'total_sales': [105000.0], 'units_sold': [2]})
+    dealership = pd.DataFrame({
+        'month': ['2025-01'], 'dealership': ['Texas Dealership'], 'location': ['Austin, TX'],
+        'sales_amount': [105000.0], 'units_sold': [2], 'parts_cost': [23625.0],
+        'gross_margin': [77.5],
+    })
+
+    sales, sales_ids = compact_table(sales, 'sales')
+    tickets, ticket_ids = compact_table(tickets, 'tickets')
+    return DataSnapshot(
+        sales=with_row_version(sales, 0),
+        parts=with_row_version(parts, 0),
+        tickets=with_row_version(tickets, 0),
+        monthly=monthly,
+        dealership=dealership,
+        file_version=(0.0,),
+        id_codecs={'sales': sales_ids, 'tickets': ticket_ids},
+    )
+
+
+def test_ingest_continues_ids_past_999999():
+    snapshot = snapshot_ending_at(999999)
+
+    snapshot, counts = snapshot.append(
+        sales=[{'id': 'SL1000000', 'date': '2025-01-03', 'dealership': 'Texas Dealership',
+                'model': 'E-Sedan Pro', 'price': 47000}],
+        tickets=[{'id': 'T1000000', 'created_at': '2025-01-03', 'vehicle_model': 'E-SUV Elite',
+                  'issue': 'Battery range reduced', 'status': 'open'}],
+    )
+
+    assert counts == {'sales': 1, 'serviceTickets': 1, 'parts': 0}
+    rows, _ = snapshot.sales_index.page(3)
+    assert decode_ids(rows['id'], snapshot.id_codecs['sales']) == ['SL1000000', 'SL999999', 'SL999998']
+    rows, _ = snapshot.tickets_index.page(1)
+    assert decode_ids(rows['id'], snapshot.id_codecs['tickets']) == ['T1000000']
+
+    # The next id in sequence is taken, and the same number spelled differently is rejected
+    with pytest.raises(ValueError):
+        snapshot.append(sales=[{'id': 'SL1000000', 'date': '2025-01-04', 'dealership': 'Texas Dealership',
+                                'model': 'E-Sedan Pro', 'price': 1}])
+    with pytest.raises(ValueError):
+        snapshot.append(sales=[{'id': 'SL01000001', 'date': '2025-01-04', 'dealership': 'Texas Dealership',
+                                'model': 'E-Sedan Pro', 'price': 1}])
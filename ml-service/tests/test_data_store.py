@@ -0,0 +1,50 @@
+"""
+Tests for dataset file selection and loading (data_store.py).
+"""
+
+import os
+
+import pandas as pd
+
+from data_store import dataset_path, load_dataset, save_dataset
+
+
+def write_monthly(data_dir, fmt):
+    df = pd.DataFrame({'month': ['2025-01', '2025-02'], 'total_sales': [1.0, 2.0], 'units_sold': [1, 2]})
+    save_dataset(df, 'monthly_aggregates', data_dir=str(data_dir), fmt=fmt)
+    return os.path.join(data_dir, 'monthly_aggregates.' + fmt)
+
+
+def set_mtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+
+def test_auto_prefers_a_current_columnar_file(tmp_path, monkeypatch):
+    monkeypatch.delenv('ML_DATA_FORMAT', raising=False)
+    csv_path = write_monthly(tmp_path, 'csv')
+    feather_path = write_monthly(tmp_path, 'feather')
+    set_mtime(csv_path, 1_000)
+    set_mtime(feather_path, 1_000)
+
+    assert dataset_path('monthly_aggregates', str(tmp_path)) == feather_path
+
+
+def test_auto_skips_columnar_files_older_than_the_csv(tmp_path, monkeypatch):
+    monkeypatch.delenv('ML_DATA_FORMAT', raising=False)
+    csv_path = write_monthly(tmp_path, 'csv')
+    feather_path = write_monthly(tmp_path, 'feather')
+    parquet_path = write_monthly(tmp_path, 'parquet')
+    set_mtime(feather_path, 1_000)
+    set_mtime(parquet_path, 1_000)
+    set_mtime(csv_path, 2_000)
+
+    assert dataset_path('monthly_aggregates', str(tmp_path)) == csv_path
+    assert len(load_dataset('monthly_aggregates', str(tmp_path))) == 2
+
+    # A fresh Parquet file is still preferred over the CSV
+    set_mtime(parquet_path, 3_000)
+    assert dataset_path('monthly_aggregates', str(tmp_path)) == parquet_path
+
+    # An explicit format is loaded as asked
+    monkeypatch.setenv('ML_DATA_FORMAT', 'feather')
+    assert dataset_path('monthly_aggregates', str(tmp_path)) == feather_path
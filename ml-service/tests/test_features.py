@@ -0,0 +1,53 @@
+"""
+Tests for the vectorized training features (features.py) against the original per-part loop.
+"""
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import legacy_parts_training_data
+from features import parts_demand_training_data
+
+CATEGORIES = {'P002': 'Engine', 'P010': 'Engine', 'P001': 'Brakes', 'P005': 'Brakes'}
+
+
+def parts_fixture():
+    """Shuffled rows for parts with 3, 1, 4 and 1 months of history."""
+    history = {
+        'P002': ['2024-01', '2024-02', '2024-03'],
+        'P010': ['2024-02'],
+        'P001': ['2023-11', '2023-12', '2024-01', '2024-02'],
+        'P005': ['2024-03'],
+    }
+    rows = [
+        {'part_id': part_id, 'month': month, 'category': CATEGORIES[part_id]}
+        for part_id, months in history.items()
+        for month in months
+    ]
+    rng = np.random.default_rng(0)
+    parts = pd.DataFrame(rows).sample(frac=1, random_state=0).reset_index(drop=True)
+    parts['demand'] = rng.integers(1, 500, len(parts))
+    parts['sales_volume'] = rng.integers(50, 300, len(parts))
+    parts['inventory_level'] = rng.integers(0, 800, len(parts))
+    parts['price'] = parts['part_id'].map({'P002': 120.5, 'P010': 80.0, 'P001': 9500.0, 'P005': 42.0})
+    return parts
+
+
+def test_training_data_matches_the_loop():
+    parts = parts_fixture()
+    legacy_X, legacy_y = legacy_parts_training_data(parts)
+    X, y = parts_demand_training_data(parts)
+
+    # 2 + 0 + 3 + 0 pairs: single-month parts have no next month to predict
+    assert X.shape == (5, 5) and y.shape == (5, 1)
+    np.testing.assert_array_equal(X, legacy_X)
+    np.testing.assert_array_equal(y, legacy_y)
+
+
+def test_groups_follow_the_pairs():
+    parts = parts_fixture()
+    _, _, groups = parts_demand_training_data(parts, group_column='category')
+
+    counts = parts['part_id'].value_counts()
+    expected = [CATEGORIES[p] for p in parts['part_id'].unique() for _ in range(counts[p] - 1)]
+    assert list(groups) == expected
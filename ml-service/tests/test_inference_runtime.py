@@ -0,0 +1,84 @@
+"""
+Parity of the NumPy serving runtime (inference_runtime.py) with the Keras models it is exported from.
+Tiny models are built and briefly trained in-process, exported, and both runtimes are run on the same inputs.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from features import parts_demand_features  # noqa: E402
+from inference_runtime import NumpyPartsDemandModel, NumpySalesForecastModel  # noqa: E402
+from train_models import PartsDemandModel, SalesForecastModel  # noqa: E402
+
+# Max abs difference allowed between the scaled network outputs
+TOLERANCE = 1e-4
+
+
+def monthly_sales(n_months=36, seed=0):
+    rng = np.random.default_rng(seed)
+    trend = np.linspace(3e6, 6e6, n_months)
+    season = 5e5 * np.sin(np.arange(n_months) * 2 * np.pi / 12)
+    return pd.DataFrame({
+        'month': pd.period_range('2022-01', periods=n_months, freq='M').astype(str),
+        'total_sales': trend + season + rng.normal(0, 2e5, n_months),
+    })
+
+
+def parts_history(n_parts=6, n_months=12, seed=0):
+    rng = np.random.default_rng(seed)
+    months = pd.period_range('2024-01', periods=n_months, freq='M').astype(str)
+    n_rows = n_parts * n_months
+    return pd.DataFrame({
+        'month': np.tile(months, n_parts),
+        'part_id': np.repeat([f'P{i:03d}' for i in range(n_parts)], n_months),
+        'demand': rng.integers(10, 200, n_rows),
+        'inventory_level': rng.integers(0, 300, n_rows),
+        'price': np.repeat(rng.integers(100, 15000, n_parts), n_months),
+        'sales_volume': rng.integers(10, 120, n_rows),
+    })
+
+
+def test_sales_forecaster_matches_keras(tmp_path):
+    monthly = monthly_sales()
+    keras_model = SalesForecastModel(lookback=6)
+    keras_model.train(monthly, epochs=3, verbose=0)
+    keras_model.export(str(tmp_path / 'sales.npz'))
+
+    numpy_model = NumpySalesForecastModel()
+    numpy_model.load(str(tmp_path / 'sales.npz'))
+
+    sequences = keras_model.scaler.transform(monthly[['total_sales']])
+    windows = np.stack([sequences[i:i + 6] for i in range(len(sequences) - 6)])
+    diff = np.abs(keras_model.model.predict(windows, verbose=0) - numpy_model.model.predict(windows))
+    assert diff.max() < TOLERANCE
+
+    recent = monthly.tail(12)
+    np.testing.assert_allclose(
+        numpy_model.predict_next_months(recent, n_months=3),
+        keras_model.predict_next_months(recent, n_months=3),
+        rtol=TOLERANCE,
+    )
+
+
+def test_parts_demand_model_matches_keras(tmp_path):
+    parts = parts_history(n_parts=10)
+    keras_model = PartsDemandModel()
+    # Fewer epochs can leave the final relu dead, which would make every prediction equal
+    keras_model.train(parts, epochs=20, verbose=0)
+    keras_model.export(str(tmp_path / 'parts.npz'))
+
+    numpy_model = NumpyPartsDemandModel()
+    numpy_model.load(str(tmp_path / 'parts.npz'))
+
+    features = keras_model.scaler_X.transform(parts_demand_features(parts))
+    diff = np.abs(keras_model.model.predict(features, verbose=0) - numpy_model.model.predict(features))
+    assert diff.max() < TOLERANCE
+
+    # Served predictions are rounded units; float noise may move one across a rounding edge
+    keras_demand = keras_model.predict_demand_batch(parts)
+    numpy_demand = numpy_model.predict_demand_batch(parts)
+    assert len(np.unique(keras_demand)) > 1
+    assert np.abs(keras_demand - numpy_demand).max() <= 1
@@ -9,9 +9,15 @@ import tensorflow as tf
 from tensorflow import keras
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import train_test_split
+import argparse
 import os
 import pickle
-import json
+import time
+
+from features import parts_demand_training_data
+from forecasting import SalesForecaster, PartsDemandPredictor
+from inference_runtime import save_artifact, SALES_ARTIFACT_PATH, PARTS_ARTIFACT_PATH
+from model_fleet import stack_members
 
 # Set random seed for reproducibility
 np.random.seed(42)
@@ -21,7 +27,71 @@ tf.random.set_seed(42)
 os.makedirs('models', exist_ok=True)
 
 
-class SalesForecastModel:
+def keras_layer_specs(model):
+    """Describe a Sequential model as NumPy runtime layer specs and weights."""
+    layers = []
+    weights = []
+    
+    for layer in model.layers:
+        config = layer.get_config()
+        
+        if isinstance(layer, keras.layers.Dropout):
+            continue  # No-op at inference time
+        elif isinstance(layer, keras.layers.LSTM):
+            layers.append({
+                'type': 'lstm',
+                'activation': config['activation'],
+                'recurrent_activation': config['recurrent_activation'],
+                'return_sequences': config['return_sequences'],
+            })
+        elif isinstance(layer, keras.layers.Dense):
+            layers.append({'type': 'dense', 'activation': config['activation']})
+        else:
+            raise ValueError(f"Cannot export layer type {type(layer).__name__}")
+        
+        weights.append(layer.get_weights())
+    
+    return layers, weights
+
+
+def fine_tune(base_model, X, y, epochs=50, batch_size=8, shuffle=True):
+    """Train a copy of base_model further on (X, y).
+    
+    Fleet members start from the global model's weights, so a short history
+    per member is enough. Returns (model, validation MAE).
+    """
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.2, shuffle=shuffle, random_state=42 if shuffle else None
+    )
+    
+    model = keras.models.clone_model(base_model)
+    model.set_weights(base_model.get_weights())
+    model.compile(
+        optimizer=keras.optimizers.Adam(learning_rate=0.0005),
+        loss='mse',
+        metrics=['mae']
+    )
+    
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss',
+        patience=10,
+        restore_best_weights=True
+    )
+    
+    model.fit(
+        X_train, y_train,
+        validation_data=(X_val, y_val),
+        epochs=epochs,
+        batch_size=batch_size,
+        callbacks=[early_stopping],
+        verbose=0
+    )
+    
+    _, val_mae = model.evaluate(X_val, y_val, verbose=0)
+    return model, float(val_mae)
+
+
+class SalesForecastModel(SalesForecaster):
     """LSTM model for sales forecasting."""
     
     def __init__(self, lookback=6):
@@ -61,7 +131,7 @@ class SalesForecastModel:
         
         return model
     
-    def train(self, monthly_data):
+    def train(self, monthly_data, epochs=100, verbose=1):
         """Train the sales forecast model."""
         print("Training sales forecast model...")
         
@@ -88,46 +158,63 @@ class SalesForecastModel:
         history = self.model.fit(
             X_train, y_train,
             validation_data=(X_val, y_val),
-            epochs=100,
+            epochs=epochs,
             batch_size=8,
             callbacks=[early_stopping],
-            verbose=1
+            verbose=verbose
         )
         
+        # New weights invalidate any cached forecasts
+        self.version = time.time()
+        
         # Evaluate
         train_loss, train_mae = self.model.evaluate(X_train, y_train, verbose=0)
         val_loss, val_mae = self.model.evaluate(X_val, y_val, verbose=0)
         
         print(f"Training MAE: {train_mae:.2f}, Validation MAE: {val_mae:.2f}")
+        self.metrics = {
+            'train_mae': float(train_mae),
+            'val_mae': float(val_mae),
+            'epochs': len(history.history['loss']),
+        }
         
         return history
     
-    def predict_next_months(self, recent_data, n_months=3):
-        """Predict sales for the next n months."""
-        # Get the most recent lookback period
-        scaled_data = self.scaler.transform(recent_data[['total_sales']].values)
-        
-        predictions = []
-        current_sequence = scaled_data[-self.lookback:].reshape(1, self.lookback, 1)
-        
-        for _ in range(n_months):
-            # Predict next value
-            pred_scaled = self.model.predict(current_sequence, verbose=0)
-            predictions.append(pred_scaled[0, 0])
+    def train_fleet(self, series):
+        """Fine-tune one forecaster per row of series for the model fleet.
+        
+        series is a (name x month) DataFrame from features.dealership_sales_series.
+        Each member gets its own scaler. Returns a spec for model_fleet.save_fleet.
+        """
+        print(f"Training sales fleet ({len(series)} members)...")
+        
+        member_specs = []
+        mins, scales = [], []
+        val_mae = {}
+        for name, values in series.iterrows():
+            scaler = MinMaxScaler()
+            scaled = scaler.fit_transform(values.to_numpy(dtype=float).reshape(-1, 1))
+            if len(scaled) < self.lookback + 5:
+                raise ValueError(f"Not enough history to train fleet member {name}")
             
-            # Update sequence for next prediction
-            current_sequence = np.append(
-                current_sequence[:, 1:, :],
-                pred_scaled.reshape(1, 1, 1),
-                axis=1
-            )
-        
-        # Inverse transform predictions
-        predictions = self.scaler.inverse_transform(
-            np.array(predictions).reshape(-1, 1)
-        )
-        
-        return predictions.flatten()
+            X = np.array([scaled[i:i + self.lookback] for i in range(len(scaled) - self.lookback)])
+            y = scaled[self.lookback:]
+            member, val_mae[name] = fine_tune(self.model, X, y, batch_size=8, shuffle=False)
+            
+            member_specs.append(keras_layer_specs(member))
+            mins.append(scaler.min_)
+            scales.append(scaler.scale_)
+            print(f"  {name}: validation MAE {val_mae[name]:.4f}")
+        
+        layers, weights = stack_members(member_specs)
+        return {
+            'members': list(series.index),
+            'layers': layers,
+            'weights': weights,
+            'scalers': {'scaler': (np.array(mins), np.array(scales))},
+            'lookback': self.lookback,
+            'val_mae': val_mae,
+        }
     
     def save(self, path='models/sales_forecast_model.keras'):
         """Save model and scaler."""
@@ -136,14 +223,22 @@ class SalesForecastModel:
             pickle.dump(self.scaler, f)
         print(f"Model saved to {path}")
     
+    def export(self, path=SALES_ARTIFACT_PATH):
+        """Export weights and scaler for the NumPy serving runtime."""
+        layers, weights = keras_layer_specs(self.model)
+        save_artifact(path, layers, weights, {'scaler': self.scaler},
+                      lookback=self.lookback)
+        print(f"Inference artifact exported to {path}")
+    
     def load(self, path='models/sales_forecast_model.keras'):
         """Load model and scaler."""
         self.model = keras.models.load_model(path)
+        self.version = os.path.getmtime(path)
         with open(path.replace('.keras', '_scaler.pkl'), 'rb') as f:
             self.scaler = pickle.load(f)
 
 
-class PartsDemandModel:
+class PartsDemandModel(PartsDemandPredictor):
     """Model for predicting parts demand."""
     
     def __init__(self):
@@ -151,33 +246,15 @@ class PartsDemandModel:
         self.scaler_X = MinMaxScaler()
         self.scaler_y = MinMaxScaler()
         
-    def prepare_data(self, parts_data):
-        """Prepare features for parts demand prediction."""
-        # Features: sales_volume, month number, historical demand
-        features = []
-        targets = []
+    def prepare_data(self, parts_data=None, features=None):
+        """Prepare features for parts demand prediction.
         
-        for part_id in parts_data['part_id'].unique():
-            part_data = parts_data[parts_data['part_id'] == part_id].sort_values('month')
-            
-            for i in range(len(part_data) - 1):
-                row = part_data.iloc[i]
-                next_row = part_data.iloc[i + 1]
-                
-                # Extract month number
-                month_num = int(row['month'].split('-')[1])
-                
-                features.append([
-                    row['demand'],
-                    row['sales_volume'],
-                    row['inventory_level'],
-                    month_num,
-                    row['price']
-                ])
-                targets.append(next_row['demand'])
-        
-        X = np.array(features)
-        y = np.array(targets).reshape(-1, 1)
+        features may hold precomputed (X, y) from parts_demand_training_data,
+        e.g. from the training pipeline's feature cache.
+        """
+        # Features: demand, sales_volume, inventory_level, month number, price
+        # Target: the part's demand in the following month
+        X, y = features if features is not None else parts_demand_training_data(parts_data)
         
         # Scale features
         X_scaled = self.scaler_X.fit_transform(X)
@@ -204,12 +281,12 @@ class PartsDemandModel:
         
         return model
     
-    def train(self, parts_data):
+    def train(self, parts_data=None, features=None, epochs=100, verbose=1):
         """Train the parts demand model."""
         print("Training parts demand model...")
         
         # Prepare data
-        X, y = self.prepare_data(parts_data)
+        X, y = self.prepare_data(parts_data, features)
         
         # Split data
         X_train, X_val, y_train, y_val = train_test_split(
@@ -228,10 +305,10 @@ class PartsDemandModel:
         history = self.model.fit(
             X_train, y_train,
             validation_data=(X_val, y_val),
-            epochs=100,
+            epochs=epochs,
             batch_size=32,
             callbacks=[early_stopping],
-            verbose=1
+            verbose=verbose
         )
         
         # Evaluate
@@ -239,25 +316,47 @@ class PartsDemandModel:
         val_loss, val_mae = self.model.evaluate(X_val, y_val, verbose=0)
         
         print(f"Training MAE: {train_mae:.2f}, Validation MAE: {val_mae:.2f}")
+        self.metrics = {
+            'train_mae': float(train_mae),
+            'val_mae': float(val_mae),
+            'epochs': len(history.history['loss']),
+        }
         
         return history
     
-    def predict_demand(self, current_demand, sales_volume, inventory_level, 
-                      month, price):
-        """Predict parts demand for next period."""
-        features = np.array([[
-            current_demand,
-            sales_volume,
-            inventory_level,
-            month,
-            price
-        ]])
-        
-        features_scaled = self.scaler_X.transform(features)
-        prediction_scaled = self.model.predict(features_scaled, verbose=0)
-        prediction = self.scaler_y.inverse_transform(prediction_scaled)
-        
-        return max(0, int(prediction[0, 0]))
+    def train_fleet(self, X, y, groups, group_column='category'):
+        """Fine-tune one demand model per group of training pairs for the model fleet.
+        
+        X and y are raw training pairs with groups[i] naming the group of pair i
+        (see parts_demand_training_data). Members share this model's scalers;
+        groups with fewer than 5 pairs get no member and fall back to the global
+        model when serving. Returns a spec for model_fleet.save_fleet.
+        """
+        X_scaled = self.scaler_X.transform(X)
+        y_scaled = self.scaler_y.transform(y)
+        members = [group for group in pd.unique(groups) if (groups == group).sum() >= 5]
+        print(f"Training parts fleet ({len(members)} members)...")
+        
+        member_specs = []
+        val_mae = {}
+        for group in members:
+            mask = groups == group
+            member, val_mae[group] = fine_tune(self.model, X_scaled[mask], y_scaled[mask], batch_size=16)
+            member_specs.append(keras_layer_specs(member))
+            print(f"  {group}: validation MAE {val_mae[group]:.4f}")
+        
+        layers, weights = stack_members(member_specs)
+        return {
+            'members': members,
+            'layers': layers,
+            'weights': weights,
+            'scalers': {
+                'scaler_X': (self.scaler_X.min_, self.scaler_X.scale_),
+                'scaler_y': (self.scaler_y.min_, self.scaler_y.scale_),
+            },
+            'group_column': group_column,
+            'val_mae': val_mae,
+        }
     
     def save(self, path='models/parts_demand_model.keras'):
         """Save model and scalers."""
@@ -268,6 +367,13 @@ class PartsDemandModel:
             pickle.dump(self.scaler_y, f)
         print(f"Model saved to {path}")
     
+    def export(self, path=PARTS_ARTIFACT_PATH):
+        """Export weights and scalers for the NumPy serving runtime."""
+        layers, weights = keras_layer_specs(self.model)
+        save_artifact(path, layers, weights,
+                      {'scaler_X': self.scaler_X, 'scaler_y': self.scaler_y})
+        print(f"Inference artifact exported to {path}")
+    
     def load(self, path='models/parts_demand_model.keras'):
         """Load model and scalers."""
         self.model = keras.models.load_model(path)
@@ -277,73 +383,42 @@ class PartsDemandModel:
             self.scaler_y = pickle.load(f)
 
 
-def train_all_models():
-    """Train all models with the generated data."""
-    print("=" * 60)
-    print("Training E Corp ML Models")
-    print("=" * 60)
+def train_all_models(parallel=None, use_cache=True):
+    """Train all models with the generated data (see training_pipeline.py)."""
+    from training_pipeline import run_pipeline
     
-    # Load data
-    print("\nLoading datasets...")
-    monthly_data = pd.read_csv('data/monthly_aggregates.csv')
-    parts_data = pd.read_csv('data/parts_inventory.csv')
-    
-    print(f"Loaded {len(monthly_data)} monthly records")
-    print(f"Loaded {len(parts_data)} parts records")
-    
-    # Train sales forecast model
-    print("\n" + "=" * 60)
-    sales_model = SalesForecastModel(lookback=6)
-    sales_model.train(monthly_data)
-    sales_model.save()
-    
-    # Test prediction
-    print("\nTesting sales forecast...")
-    predictions = sales_model.predict_next_months(monthly_data, n_months=3)
-    print(f"Next 3 months predictions: {predictions}")
+    return run_pipeline(parallel=parallel, use_cache=use_cache)
+
+
+def export_models():
+    """Export already-trained Keras models to NumPy inference artifacts."""
+    sales_model = SalesForecastModel()
+    sales_model.load()
+    sales_model.export()
     
-    # Train parts demand model
-    print("\n" + "=" * 60)
     parts_model = PartsDemandModel()
-    parts_model.train(parts_data)
-    parts_model.save()
-    
-    # Test prediction
-    print("\nTesting parts demand prediction...")
-    test_demand = parts_model.predict_demand(
-        current_demand=50,
-        sales_volume=100,
-        inventory_level=75,
-        month=10,
-        price=8500
-    )
-    print(f"Predicted demand: {test_demand}")
-    
-    # Save training info
-    training_info = {
-        'trained_at': pd.Timestamp.now().isoformat(),
-        'sales_model': {
-            'lookback': sales_model.lookback,
-            'training_samples': len(monthly_data) - sales_model.lookback,
-        },
-        'parts_model': {
-            'training_samples': len(parts_data),
-        },
-        'datasets': {
-            'monthly_aggregates': len(monthly_data),
-            'parts_inventory': len(parts_data),
-        }
-    }
-    
-    with open('models/training_info.json', 'w') as f:
-        json.dump(training_info, f, indent=2)
-    
-    print("\n" + "=" * 60)
-    print("Training complete!")
-    print("Models saved in 'models/' directory")
-    print("=" * 60)
+    parts_model.load()
+    parts_model.export()
 
 
 if __name__ == '__main__':
-    train_all_models()
+    parser = argparse.ArgumentParser(description='Train E Corp ML models')
+    parser.add_argument(
+        '--export-only', action='store_true',
+        help='Skip training and export the saved models for the NumPy runtime'
+    )
+    parser.add_argument(
+        '--sequential', action='store_true',
+        help='Train the models one after another in this process'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='Rebuild feature datasets even if their inputs are unchanged'
+    )
+    args = parser.parse_args()
+    
+    if args.export_only:
+        export_models()
+    else:
+        train_all_models(parallel=False if args.sequential else None, use_cache=not args.no_cache)
 
@@ -0,0 +1,331 @@
+"""
+Training pipeline for the E Corp ML models.
+Builds feature datasets once per input content, then trains the independent models in parallel processes.
+
+Stages:
+    1. Hash the input dataset files.
+    2. Load datasets and build features, or reuse the cached feature
+       datasets in data/feature_cache/ when the inputs are unchanged.
+    3. Train the sales and parts models, each in its own spawned process with
+       TensorFlow's thread pools pinned to its share of the cores. Each task
+       then fine-tunes its model fleet (per dealership, per parts category).
+    4. Stack both fleets into models/model_fleet.npz.
+    5. Write models/training_info.json with per-stage timings.
+    6. Publish the models as a new registry version (see model_registry.py).
+       It is not served until activated.
+
+TensorFlow is only imported in the training processes, never in this one.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_store import dataset_path, load_dataset
+from features import dealership_sales_series, parts_demand_training_data
+from model_fleet import FLEET_ARTIFACT_PATH, save_fleet
+from model_loader import REGISTRY_FILES
+from model_registry import ModelRegistry
+
+FEATURE_CACHE_DIR = 'data/feature_cache'
+
+# Bump when feature construction changes so cached datasets are rebuilt
+FEATURE_VERSION = 2
+
+TRAINING_INFO_PATH = 'models/training_info.json'
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FeatureCache:
+    """Feature datasets stored as .npz files named by a hash of their inputs."""
+
+    def __init__(self, directory=FEATURE_CACHE_DIR):
+        self.directory = directory
+
+    def path(self, name, input_hash):
+        key = hashlib.sha256(f'{FEATURE_VERSION}:{name}:{input_hash}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f'{name}-{key[:16]}.npz')
+
+    def get(self, name, input_hash):
+        """Path of the cached dataset, or None if it has not been built."""
+        path = self.path(name, input_hash)
+        return path if os.path.exists(path) else None
+
+    def put(self, name, input_hash, **arrays):
+        """Write a feature dataset atomically and drop older versions of it."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name, input_hash)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+        for entry in os.listdir(self.directory):
+            stale = os.path.join(self.directory, entry)
+            if entry.startswith(f'{name}-') and entry.endswith('.npz') and stale != path:
+                os.remove(stale)
+        return path
+
+
+def build_sales_features(monthly_data):
+    """Monthly sales series the sales model windows into sequences."""
+    return {'total_sales': monthly_data['total_sales'].to_numpy(dtype=float)}
+
+
+def build_dealership_features(dealership_data):
+    """Monthly sales series per dealership for the sales fleet."""
+    series = dealership_sales_series(dealership_data)
+    return {
+        'members': series.index.to_numpy(dtype=str),
+        'months': series.columns.to_numpy(dtype=str),
+        'series': series.to_numpy(),
+    }
+
+
+def build_parts_features(parts_data):
+    """Parts demand (X, y) training pairs with each pair's category."""
+    X, y, groups = parts_demand_training_data(parts_data, group_column='category')
+    return {'X': X, 'y': y, 'groups': groups, 'n_rows': np.array(len(parts_data))}
+
+
+# Feature dataset name -> (input dataset, builder)
+FEATURE_SETS = {
+    'sales_series': ('monthly_aggregates', build_sales_features),
+    'dealership_series': ('dealership_metrics', build_dealership_features),
+    'parts_demand': ('parts_inventory', build_parts_features),
+}
+
+
+def prepare_features(use_cache=True, timings=None):
+    """Paths of all feature datasets, building only those whose inputs changed.
+
+    Returns ({feature set: path}, {feature set: 'hit' or 'miss'}).
+    """
+    timings = {} if timings is None else timings
+    cache = FeatureCache()
+
+    start = time.perf_counter()
+    input_hashes = {
+        name: file_hash(dataset_path(dataset)) for name, (dataset, _) in FEATURE_SETS.items()
+    }
+    timings['hash_inputs'] = time.perf_counter() - start
+
+    paths, status = {}, {}
+    timings['load_datasets'] = 0.0
+    timings['build_features'] = 0.0
+    for name, (dataset, builder) in FEATURE_SETS.items():
+        cached = cache.get(name, input_hashes[name]) if use_cache else None
+        if cached:
+            paths[name], status[name] = cached, 'hit'
+            print(f"✓ Features '{name}' unchanged, using {cached}")
+            continue
+
+        start = time.perf_counter()
+        data = load_dataset(dataset)
+        timings['load_datasets'] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        paths[name] = cache.put(name, input_hashes[name], **builder(data))
+        timings['build_features'] += time.perf_counter() - start
+        status[name] = 'miss'
+        print(f"✓ Built features '{name}' from {len(data)} {dataset} rows")
+
+    return paths, status
+
+
+def pin_threads(n_threads):
+    """Process initializer: size TensorFlow's thread pools before it starts."""
+    os.environ['ML_TF_INTRA_OP_THREADS'] = str(n_threads)
+    os.environ['ML_TF_INTER_OP_THREADS'] = '1'
+    os.environ['OMP_NUM_THREADS'] = str(n_threads)
+
+
+def train_sales_task(features_path, dealership_path):
+    """Train, save and export the sales model and its fleet from cached features."""
+    start = time.perf_counter()
+
+    from model_loader import configure_tensorflow_threads
+    configure_tensorflow_threads()
+    from train_models import SalesForecastModel
+
+    with np.load(features_path) as features:
+        monthly_data = pd.DataFrame({'total_sales': features['total_sales']})
+
+    model = SalesForecastModel(lookback=6)
+    model.train(monthly_data)
+    model.save()
+    model.export()
+
+    predictions = model.predict_next_months(monthly_data, n_months=3)
+    print(f"Next 3 months predictions: {predictions}")
+
+    with np.load(dealership_path) as features:
+        series = pd.DataFrame(features['series'], index=features['members'],
+                              columns=features['months'])
+    fleet = model.train_fleet(series)
+
+    return {
+        'lookback': model.lookback,
+        'training_samples': len(monthly_data) - model.lookback,
+        'dataset_rows': len(monthly_data),
+        **model.metrics,
+        'fleet': fleet,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def train_parts_task(features_path):
+    """Train, save and export the parts model and its fleet from cached features."""
+    start = time.perf_counter()
+
+    from model_loader import configure_tensorflow_threads
+    configure_tensorflow_threads()
+    from train_models import PartsDemandModel
+
+    with np.load(features_path) as features:
+        X, y, groups = features['X'], features['y'], features['groups']
+        n_rows = int(features['n_rows'])
+
+    model = PartsDemandModel()
+    model.train(features=(X, y))
+    model.save()
+    model.export()
+
+    test_demand = model.predict_demand(
+        current_demand=50,
+        sales_volume=100,
+        inventory_level=75,
+        month=10,
+        price=8500
+    )
+    print(f"Predicted demand: {test_demand}")
+
+    fleet = model.train_fleet(X, y, groups)
+
+    return {
+        'training_samples': len(X),
+        'dataset_rows': n_rows,
+        **model.metrics,
+        'fleet': fleet,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+# Model -> (training task, feature sets it reads)
+TRAINING_TASKS = {
+    'sales_model': (train_sales_task, ('sales_series', 'dealership_series')),
+    'parts_model': (train_parts_task, ('parts_demand',)),
+}
+
+
+def train_models(feature_paths, parallel):
+    """Run every training task, in parallel processes or one after another here."""
+    if not parallel:
+        return {
+            name: task(*(feature_paths[feature_set] for feature_set in feature_sets))
+            for name, (task, feature_sets) in TRAINING_TASKS.items()
+        }
+
+    n_workers = len(TRAINING_TASKS)
+    threads_per_worker = max(1, multiprocessing.cpu_count() // n_workers)
+
+    # Spawned, not forked: each process starts its own TensorFlow runtime
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=pin_threads,
+        initargs=(threads_per_worker,),
+    ) as executor:
+        futures = {
+            name: executor.submit(task, *(feature_paths[feature_set] for feature_set in feature_sets))
+            for name, (task, feature_sets) in TRAINING_TASKS.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def run_pipeline(parallel=None, use_cache=True):
+    """Prepare features, train all models and record training_info.json.
+
+    parallel defaults to training in separate processes when there is more
+    than one core; on a single core the extra TensorFlow runtimes only compete.
+    """
+    if parallel is None:
+        parallel = multiprocessing.cpu_count() > 1
+
+    print("=" * 60)
+    print("Training E Corp ML Models")
+    print("=" * 60)
+
+    os.makedirs('models', exist_ok=True)
+    pipeline_start = time.perf_counter()
+    timings = {}
+
+    print("\nPreparing feature datasets...")
+    feature_paths, cache_status = prepare_features(use_cache, timings)
+
+    mode = 'in parallel processes' if parallel else 'sequentially'
+    print(f"\nTraining {len(TRAINING_TASKS)} models {mode}...")
+    start = time.perf_counter()
+    results = train_models(feature_paths, parallel)
+    timings['train_models'] = time.perf_counter() - start
+
+    # Both fleets go into one stacked artifact, served as a single engine
+    start = time.perf_counter()
+    fleets = {
+        'sales': results['sales_model'].pop('fleet'),
+        'parts': results['parts_model'].pop('fleet'),
+    }
+    save_fleet(FLEET_ARTIFACT_PATH, **fleets)
+    timings['save_fleet'] = time.perf_counter() - start
+    print(f"✓ Model fleet saved to {FLEET_ARTIFACT_PATH}")
+    timings['total'] = time.perf_counter() - pipeline_start
+
+    training_info = {
+        'trained_at': pd.Timestamp.now().isoformat(),
+        **results,
+        'fleet': {
+            name: {'members': len(spec['members']), 'val_mae': spec['val_mae']}
+            for name, spec in fleets.items()
+        },
+        'datasets': {
+            'monthly_aggregates': results['sales_model']['dataset_rows'],
+            'parts_inventory': results['parts_model']['dataset_rows'],
+        },
+        'feature_cache': cache_status,
+        'parallel': parallel,
+        'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()},
+    }
+
+    with open(TRAINING_INFO_PATH, 'w') as f:
+        json.dump(training_info, f, indent=2)
+
+    version = ModelRegistry().publish(REGISTRY_FILES, metadata={'trained_at': training_info['trained_at']})
+
+    # The published copy's manifest names its version; record it in models/ too
+    training_info['registry_version'] = version
+    with open(TRAINING_INFO_PATH, 'w') as f:
+        json.dump(training_info, f, indent=2)
+
+    print("\n" + "=" * 60)
+    print("Training complete!")
+    for stage, seconds in training_info['timings'].items():
+        print(f"  {stage:<16} {seconds:>8.2f} s")
+    print("Models saved in 'models/' directory")
+    print(f"Published as {version}; serve it with 'python model_registry.py activate {version}'")
+    print("=" * 60)
+
+    return training_info